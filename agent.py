@@ -1,83 +1,226 @@
 import os
 import sys
 import json
+import time
 from typing import TypedDict, Annotated, Sequence, Union
 import functools
-import operator
+import asyncio
+import inspect
+import threading
+import uuid
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolExecutor, ToolInvocation
+from langgraph.graph.message import add_messages
 
 # Import our tools and schemas
 import tool_implementations
-from tool_schemas import TOOL_SCHEMAS
+import llm_registry
+import fast_path
+import prompting
+from response_cache import ResponseCache, single_turn_query
+from tool_cache import ToolResultCache, backend_from_spec
 
 # --- Configuration ---
 # Hardcoded key as per user request (Note: In production, use env vars)
 OPENAI_API_KEY = "paste your_openai_api_key_here"
 os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
+# Tool calls from a single model turn run concurrently, at most TOOL_CONCURRENCY at a time
+# across the process (see _ToolRun).
+TOOL_CONCURRENCY = int(os.environ.get("TOOL_CONCURRENCY", 4))
+# Seconds a single tool call may run (counted from when it starts, not while it waits for
+# a slot) before it is reported back to the model as timed out.
+TOOL_TIMEOUT = float(os.environ.get("TOOL_TIMEOUT", 30))
+# Per-tool overrides of TOOL_TIMEOUT
+TOOL_TIMEOUTS = {
+    "get_current_weather": 15,
+    "get_weather_forecast": 15,
+    "get_weather_for_locations": 20,
+}
+
 # --- Tool Setup ---
 
 # Map schemas to actual functions
 tools_map = {
     "get_current_weather": tool_implementations.get_current_weather,
     "get_weather_forecast": tool_implementations.get_weather_forecast,
+    "get_weather_for_locations": tool_implementations.get_weather_for_locations,
     "search_attractions": tool_implementations.search_attractions,
     "calculate_travel_distance": tool_implementations.calculate_travel_distance,
+    "plan_itinerary": tool_implementations.plan_itinerary,
     "get_packing_suggestions": tool_implementations.get_packing_suggestions,
+    "get_packing_suggestions_batch": tool_implementations.get_packing_suggestions_batch,
+}
+
+# Async counterparts, used when the graph is driven with ainvoke/astream
+async_tools_map = {
+    "get_current_weather": tool_implementations.aget_current_weather,
+    "get_weather_forecast": tool_implementations.aget_weather_forecast,
+    "get_weather_for_locations": tool_implementations.aget_weather_for_locations,
+    "search_attractions": tool_implementations.asearch_attractions,
+    "calculate_travel_distance": tool_implementations.acalculate_travel_distance,
+    "plan_itinerary": tool_implementations.aplan_itinerary,
+    "get_packing_suggestions": tool_implementations.aget_packing_suggestions,
+    "get_packing_suggestions_batch": tool_implementations.aget_packing_suggestions_batch,
 }
 
-# Define a tool executor
-tool_executor = ToolExecutor(tools_map.values()) # ToolExecutor usually takes a list of tools
+# Default argument values per tool, so that omitted and explicit defaults share cache entries
+tool_defaults = {
+    name: {
+        param.name: param.default
+        for param in inspect.signature(func).parameters.values()
+        if param.default is not inspect.Parameter.empty
+    }
+    for name, func in tools_map.items()
+}
 
-# However, ToolExecutor expects LangChain "Tool" objects if we pass a list. 
-# Since we have raw functions, we'll manually invoke them in the node.
-# Let's simple create a dictionary lookup for execution.
+# Result cache in front of execute_tool_call (per-tool TTLs live in tool_cache.TOOL_TTLS).
+# TOOL_CACHE_BACKEND: "memory" (default), "django[:alias]", "file:<dir>" or "none".
+tool_cache = ToolResultCache(
+    backend=backend_from_spec(os.environ.get("TOOL_CACHE_BACKEND", "memory")),
+    defaults=tool_defaults,
+)
+
+# Tools are plain functions, so the nodes invoke them through a dictionary lookup.
 def execute_tool_call(tool_name, tool_input):
     if tool_name not in tools_map:
         return f"Error: Tool {tool_name} not found."
     try:
         # tool_input is a dict
         func = tools_map[tool_name]
-        return func(**tool_input)
+        return tool_cache.call(tool_name, tool_input, func)
     except Exception as e:
         return f"Error executing tool {tool_name}: {str(e)}"
 
+def _tool_timeout(tool_name):
+    return TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT)
+
+def _timeout_message(tool_name):
+    return f"Error executing tool {tool_name}: timed out after {_tool_timeout(tool_name)}s"
+
+# Concurrency slots shared by every sync tool call in the process
+_tool_slots = threading.BoundedSemaphore(TOOL_CONCURRENCY)
+
+class _ToolRun:
+    """
+    One sync tool call on its own daemon thread, started once it holds one of the
+    TOOL_CONCURRENCY slots. Its timeout counts from that moment.
+    Threads cannot be killed, so a call that times out is abandoned: it gives its slot
+    back at once and its thread runs on until the call returns. Hung tools therefore
+    never starve later calls; each only keeps an idle thread alive meanwhile.
+    """
+
+    def __init__(self, tool_name, arguments):
+        self.tool_name = tool_name
+        self.arguments = arguments
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self.started_at = None
+        self.result = None
+        self._lock = threading.Lock()
+        self._holds_slot = False
+        threading.Thread(target=self._run, name=f"tool-{tool_name}", daemon=True).start()
+
+    def _run(self):
+        _tool_slots.acquire()
+        with self._lock:
+            self._holds_slot = True
+        self.started_at = time.monotonic()
+        self.started.set()
+        try:
+            self.result = execute_tool_call(self.tool_name, self.arguments)
+        finally:
+            self.done.set()
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            if self._holds_slot:
+                self._holds_slot = False
+                _tool_slots.release()
+
+    def wait(self):
+        """
+        The call's result, or a timeout message once it has run for longer than its timeout.
+        """
+        self.started.wait()
+        remaining = self.started_at + _tool_timeout(self.tool_name) - time.monotonic()
+        if self.done.wait(max(remaining, 0)):
+            return self.result
+        self._release()
+        return _timeout_message(self.tool_name)
+
+async def aexecute_tool_call(tool_name, tool_input):
+    if tool_name not in async_tools_map:
+        return f"Error: Tool {tool_name} not found."
+    try:
+        func = async_tools_map[tool_name]
+        return await tool_cache.acall(tool_name, tool_input, func)
+    except Exception as e:
+        return f"Error executing tool {tool_name}: {str(e)}"
+
+# Answer simple one-shot queries (see fast_path.py) without calling the model; "0" disables.
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "1") != "0"
+
+# Single-turn answers are reused for repeated (or near-identical) questions; "0" disables.
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") != "0"
+response_cache = ResponseCache()
+
 # --- Agent State ---
 #agent memory state
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], operator.add]
+    # add_messages appends, and lets a checkpointed thread be rebased (see chat/checkpoints.py)
+    messages: Annotated[Sequence[BaseMessage], add_messages]
 
 # --- Nodes ---
 
+def _prepare_messages(state: AgentState):
+    # Callers normally start the run with prompting.assemble(), so this is the state's own
+    # list with no copy; a bare history still gets the shared system prompt in front.
+    return prompting.assemble(state["messages"])
+
+def _tool_arguments(tool_call):
+    arguments = tool_call["args"]
+    
+    # specific handling: if args is a string (rare but possible), parse it
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) 
+        except:
+            pass
+    return arguments
+
 def agent_node(state: AgentState):
     """
     Invokes the model.
     """
-    messages = list(state["messages"])
-    
-    # Ensure System Message is present for behavior instructions
-    if not isinstance(messages[0], SystemMessage):
-        system_msg = SystemMessage(content="You are a helpful travel assistant. You have access to tools specifically for weather, attractions, distance, and packing. Use them when needed. Always respond in a slightly excited, helpful tone. Formats your response in Markdown.")
-        messages.insert(0, system_msg)
-    
-    # Initialize Model with Tools
-    llm = ChatOpenAI(
-        model="gpt-4o",
-        temperature=0,
-    )
-    # Bind tools using the JSON schemas we defined
-    llm_with_tools = llm.bind_tools(TOOL_SCHEMAS)
-    
-    response = llm_with_tools.invoke(messages)
+    messages = _prepare_messages(state)
+    response = llm_registry.get_bound_model(prompting.TOOLS).invoke(messages)
+    prompting.prompt_stats.record(messages, response)
+    return {"messages": [response]}
+
+async def aagent_node(state: AgentState):
+    """
+    Async version of agent_node.
+    """
+    messages = _prepare_messages(state)
+    response = await llm_registry.get_bound_model(prompting.TOOLS).ainvoke(messages)
+    prompting.prompt_stats.record(messages, response)
     return {"messages": [response]}
 
+def _tool_message(tool_call, result):
+    return ToolMessage(
+        content=str(result),
+        tool_call_id=tool_call["id"],
+        name=tool_call["name"]
+    )
+
 def tool_node(state: AgentState):
     """
     Executes tools requested by the model.
+    Independent calls from one AIMessage run concurrently; results keep the tool_call order.
     """
     messages = state["messages"]
     last_message = messages[-1]
@@ -87,33 +230,106 @@ def tool_node(state: AgentState):
     # construct tool inputs
     tool_calls = last_message.tool_calls
     
-    tool_messages = []
-    
+    runs = []
     for tool_call in tool_calls:
         function_name = tool_call["name"]
-        arguments = tool_call["args"]
-        
-        # specific handling: if args is a string (rare but possible), parse it
-        if isinstance(arguments, str):
-            try:
-                arguments = json.loads(arguments) 
-            except:
-                pass
+        arguments = _tool_arguments(tool_call)
 
         print(f"  [Tool Call]: {function_name}({arguments})")
+        runs.append(_ToolRun(function_name, arguments))
+    
+    tool_messages = [_tool_message(tool_call, run.wait()) for tool_call, run in zip(tool_calls, runs)]
         
-        result = execute_tool_call(function_name, arguments)
-        
-        tool_messages.append(
-            ToolMessage(
-                content=str(result),
-                tool_call_id=tool_call["id"],
-                name=function_name
-            )
-        )
+    return {"messages": tool_messages}
+
+async def atool_node(state: AgentState):
+    """
+    Async version of tool_node.
+    """
+    last_message = state["messages"][-1]
+    semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
+
+    async def run(tool_call):
+        function_name = tool_call["name"]
+        arguments = _tool_arguments(tool_call)
+        async with semaphore:
+            print(f"  [Tool Call]: {function_name}({arguments})")
+            try:
+                return await asyncio.wait_for(
+                    aexecute_tool_call(function_name, arguments), _tool_timeout(function_name)
+                )
+            except asyncio.TimeoutError:
+                return _timeout_message(function_name)
+
+    # gather preserves input order, so ToolMessages line up with tool_call ids
+    results = await asyncio.gather(*(run(tc) for tc in last_message.tool_calls))
+    tool_messages = [_tool_message(tc, result) for tc, result in zip(last_message.tool_calls, results)]
         
     return {"messages": tool_messages}
 
+def _fast_path_route(state: AgentState):
+    messages = state["messages"]
+    last_message = messages[-1]
+    if not isinstance(last_message, HumanMessage) or not isinstance(last_message.content, str):
+        return None
+    # Several unanswered messages (coalesced into one run) need the model to answer them all
+    if len(messages) > 1 and isinstance(messages[-2], HumanMessage):
+        return None
+    routed = fast_path.route(last_message.content)
+    if routed is None:
+        fast_path.router_stats.record("misses")
+    return routed
+
+def _fast_path_messages(tool_name, arguments, result):
+    answer = fast_path.render(tool_name, result)
+    if answer is None:
+        fast_path.router_stats.record("fallbacks")
+        return []
+    fast_path.router_stats.record("hits")
+    # Same message shape the agent would produce, so history and follow-ups look identical
+    tool_call = {"id": f"fastpath_{uuid.uuid4().hex[:12]}", "name": tool_name, "args": arguments}
+    return [
+        AIMessage(content="", tool_calls=[tool_call]),
+        _tool_message(tool_call, result),
+        AIMessage(content=answer),
+    ]
+
+def router_node(state: AgentState):
+    """
+    Answers high-confidence simple queries directly from a tool and a template.
+    Adds no messages when the query should go to the agent.
+    """
+    routed = _fast_path_route(state)
+    if routed is None:
+        return {"messages": []}
+    tool_name, arguments = routed
+    print(f"  [Fast Path]: {tool_name}({arguments})")
+    return {"messages": _fast_path_messages(tool_name, arguments, execute_tool_call(tool_name, arguments))}
+
+async def arouter_node(state: AgentState):
+    """
+    Async version of router_node.
+    """
+    routed = _fast_path_route(state)
+    if routed is None:
+        return {"messages": []}
+    tool_name, arguments = routed
+    print(f"  [Fast Path]: {tool_name}({arguments})")
+    try:
+        result = await asyncio.wait_for(aexecute_tool_call(tool_name, arguments), _tool_timeout(tool_name))
+    except asyncio.TimeoutError:
+        result = _timeout_message(tool_name)
+    return {"messages": _fast_path_messages(tool_name, arguments, result)}
+
+def after_router(state: AgentState):
+    """
+    Ends the run if the router answered, otherwise hands over to the agent.
+    """
+    last_message = state["messages"][-1]
+    if isinstance(last_message, AIMessage) and not last_message.tool_calls:
+        return "end"
+    return "agent"
+
 def should_continue(state: AgentState):
     """
     Determines if we should continue to tool node or end.
@@ -129,10 +345,24 @@ def should_continue(state: AgentState):
 
 workflow = StateGraph(AgentState)
 
-workflow.add_node("agent", agent_node)
-workflow.add_node("tools", tool_node)
+# Each node carries a sync and an async implementation: app.invoke() uses the
+# former, app.ainvoke()/astream_events() the latter without any thread hop.
+workflow.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node, name="agent"))
+workflow.add_node("tools", RunnableLambda(tool_node, afunc=atool_node, name="tools"))
 
-workflow.set_entry_point("agent")
+if FAST_PATH_ENABLED:
+    workflow.add_node("router", RunnableLambda(router_node, afunc=arouter_node, name="router"))
+    workflow.set_entry_point("router")
+    workflow.add_conditional_edges(
+        "router",
+        after_router,
+        {
+            "agent": "agent",
+            "end": END
+        }
+    )
+else:
+    workflow.set_entry_point("agent")
 
 workflow.add_conditional_edges(
     "agent",
@@ -147,6 +377,46 @@ workflow.add_edge("tools", "agent")
 
 app = workflow.compile()
 
+# --- Response Cache ---
+
+def lookup_response(messages):
+    """
+    Returns (query, cached run messages). query is None when the conversation is not
+    cacheable (see response_cache.single_turn_query); cached is None on a miss.
+    """
+    query = single_turn_query(messages) if RESPONSE_CACHE_ENABLED else None
+    if query is None:
+        return None, None
+    return query, response_cache.get(query)
+
+def store_response(query, run_messages):
+    if query is not None:
+        response_cache.set(query, run_messages)
+
+def invoke(inputs):
+    """
+    app.invoke behind the response cache; returns the same final state shape.
+    """
+    messages = list(inputs["messages"])
+    query, cached = lookup_response(messages)
+    if cached is not None:
+        return {"messages": messages + cached}
+    final_state = app.invoke(inputs)
+    store_response(query, final_state["messages"][len(messages):])
+    return final_state
+
+async def ainvoke(inputs):
+    """
+    Async version of invoke.
+    """
+    messages = list(inputs["messages"])
+    query, cached = lookup_response(messages)
+    if cached is not None:
+        return {"messages": messages + cached}
+    final_state = await app.ainvoke(inputs)
+    store_response(query, final_state["messages"][len(messages):])
+    return final_state
+
 # --- CLI Loop (Legacy/Testing) ---
 
 def main():
@@ -156,9 +426,7 @@ def main():
     print("--------------------------------------------------")
     
     # Initial system message is vital for behavior
-    conversation_history = [
-        SystemMessage(content="You are a helpful travel assistant. You have access to tools specifically for weather, attractions, distance, and packing. Use them when needed. Always respond in a slightly excited, helpful tone.")
-    ]
+    conversation_history = [prompting.SYSTEM_MESSAGE]
     
     while True:
         try:
@@ -173,7 +441,7 @@ def main():
             inputs = {"messages": conversation_history}
             
             # Run the graph
-            final_state = app.invoke(inputs)
+            final_state = invoke(inputs)
             
             # Upgrade history
             conversation_history = final_state["messages"]
@@ -0,0 +1,192 @@
+"""
+Attraction catalog for the search_attractions tool.
+POIs are loaded once (JSON, CSV or SQLite) and built into per-city indexes by
+category and price bucket, each kept sorted by rating, so a query costs a
+dictionary lookup plus a binary search instead of a scan over every POI.
+"""
+
+import bisect
+import csv
+import difflib
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import unicodedata
+
+DEFAULT_CATALOG_PATH = os.environ.get(
+    "ATTRACTIONS_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "attractions.json"),
+)
+
+# Fields returned to the model for each attraction
+RESULT_FIELDS = ("name", "category", "rating", "price", "description")
+
+
+def normalize_city(city: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", city or "").casefold().replace(",", " ").split())
+
+
+class CityIndex:
+    """
+    All attractions of one city, sorted by rating (highest first), plus position
+    lists per category and per (category, price) pair in the same order.
+    """
+
+    def __init__(self, records):
+        self.items = sorted(records, key=lambda r: (-r["rating"], r["name"]))
+        self.by_category = {}
+        self.by_category_price = {}
+        for position, item in enumerate(self.items):
+            self.by_category.setdefault(item["category"], []).append(position)
+            self.by_category_price.setdefault((item["category"], item["price"]), []).append(position)
+        # Negated ratings are ascending, so bisect finds the rating cut-off
+        self.neg_ratings = [-item["rating"] for item in self.items]
+
+    def search(self, category: str, price_range: str = None, min_rating: float = 0.0):
+        """
+        Returns (positions, count): the first `count` entries of `positions` index
+        the matching items in rating order. Nothing is copied until a page is taken.
+        """
+        # Categories match by substring, so "museum" also finds "art museum" and "museums"
+        if price_range:
+            lists = [p for (c, price), p in self.by_category_price.items() if category in c and price == price_range]
+        else:
+            lists = [p for c, p in self.by_category.items() if category in c]
+        positions = lists[0] if len(lists) == 1 else list(heapq.merge(*lists))
+        # Positions are in rating order: everything before `cutoff` meets min_rating
+        cutoff = bisect.bisect_right(self.neg_ratings, -(min_rating or 0.0))
+        return positions, bisect.bisect_left(positions, cutoff)
+
+
+class AttractionCatalog:
+    """
+    Indexed attraction store. Build it from records with keys
+    city, name, category, rating, price and description.
+    """
+
+    def __init__(self, records):
+        grouped = {}
+        for record in records:
+            record = dict(record)
+            record["category"] = record["category"].strip().lower()
+            record["price"] = (record.get("price") or "").strip().lower()
+            record["rating"] = float(record.get("rating") or 0.0)
+            grouped.setdefault(normalize_city(record.pop("city")), []).append(record)
+        self.cities = {city: CityIndex(items) for city, items in grouped.items()}
+        self._city_keys = sorted(self.cities)
+        self._lock = threading.Lock()
+        self._resolved = {}  # memoized query -> city key (or None)
+
+    # --- Loaders ---
+
+    @classmethod
+    def from_json(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_csv(cls, path: str):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(csv.DictReader(f))
+
+    @classmethod
+    def from_sqlite(cls, path: str, table: str = "attractions"):
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(
+                f"SELECT city, name, category, rating, price, description FROM {table}"
+            ).fetchall()
+        finally:
+            conn.close()
+        return cls(dict(row) for row in rows)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CATALOG_PATH):
+        """
+        Picks the loader from the file extension (.json, .csv, .sqlite/.sqlite3/.db).
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            return cls.from_csv(path)
+        if ext in (".sqlite", ".sqlite3", ".db"):
+            return cls.from_sqlite(path)
+        return cls.from_json(path)
+
+    # --- Lookup ---
+
+    def resolve_city(self, query: str):
+        """
+        Maps a free-form location to a catalog city: exact match, a known city
+        contained in the query ("Paris, France"), a prefix ("new" -> "new york"),
+        then a fuzzy match for typos. Returns None when nothing is close.
+        """
+        key = normalize_city(query)
+        if key in self._resolved:
+            return self._resolved[key]
+
+        found = None
+        if key in self.cities:
+            found = key
+        else:
+            words = key.split()
+            # Longest word n-gram first, so "new york city" resolves to "new york" rather than "york"
+            for size in range(min(len(words), 4), 0, -1):
+                for start in range(len(words) - size + 1):
+                    candidate = " ".join(words[start:start + size])
+                    if candidate in self.cities:
+                        found = candidate
+                        break
+                if found:
+                    break
+        if found is None and key:
+            i = bisect.bisect_left(self._city_keys, key)
+            if i < len(self._city_keys) and self._city_keys[i].startswith(key):
+                found = self._city_keys[i]
+        if found is None and key:
+            close = difflib.get_close_matches(key, self._city_keys, n=1, cutoff=0.85)
+            found = close[0] if close else None
+
+        with self._lock:
+            if len(self._resolved) >= 4096:
+                self._resolved.clear()
+            self._resolved[key] = found
+        return found
+
+    def search(self, location: str, category: str, price_range: str = None, min_rating: float = 0.0,
+               limit: int = None, offset: int = 0):
+        """
+        Returns (page, total) for a city, or (None, 0) if the city is not in the catalog.
+        Results are ordered by rating, so `limit` gives the top-k.
+        """
+        city = self.resolve_city(location)
+        if city is None:
+            return None, 0
+        index = self.cities[city]
+        positions, total = index.search(category.strip().lower(), price_range, min_rating)
+        end = total if limit is None else min(total, offset + limit)
+        page = [{field: index.items[p][field] for field in RESULT_FIELDS} for p in positions[offset:end]]
+        return page, total
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> AttractionCatalog:
+    """
+    Shared catalog, loaded from ATTRACTIONS_CATALOG_PATH on first use.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = AttractionCatalog.load()
+    return _catalog
+
+
+def set_catalog(catalog: AttractionCatalog):
+    global _catalog
+    _catalog = catalog
@@ -0,0 +1,77 @@
+"""
+Archiving of cold conversations.
+
+A conversation idle for CHAT_ARCHIVE_AFTER_DAYS can be packed: all of its
+message rows become one compressed blob on the Conversation, and its graph
+checkpoints are dropped (the next turn rebases from history). It is restored
+transparently, with the original message ids and timestamps, the first time its
+history is needed again: when the chat page is rendered or a socket loads history.
+
+    python manage.py archive_conversations [--days N]
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .compression import pack, unpack
+from .models import Conversation, GraphCheckpoint, GraphCheckpointWrite, Message
+
+ARCHIVE_AFTER_DAYS = getattr(settings, "CHAT_ARCHIVE_AFTER_DAYS", 30)
+
+ARCHIVED_FIELDS = ("id", "sender", "tool_calls", "tool_call_id", "tool_name")
+
+
+def archive_conversation(conversation_id) -> int:
+    """
+    Packs a conversation's messages into its archive blob. Returns the number of messages packed.
+    """
+    with transaction.atomic():
+        rows = list(Message.objects.filter(conversation_id=conversation_id).order_by("id"))
+        if not rows:
+            return 0
+        records = [
+            {**{field: getattr(msg, field) for field in ARCHIVED_FIELDS},
+             "content": msg.content, "timestamp": msg.timestamp.isoformat()}
+            for msg in rows
+        ]
+        Conversation.objects.filter(id=conversation_id).update(archive=pack(records), archived_at=timezone.now())
+        Message.objects.filter(conversation_id=conversation_id).delete()
+        GraphCheckpoint.objects.filter(thread_id=str(conversation_id)).delete()
+        GraphCheckpointWrite.objects.filter(thread_id=str(conversation_id)).delete()
+    return len(records)
+
+
+def restore_conversation(conversation_id) -> int:
+    """
+    Unpacks an archived conversation back into message rows. Returns the number restored.
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.select_for_update().only("archive").get(id=conversation_id)
+        if conversation.archive is None:
+            return 0
+        records = unpack(conversation.archive)
+        messages = [
+            Message(conversation_id=conversation_id, content=record["content"],
+                    **{field: record[field] for field in ARCHIVED_FIELDS})
+            for record in records
+        ]
+        Message.objects.bulk_create(messages)
+        # auto_now_add stamped them on insert; put the original times back
+        for message, record in zip(messages, records):
+            message.timestamp = parse_datetime(record["timestamp"])
+        Message.objects.bulk_update(messages, ["timestamp"])
+        Conversation.objects.filter(id=conversation_id).update(archive=None, archived_at=None)
+    return len(messages)
+
+
+def archive_cold_conversations(days: int = ARCHIVE_AFTER_DAYS) -> int:
+    """
+    Archives every conversation not updated for `days` days. Returns how many were archived.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    cold = list(Conversation.objects.filter(updated_at__lt=cutoff, archived_at__isnull=True).values_list("id", flat=True))
+    return sum(1 for conversation_id in cold if archive_conversation(conversation_id))
@@ -0,0 +1,325 @@
+"""
+Persistent LangGraph checkpoints for the chat graph.
+
+Each conversation is one graph thread (thread_id = the conversation id), saved
+after every step by DjangoCheckpointSaver in the project database. A turn then
+sends only the new user message(s) and the graph continues from the thread's
+saved messages. thread_inputs() decides how the next run starts. If the thread
+has drifted from the socket's history window, it is rebased onto that window.
+A run that died partway (e.g. with its process) resumes from its last saved step.
+While a run is alive, its process holds the thread's lease (a ThreadLease row,
+renewed every few seconds), so no other process resumes or runs the thread
+meanwhile. The lease of a dead process expires after CHAT_RUN_LEASE_SECONDS.
+
+Storage is kept small: each checkpoint is one serialized, zlib-compressed row,
+and only the newest CHAT_CHECKPOINT_KEEP checkpoints of a thread are kept.
+"""
+
+import zlib
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from prompting import assemble
+
+from .history import DEFAULT_TOKEN_BUDGET, estimate_tokens
+from .models import GraphCheckpoint, GraphCheckpointWrite, ThreadLease
+
+# Checkpoints kept per thread; older ones (and their pending writes) are pruned on every put
+CHECKPOINT_KEEP = getattr(settings, "CHAT_CHECKPOINT_KEEP", 2)
+# Once a thread's messages outgrow this, the next turn rebases it onto the summarized history window
+REBASE_TOKENS = getattr(settings, "CHAT_CHECKPOINT_REBASE_TOKENS", 2 * DEFAULT_TOKEN_BUDGET)
+# A thread's lease lapses this many seconds after its run's last renewal (see run leases below)
+LEASE_SECONDS = getattr(settings, "CHAT_RUN_LEASE_SECONDS", 30)
+COMPRESSION_LEVEL = 6
+
+
+def thread_config(thread_id) -> dict:
+    return {"configurable": {"thread_id": str(thread_id)}}
+
+
+def _config(thread_id, checkpoint_ns, checkpoint_id) -> dict:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class DjangoCheckpointSaver(BaseCheckpointSaver):
+    """
+    BaseCheckpointSaver over the GraphCheckpoint and GraphCheckpointWrite models.
+    The sync methods hit the database directly; the async ones run them through sync_to_async.
+    """
+
+    def __init__(self, keep: int = CHECKPOINT_KEEP, serde=None):
+        super().__init__(serde=serde)
+        self.keep = keep
+
+    def _dumps(self, value):
+        type_, data = self.serde.dumps_typed(value)
+        return type_, zlib.compress(data, COMPRESSION_LEVEL)
+
+    def _loads(self, type_, data):
+        return self.serde.loads_typed((type_, zlib.decompress(bytes(data))))
+
+    def _tuple(self, row) -> CheckpointTuple:
+        writes = GraphCheckpointWrite.objects.filter(
+            thread_id=row.thread_id, checkpoint_ns=row.checkpoint_ns, checkpoint_id=row.checkpoint_id
+        ).order_by("task_path", "task_id", "idx")
+        return CheckpointTuple(
+            config=_config(row.thread_id, row.checkpoint_ns, row.checkpoint_id),
+            checkpoint=self._loads(row.type, row.checkpoint),
+            metadata=row.metadata,
+            parent_config=(
+                _config(row.thread_id, row.checkpoint_ns, row.parent_checkpoint_id)
+                if row.parent_checkpoint_id else None
+            ),
+            pending_writes=[(w.task_id, w.channel, self._loads(w.type, w.value)) for w in writes],
+        )
+
+    # --- Reads ---
+
+    def get_tuple(self, config):
+        configurable = config["configurable"]
+        rows = GraphCheckpoint.objects.filter(
+            thread_id=configurable["thread_id"], checkpoint_ns=configurable.get("checkpoint_ns", "")
+        )
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            rows = rows.filter(checkpoint_id=checkpoint_id)
+        # Checkpoint ids are time-ordered, so the newest sorts last
+        row = rows.order_by("-checkpoint_id").first()
+        return self._tuple(row) if row is not None else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        rows = GraphCheckpoint.objects.all()
+        if config:
+            configurable = config["configurable"]
+            rows = rows.filter(thread_id=configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                rows = rows.filter(checkpoint_ns=configurable["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                rows = rows.filter(checkpoint_id=get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            rows = rows.filter(checkpoint_id__lt=get_checkpoint_id(before))
+        for row in rows.order_by("-checkpoint_id"):
+            if filter and any(row.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    return
+                limit -= 1
+            yield self._tuple(row)
+
+    # --- Writes ---
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, data = self._dumps(checkpoint)
+        GraphCheckpoint.objects.update_or_create(
+            thread_id=thread_id, checkpoint_ns=checkpoint_ns, checkpoint_id=checkpoint["id"],
+            defaults={
+                "parent_checkpoint_id": configurable.get("checkpoint_id") or "",
+                "type": type_,
+                "checkpoint": data,
+                "metadata": get_checkpoint_metadata(config, metadata),
+            },
+        )
+        self._prune_thread(thread_id, checkpoint_ns, self.keep)
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        configurable = config["configurable"]
+        key = {
+            "thread_id": configurable["thread_id"],
+            "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+            "checkpoint_id": configurable["checkpoint_id"],
+        }
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, data = self._dumps(value)
+            if idx < 0:
+                # Special writes (errors, interrupts) replace an earlier one for the same task
+                GraphCheckpointWrite.objects.update_or_create(
+                    **key, task_id=task_id, idx=idx,
+                    defaults={"task_path": task_path, "channel": channel, "type": type_, "value": data},
+                )
+            else:
+                rows.append(GraphCheckpointWrite(**key, task_id=task_id, idx=idx, task_path=task_path,
+                                                 channel=channel, type=type_, value=data))
+        # Regular writes are idempotent: a retried task keeps its first result
+        GraphCheckpointWrite.objects.bulk_create(rows, ignore_conflicts=True)
+
+    # --- Pruning ---
+
+    def _prune_thread(self, thread_id, checkpoint_ns, keep):
+        if keep is None:
+            return
+        stale = list(
+            GraphCheckpoint.objects.filter(thread_id=thread_id, checkpoint_ns=checkpoint_ns)
+            .order_by("-checkpoint_id").values_list("checkpoint_id", flat=True)[keep:]
+        )
+        if stale:
+            GraphCheckpoint.objects.filter(thread_id=thread_id, checkpoint_ns=checkpoint_ns,
+                                           checkpoint_id__in=stale).delete()
+            GraphCheckpointWrite.objects.filter(thread_id=thread_id, checkpoint_ns=checkpoint_ns,
+                                                checkpoint_id__in=stale).delete()
+
+    def prune(self, thread_ids, *, strategy="keep_latest"):
+        """
+        "keep_latest" keeps the newest checkpoint per namespace; "delete" removes the threads.
+        """
+        for thread_id in thread_ids:
+            if strategy == "delete":
+                self.delete_thread(thread_id)
+                continue
+            namespaces = GraphCheckpoint.objects.filter(thread_id=thread_id).values_list("checkpoint_ns", flat=True)
+            for checkpoint_ns in set(namespaces):
+                self._prune_thread(thread_id, checkpoint_ns, 1)
+
+    def delete_thread(self, thread_id):
+        GraphCheckpoint.objects.filter(thread_id=str(thread_id)).delete()
+        GraphCheckpointWrite.objects.filter(thread_id=str(thread_id)).delete()
+
+    # --- Async ---
+
+    async def aget_tuple(self, config):
+        return await sync_to_async(self.get_tuple)(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        tuples = await sync_to_async(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )()
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await sync_to_async(self.put)(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await sync_to_async(self.put_writes)(config, writes, task_id, task_path)
+
+    async def aprune(self, thread_ids, *, strategy="keep_latest"):
+        await sync_to_async(self.prune)(thread_ids, strategy=strategy)
+
+    async def adelete_thread(self, thread_id):
+        await sync_to_async(self.delete_thread)(thread_id)
+
+
+checkpointer = DjangoCheckpointSaver()
+
+
+# --- Run leases ---
+
+def claim_thread(thread_id, owner: str) -> bool:
+    """
+    Takes the thread's lease for `owner` unless another owner holds a live one.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=LEASE_SECONDS)
+    with transaction.atomic():
+        if ThreadLease.objects.filter(thread_id=str(thread_id), expires_at__lte=now).update(
+                owner=owner, expires_at=expires_at):
+            return True
+        _, created = ThreadLease.objects.get_or_create(
+            thread_id=str(thread_id), defaults={"owner": owner, "expires_at": expires_at}
+        )
+        return created
+
+
+def renew_thread(thread_id, owner: str) -> bool:
+    return bool(ThreadLease.objects.filter(thread_id=str(thread_id), owner=owner).update(
+        expires_at=timezone.now() + timedelta(seconds=LEASE_SECONDS)
+    ))
+
+
+def release_thread(thread_id, owner: str):
+    ThreadLease.objects.filter(thread_id=str(thread_id), owner=owner).delete()
+
+
+def thread_claimed(thread_id) -> bool:
+    """
+    Whether a live run (in any process) holds the thread.
+    """
+    return ThreadLease.objects.filter(thread_id=str(thread_id), expires_at__gt=timezone.now()).exists()
+
+
+# --- Run planning ---
+
+def _same(a, b) -> bool:
+    return a.type == b.type and a.content == b.content
+
+
+def _ends_alike(thread_part, history_part) -> bool:
+    if not history_part:
+        return all(isinstance(m, SystemMessage) for m in thread_part)
+    return bool(thread_part) and _same(thread_part[-1], history_part[-1])
+
+
+def _unanswered_start(messages) -> int:
+    """
+    Index of the first user message after the last final answer (an AI message without
+    tool calls), or len(messages). Every user message from there on is unanswered, even
+    with other messages (e.g. a stopped run's tool exchanges) in between.
+    """
+    start = len(messages)
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, AIMessage) and not message.tool_calls:
+            break
+        if isinstance(message, HumanMessage):
+            start = index
+    return start
+
+
+def _last_turn(messages):
+    """
+    Splits messages into (before, humans, produced) around the last run of user messages.
+    """
+    end = len(messages)
+    while end and not isinstance(messages[end - 1], HumanMessage):
+        end -= 1
+    start = end
+    while start and isinstance(messages[start - 1], HumanMessage):
+        start -= 1
+    return messages[:start], messages[start:end], messages[end:]
+
+
+def thread_inputs(thread_messages, pending: bool, history):
+    """
+    How the next run of a thread starts, given the thread's checkpointed messages,
+    whether its last run stopped partway (pending nodes), and the socket's history
+    window. Returns (graph input, carried messages):
+
+    - Resume: the run stopped partway through answering exactly the messages that
+      history still has unanswered. Input is None and the graph continues from
+      its last step; carried holds what that run had already produced.
+    - Continue: the thread ends where history's answered part ends. Input is only
+      the unanswered messages: everything from the first user message after the last answer.
+    - Rebase otherwise (new thread, out of sync, or grown past REBASE_TOKENS).
+      The thread's messages are replaced by the history window.
+    """
+    start = _unanswered_start(history)
+    answered, unanswered = history[:start], history[start:]
+    if thread_messages and unanswered:
+        before, humans, produced = _last_turn(thread_messages)
+        if pending:
+            if len(humans) == len(unanswered) and all(map(_same, humans, unanswered)) and _ends_alike(before, answered):
+                return None, list(produced)
+        elif (_ends_alike(thread_messages, answered)
+              and not (isinstance(thread_messages[-1], AIMessage) and thread_messages[-1].tool_calls)
+              and sum(estimate_tokens(str(m.content)) for m in thread_messages) <= REBASE_TOKENS):
+            return {"messages": unanswered}, []
+    return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *assemble(history)]}, []
@@ -0,0 +1,53 @@
+"""
+Compact storage for message bodies.
+
+Short bodies stay plain text. Bodies of CHAT_COMPRESS_MIN_BYTES or more are
+zlib-compressed, unless that does not make them smaller. Every message also gets
+a short preview for listings, __str__ and titles, so those never touch the body.
+Conversation archives (see chat/archive.py) pack all of a conversation's
+messages into one compressed blob.
+"""
+
+import json
+import zlib
+
+from django.conf import settings
+
+COMPRESS_MIN_BYTES = getattr(settings, "CHAT_COMPRESS_MIN_BYTES", 512)
+COMPRESSION_LEVEL = 6
+PREVIEW_LENGTH = 120  # Message.preview max_length
+
+
+def encode_body(text: str):
+    """
+    Returns (body, body_z): the text itself, or "" plus its compressed bytes.
+    """
+    text = text or ""
+    data = text.encode("utf-8")
+    if len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, COMPRESSION_LEVEL)
+        if len(packed) < len(data):
+            return "", packed
+    return text, None
+
+
+def decode_body(body: str, body_z) -> str:
+    if body_z is not None:
+        return zlib.decompress(bytes(body_z)).decode("utf-8")
+    return body
+
+
+def preview_of(text: str) -> str:
+    # A plain prefix, so titles built from it match ones built from the full text
+    return (text or "")[:PREVIEW_LENGTH]
+
+
+def pack(records) -> bytes:
+    """
+    Compresses a list of JSON-able dicts into one blob.
+    """
+    return zlib.compress(json.dumps(records, separators=(",", ":")).encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def unpack(blob) -> list:
+    return json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
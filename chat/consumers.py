@@ -1,15 +1,18 @@
 import json
 import uuid
+import asyncio
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
-from django.utils import timezone
 
-from .models import Conversation, Message
+from .history import HistoryManager, completed_messages, message_from_langchain
+from .persistence import ConversationSession, WRITE_BEHIND_INTERVAL
+from .runs import dump_messages, has_interrupted_run, load_messages, run_thread
+from .scheduler import COALESCED, QUEUED, REJECTED, RETRY_AFTER, scheduler
+from .workers import AGENT_RUN_CHANNEL, WORKER_MODE, WORKER_RUN_TIMEOUT
 # Import the agent graph - we need to make sure agent.py is importable
 # We'll need to modify agent.py slightly to expose a runable function that doesn't use the CLI loop
-from agent import app as agent_app
-from langchain_core.messages import HumanMessage, AIMessage
+from agent import lookup_response, store_response
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +20,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.conversation_id = self.scope['url_route']['kwargs'].get('conversation_id')
         self.user_group_name = f"chat_{self.conversation_id}"
+        # Cached, windowed history and persistence unit of work for the lifetime of this socket
+        self.history = HistoryManager(self.conversation_id)
+        self.session = ConversationSession(self.conversation_id)
+        self.flush_task = None
+        self.worker_run = None  # future resolved by agent_done in worker mode
+        self.worker_cancel = None  # channel that cancels the worker's current run
+        self.disconnected = False
+        # Held while a user message is saved, so a run reserved for it reads the history only after
+        self.history_lock = asyncio.Lock()
+        self.turn_running = False  # whether this socket's run is in flight
+        self.held = []  # user messages sent meanwhile, saved once the run's messages are
 
         # Join room group
         await self.channel_layer.group_add(
@@ -26,97 +40,254 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        # Crash recovery: a run that died partway (e.g. with its process) picks up from its last saved step
+        if await self.has_unanswered_run():
+            scheduler.submit(self.conversation_id, self.run_turn)
+
     async def disconnect(self, close_code):
+        # Abort this socket's runs: nobody is left to read the answer
+        self.disconnected = True
+        task = scheduler.cancel(self.conversation_id, run=self.run_turn)
+        if task is not None:
+            await asyncio.wait({task})
+
         # Leave room group
         await self.channel_layer.group_discard(
             self.user_group_name,
             self.channel_name
         )
 
+        # Write out anything still queued by write-behind persistence
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        await sync_to_async(self.session.flush)()
+
     # Receive message from WebSocket
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
+        if text_data_json.get('type') == 'stop':
+            # Every socket of the conversation (in any process) stops the runs it owns
+            await self.channel_layer.group_send(self.user_group_name, {'type': 'agent.stop'})
+            return
         message_content = text_data_json.get('message')
-        
-        # 1. Save User Message
-        user_msg_obj = await self.save_message(self.conversation_id, 'user', message_content)
-        
-        # 2. Update Title if needed (async wrapper needed?)
-        await self.update_conversation_title_if_needed(self.conversation_id, message_content)
-
-        # 3. Retrieve Conversation History for Agent
-        history = await self.get_conversation_history(self.conversation_id)
-        
-        # 4. Invoke Agent
-        # Prepare inputs
-        inputs = {"messages": history}
-        
-        # Stream response
-        # Using aconfig to ensure async compat or just run in executors if agent is sync
-        # LangGraph app.stream is usable.
-        
-        ai_response_content = ""
-        
+
+        async with self.history_lock:
+            # 1. Reserve the agent run: one at a time per conversation, coalescing this socket's
+            # messages sent while a run is in flight, within the process-wide concurrency limit.
+            # Backpressure: a rejected message is refused before anything is saved
+            outcome, position = scheduler.submit(self.conversation_id, self.run_turn)
+            if outcome == REJECTED:
+                await self.send_busy()
+                return
+
+            # 2. Save User Message (title + updated_at ride along), in one DB hop. While this
+            # socket's run is in flight the message is held back (see end_turn), so history
+            # and the DB keep the order question, answer, follow-up
+            if self.turn_running:
+                self.held.append(message_content)
+            else:
+                await sync_to_async(self.begin_turn)(message_content)
+        self.schedule_flush()
+
+        if outcome in (QUEUED, COALESCED):
+            await self.send_frame({
+                'type': 'queued',
+                'position': position,
+                'coalesced': outcome == COALESCED
+            })
+
+    async def has_unanswered_run(self):
+        if self.conversation_id in scheduler.running or scheduler.position(self.conversation_id):
+            return False
+        history = await sync_to_async(self.history.load)()
+        if not history or history[-1].type != "human":
+            return False
+        return await has_interrupted_run(str(self.conversation_id))
+
+    async def send_busy(self):
+        await self.send_frame({
+            'type': 'busy',
+            'message': 'The assistant is busy right now, please try again shortly.',
+            'retry_after': RETRY_AFTER
+        })
+
+    async def run_turn(self):
+        """
+        One agent run over the history as it is when the run starts, so every
+        message coalesced into this run is answered at once. Cancellable: see agent_stop and disconnect.
+        """
+        run_messages = []
         try:
-            # We'll stream chunks. 
-            # Note: app.stream yields state updates. Getting partial tokens might need specific LLM stream config.
-            # For this setup, we will just send the final response or intermediate tool calls.
-            # For better UX, we'd want streaming tokens, but LangGraph defaults to state updates.
-            
-            final_state = await sync_to_async(agent_app.invoke)(inputs)
-            
-            # Extract only the NEW messages
-            # The agent might return multiple messages (tool calls + final answer)
-            
-            # Simple logic: get the last message
-            last_message = final_state['messages'][-1]
+            async with self.history_lock:
+                self.turn_running = True
+                history = await sync_to_async(self.history.load)()
+
+            # Repeated single-turn questions are answered from the response cache
+            query, cached_messages = lookup_response(history)
+            if cached_messages is not None:
+                run_messages = cached_messages
+                ai_response_content = run_messages[-1].content
+            elif WORKER_MODE:
+                await self.run_in_worker(query, history)
+                return
+            else:
+                ai_response_content = await self.stream_agent_response(history, run_messages)
+                if ai_response_content is not None:
+                    store_response(query, run_messages)
             
-            if isinstance(last_message, AIMessage):
-                ai_response_content = last_message.content
-                
-                # Send back to WebSocket
-                await self.send(text_data=json.dumps({
-                    'type': 'ai_response',
-                    'message': ai_response_content,
-                    'is_final': True
-                }))
-                
-                # Save AI Message
-                await self.save_message(self.conversation_id, 'ai', ai_response_content)
+            if ai_response_content is not None:
+                # The run is complete from here on; a late stop must not persist it twice
+                completed, run_messages = run_messages, []
+                await self.finish_run(completed, ai_response_content)
                 
+        except asyncio.CancelledError:
+            await self.abandon_run(run_messages)
+            raise
         except Exception as e:
             logger.error(f"Error in agent execution: {e}")
             await self.send(text_data=json.dumps({
                 'error': str(e)
             }))
+        finally:
+            await self.end_turn()
 
+    async def end_turn(self):
+        """
+        Saves the user messages held back while the run was in flight, after the run's own,
+        so the follow-up run finds them unanswered at the end of the history.
+        """
+        async with self.history_lock:
+            self.turn_running = False
+            held, self.held = self.held, []
+            if held:
+                await sync_to_async(self.begin_turn)(*held)
+        self.schedule_flush()
 
-    @sync_to_async
-    def save_message(self, conversation_id, sender, content):
-        conversation = Conversation.objects.get(id=conversation_id)
-        msg = Message.objects.create(conversation=conversation, sender=sender, content=content)
-        conversation.save() # Update updated_at
+    async def run_in_worker(self, query, history):
+        """
+        Hands the run to a worker (chat/workers.py) and holds the conversation's
+        slot until the worker reports back through agent_done.
+        """
+        self.worker_run = asyncio.get_running_loop().create_future()
+        self.worker_cancel = await self.channel_layer.new_channel("agent-cancel")
+        try:
+            await self.channel_layer.send(AGENT_RUN_CHANNEL, {
+                'type': 'agent.run',
+                'group': self.user_group_name,
+                'reply_channel': self.channel_name,
+                'cancel_channel': self.worker_cancel,
+                'thread_id': str(self.conversation_id),
+                'query': query,
+                'messages': dump_messages(history),
+            })
+            await asyncio.wait_for(self.worker_run, WORKER_RUN_TIMEOUT)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Stop the worker as well, so an abandoned run does not keep calling the LLM
+            await self.channel_layer.send(self.worker_cancel, {'type': 'agent.cancel'})
+            raise
+        finally:
+            self.worker_cancel = None
+
+    async def abandon_run(self, run_messages):
+        """
+        Cleans up after a cancelled run. After an explicit stop, the run's completed
+        tool exchanges are persisted (follow-ups reuse them) and partial text is
+        dropped. After a disconnect, the whole run is discarded.
+        """
+        if self.disconnected:
+            return
+        completed = completed_messages(run_messages)
+        if completed:
+            await sync_to_async(self.record_run)(completed)
+            self.schedule_flush()
+        await self.send_frame({'type': 'stopped'})
+
+    async def stream_agent_response(self, history, run_messages=None):
+        """
+        Runs the conversation's graph thread in this process, forwarding LLM tokens and
+        tool progress to the socket. Only the new messages in `history` are sent to the
+        thread (see chat/checkpoints.py).
+        Returns the content of the final AI message (None if the run produced none).
+        """
+        return await run_thread(str(self.conversation_id), history, self.send_frame, run_messages)
+
+    async def send_frame(self, frame):
+        await self.send(text_data=json.dumps(frame))
+
+    async def finish_run(self, run_messages, ai_response_content):
+        """
+        Sends the final frame and persists a completed run.
+        """
+        # Final frame carries the complete message so the client can re-render it cleanly
+        await self.send_frame({
+            'type': 'ai_response',
+            'message': ai_response_content,
+            'is_final': True
+        })
+
+        # Save the run: tool calls, tool results and the final AI message, so follow-up
+        # turns see the earlier tool data instead of calling the tools again.
+        # Only completed messages are persisted, never partial chunks.
+        await sync_to_async(self.record_run)(run_messages)
+        self.schedule_flush()
+
+    # Worker mode (chat/workers.py): frames for everyone in the conversation's group,
+    # the finished run only for the socket that started it
+
+    async def agent_frame(self, event):
+        if event.get("origin") == self.channel_name:
+            return
+        await self.send_frame(event["frame"])
+
+    async def agent_stop(self, event):
+        in_worker = self.worker_cancel is not None
+        # Pending runs are dropped; a worker's run is cancelled through its cancel channel
+        task = scheduler.cancel(self.conversation_id, run=self.run_turn, pending_only=in_worker)
+        if in_worker:
+            await self.channel_layer.send(self.worker_cancel, {'type': 'agent.cancel'})
+        elif task is None:
+            # Nothing of ours was running (abandon_run reports otherwise); clear the client's progress
+            await self.send_frame({'type': 'stopped'})
+
+    async def agent_done(self, event):
+        try:
+            if event.get("error"):
+                await self.send_frame({'error': event["error"]})
+            elif event.get("cancelled"):
+                await self.abandon_run(load_messages(event["run_messages"]))
+            elif event.get("final") is not None:
+                run_messages = load_messages(event["run_messages"])
+                store_response(event.get("query"), run_messages)
+                await self.finish_run(run_messages, event["final"])
+        finally:
+            if self.worker_run is not None and not self.worker_run.done():
+                self.worker_run.set_result(None)
+
+    def begin_turn(self, *contents):
+        """
+        Persists the user's message(s). The run reads the history when it starts.
+        """
+        self.history.load()  # picks up rows written by other sockets since the last load
+        for content in contents:
+            self.record_message('user', content)
+
+    def record_message(self, sender, content):
+        msg = self.session.record_message(sender, content)
+        self.history.append(msg)
         return msg
 
-    @sync_to_async
-    def update_conversation_title_if_needed(self, conversation_id, content):
-        conversation = Conversation.objects.get(id=conversation_id)
-        if conversation.title == "New Conversation":
-            # Use first 30 chars
-            conversation.title = (content[:30] + '..') if len(content) > 30 else content
-            conversation.save()
-
-    @sync_to_async
-    def get_conversation_history(self, conversation_id):
-        conversation = Conversation.objects.get(id=conversation_id)
-        messages = conversation.messages.all().order_by('timestamp')
-        
-        # Convert DB messages to LangChain messages
-        lc_messages = []
-        for msg in messages:
-            if msg.sender == 'user':
-                lc_messages.append(HumanMessage(content=msg.content))
-            elif msg.sender == 'ai':
-                lc_messages.append(AIMessage(content=msg.content))
-        
-        return lc_messages
+    def record_run(self, lc_messages):
+        messages = self.session.record_messages([message_from_langchain(m) for m in lc_messages])
+        self.history.extend(messages)
+        return messages
+
+    def schedule_flush(self):
+        # Write-behind: flush queued messages shortly after the first one is queued
+        if self.session.pending and self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(WRITE_BEHIND_INTERVAL)
+        self.flush_task = None
+        await sync_to_async(self.session.flush)()
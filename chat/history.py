@@ -0,0 +1,227 @@
+"""
+Conversation history management for ChatConsumer.
+
+Keeps the last few turns verbatim and folds older turns into a rolling summary
+stored on the Conversation, so both DB reads and LLM input tokens per turn stay
+bounded. One HistoryManager lives for the lifetime of a WebSocket connection and
+reads the database once; after that the consumer appends each new message as it
+is written, so later turns cost no history queries at all.
+"""
+
+from django.conf import settings
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+
+from .archive import restore_conversation
+from .models import Conversation, Message
+
+# Name used to tag the summary message so the agent still adds its own system prompt
+SUMMARY_MESSAGE_NAME = "conversation_summary"
+
+DEFAULT_TOKEN_BUDGET = getattr(settings, "CHAT_HISTORY_TOKEN_BUDGET", 3000)
+DEFAULT_KEEP_TURNS = getattr(settings, "CHAT_HISTORY_KEEP_TURNS", 6)
+SUMMARY_MAX_TOKENS = getattr(settings, "CHAT_HISTORY_SUMMARY_MAX_TOKENS", 600)
+# Tool outputs older than this many turns are clipped to TOOL_OUTPUT_STALE_CHARS (None disables)
+TOOL_OUTPUT_FRESH_TURNS = getattr(settings, "CHAT_HISTORY_TOOL_OUTPUT_FRESH_TURNS", 2)
+TOOL_OUTPUT_STALE_CHARS = getattr(settings, "CHAT_HISTORY_TOOL_OUTPUT_STALE_CHARS", 300)
+
+HISTORY_SENDERS = ("user", "ai", "tool")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token), good enough for budgeting.
+    """
+    return len(text or "") // 4 + 1
+
+
+def message_from_langchain(lc_message):
+    """
+    Builds an unsaved Message (sender, content and tool metadata) from a LangChain message.
+    """
+    if isinstance(lc_message, ToolMessage):
+        return Message(sender='tool', content=str(lc_message.content),
+                       tool_call_id=lc_message.tool_call_id, tool_name=lc_message.name or "")
+    if isinstance(lc_message, AIMessage):
+        tool_calls = [
+            {"id": tc["id"], "name": tc["name"], "args": tc["args"]} for tc in lc_message.tool_calls
+        ] or None
+        return Message(sender='ai', content=lc_message.content or "", tool_calls=tool_calls)
+    return Message(sender='user', content=lc_message.content)
+
+
+def message_to_langchain(msg, content: str = None):
+    """
+    Rehydrates a Message into the LangChain message type the agent expects.
+    """
+    content = msg.content if content is None else content
+    if msg.sender == 'user':
+        return HumanMessage(content=content)
+    if msg.sender == 'tool':
+        return ToolMessage(content=content, tool_call_id=msg.tool_call_id, name=msg.tool_name or None)
+    return AIMessage(content=content, tool_calls=msg.tool_calls or [])
+
+
+def completed_messages(run_messages) -> list:
+    """
+    The prefix of an interrupted run that is safe to persist: every AI tool call
+    is followed by all of its results. A trailing tool call whose results never
+    arrived is dropped, since a history with unanswered tool calls is rejected by the model.
+    """
+    completed = 0
+    pending = set()
+    for index, msg in enumerate(run_messages, 1):
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            pending = {tc["id"] for tc in msg.tool_calls}
+        elif isinstance(msg, ToolMessage):
+            pending.discard(msg.tool_call_id)
+        if not pending:
+            completed = index
+    return list(run_messages[:completed])
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def extractive_summary(previous: str, turns) -> str:
+    """
+    Default offline summarizer: one clipped line per folded turn, appended to the
+    previous summary and trimmed from the front to SUMMARY_MAX_TOKENS.
+    `turns` is a list of turns, each a list of Message objects.
+    """
+    lines = [previous] if previous else []
+    for turn in turns:
+        parts = []
+        for msg in turn:
+            if msg.sender == "tool":
+                parts.append(f"Tool {msg.tool_name}: {_clip(msg.content, 120)}")
+            elif msg.content:
+                label = "User" if msg.sender == "user" else "Assistant"
+                parts.append(f"{label}: {_clip(msg.content, 160)}")
+        lines.append(" / ".join(parts))
+    summary = "\n".join(lines)
+    max_chars = SUMMARY_MAX_TOKENS * 4
+    if len(summary) > max_chars:
+        summary = "..." + summary[-max_chars:]
+    return summary
+
+
+class HistoryManager:
+    """
+    Per-connection view of a conversation's history.
+    The DB methods are synchronous; call them through sync_to_async from the consumer.
+    """
+
+    def __init__(self, conversation_id, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 keep_turns: int = DEFAULT_KEEP_TURNS, summarizer=extractive_summary,
+                 tool_output_fresh_turns: int = TOOL_OUTPUT_FRESH_TURNS,
+                 tool_output_stale_chars: int = TOOL_OUTPUT_STALE_CHARS):
+        self.conversation_id = conversation_id
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summarizer = summarizer
+        self.tool_output_fresh_turns = tool_output_fresh_turns
+        self.tool_output_stale_chars = tool_output_stale_chars
+        self.summary = ""
+        self.summary_until_id = 0
+        self.rows = []  # Message objects kept verbatim, oldest first
+        self.read_until_id = 0  # newest row id read from the DB
+        self.loaded = False
+
+    def load(self):
+        """
+        Reads the stored summary on the first call and, on every call, the rows not
+        seen yet (e.g. written by another socket of the conversation) in one indexed
+        query. Then compacts and returns the LangChain message list.
+        """
+        if not self.loaded:
+            conversation = Conversation.objects.only(
+                "summary", "summary_until_message_id", "archived_at"
+            ).get(id=self.conversation_id)
+            if conversation.archived_at is not None:
+                restore_conversation(self.conversation_id)
+            self.summary = conversation.summary
+            self.summary_until_id = self.read_until_id = conversation.summary_until_message_id
+            self.loaded = True
+
+        seen = {m.pk for m in self.rows if m.pk is not None}
+        new_rows = list(
+            Message.objects.filter(conversation_id=self.conversation_id, id__gt=self.read_until_id,
+                                   sender__in=HISTORY_SENDERS)
+            .order_by("id")
+            .only("id", "sender", "body", "body_z", "tool_calls", "tool_call_id", "tool_name")
+        )
+        if new_rows:
+            self.read_until_id = new_rows[-1].pk
+            self.rows.extend(m for m in new_rows if m.pk not in seen)
+            # In DB order; rows not flushed yet (write-behind) are this socket's newest and stay last
+            self.rows.sort(key=lambda m: (m.pk is None, m.pk or 0))
+
+        self.compact()
+        return self.as_messages()
+
+    def append(self, message):
+        """
+        Adds a Message the caller just wrote, so it never needs to be re-read.
+        (With write-behind persistence its pk is filled in once the batch is flushed.)
+        """
+        self.rows.append(message)
+
+    def extend(self, messages):
+        self.rows.extend(messages)
+
+    def _turns(self):
+        turns = []
+        for msg in self.rows:
+            if msg.sender == "user" or not turns:
+                turns.append([])
+            turns[-1].append(msg)
+        return turns
+
+    def token_count(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(m.content) for m in self.rows)
+
+    def compact(self):
+        """
+        Folds the oldest turns into the summary until at most keep_turns remain and
+        the history fits the token budget (the latest turn is always kept verbatim).
+        Turns with rows not flushed yet stay verbatim: summary_until_message_id
+        could not cover them, so they would later be re-read on top of the summary.
+        """
+        turns = self._turns()
+        folded = []
+        tokens = self.token_count()
+        while (len(turns) > 1 and (len(turns) > self.keep_turns or tokens > self.token_budget)
+               and all(m.pk is not None for m in turns[0])):
+            turn = turns.pop(0)
+            tokens -= sum(estimate_tokens(m.content) for m in turn)
+            folded.append(turn)
+        if not folded:
+            return
+
+        self.summary = self.summarizer(self.summary, folded)
+        self.rows = [msg for turn in turns for msg in turn]
+        self.summary_until_id = max(self.summary_until_id, *(m.pk for turn in folded for m in turn))
+        Conversation.objects.filter(id=self.conversation_id).update(
+            summary=self.summary, summary_until_message_id=self.summary_until_id
+        )
+
+    def as_messages(self):
+        lc_messages = []
+        if self.summary:
+            lc_messages.append(SystemMessage(
+                content=f"Summary of the earlier conversation:\n{self.summary}",
+                name=SUMMARY_MESSAGE_NAME,
+            ))
+        turns = self._turns()
+        fresh = self.tool_output_fresh_turns
+        for index, turn in enumerate(turns):
+            stale = fresh is not None and index < len(turns) - fresh
+            for msg in turn:
+                content = None
+                if stale and msg.sender == 'tool' and len(msg.content) > self.tool_output_stale_chars:
+                    # Keep the ToolMessage (every tool call needs an answer) but drop the bulk
+                    content = msg.content[:self.tool_output_stale_chars] + " ...[truncated]"
+                lc_messages.append(message_to_langchain(msg, content))
+        return lc_messages
@@ -0,0 +1,298 @@
+"""
+Multi-process channel layer for ChatConsumer and the agent workers.
+
+SharedChannelLayer keeps channel queues and group membership behind a small
+Redis-compatible client interface (rpush/lpush/lpop/llen, zadd/zrem/zrange/
+zremrangebyscore, expire/delete/scan_iter). Any process that opens the same store sees
+the same queues and groups, so several Daphne processes and `runworker`
+processes can share conversations. Two stores are supported:
+
+- "sqlite:///path/to/layer.sqlite3": SQLiteRedis, a local stand-in over one
+  SQLite file (WAL mode), for single-host deployments and tests.
+- "redis://host:6379/0": a redis-py client (optional dependency) for multi-host
+  deployments.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+# Seconds between polls of an empty queue: starts short, backs off to the maximum
+POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.1
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class SQLiteRedis:
+    """
+    The subset of the Redis command API used by SharedChannelLayer, stored in a
+    SQLite file that several processes can open at once. Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS lists (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL)")
+            if "expires" not in [row[1] for row in conn.execute("PRAGMA table_info(lists)")]:
+                conn.execute("ALTER TABLE lists ADD COLUMN expires REAL")  # stores created before key expiry
+            conn.execute("CREATE INDEX IF NOT EXISTS lists_key ON lists (key, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS lists_expires ON lists (expires)")
+            conn.execute("CREATE TABLE IF NOT EXISTS zsets (key TEXT NOT NULL, member TEXT NOT NULL, score REAL NOT NULL, PRIMARY KEY (key, member))")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _conn(self):
+        return _Transaction(self._connection())
+
+    # --- Lists ---
+
+    def _expiry(self, conn, key):
+        # New rows share the key's expiry, as a Redis key's TTL survives pushes
+        return conn.execute("SELECT MAX(expires) FROM lists WHERE key = ?", (key,)).fetchone()[0]
+
+    def rpush(self, key, *values):
+        with self._conn() as conn:
+            expires = self._expiry(conn, key)
+            conn.executemany("INSERT INTO lists (key, value, expires) VALUES (?, ?, ?)",
+                             [(key, _text(v), expires) for v in values])
+            return conn.execute("SELECT COUNT(*) FROM lists WHERE key = ?", (key,)).fetchone()[0]
+
+    def lpush(self, key, *values):
+        # Ids below the current minimum put the values at the head, the last value first
+        with self._conn() as conn:
+            head = conn.execute("SELECT COALESCE(MIN(id), 1) FROM lists").fetchone()[0]
+            expires = self._expiry(conn, key)
+            conn.executemany(
+                "INSERT INTO lists (id, key, value, expires) VALUES (?, ?, ?, ?)",
+                [(head - i - 1, key, _text(v), expires) for i, v in enumerate(values)],
+            )
+            return conn.execute("SELECT COUNT(*) FROM lists WHERE key = ?", (key,)).fetchone()[0]
+
+    def lpop(self, key):
+        # Idle channels are polled often: check without the write lock first (a WAL read takes none)
+        if self._connection().execute("SELECT 1 FROM lists WHERE key = ? LIMIT 1", (key,)).fetchone() is None:
+            return None
+        with self._conn() as conn:
+            row = conn.execute("SELECT id, value FROM lists WHERE key = ? ORDER BY id LIMIT 1", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM lists WHERE id = ?", (row[0],))
+            return row[1]
+
+    def llen(self, key):
+        with self._conn() as conn:
+            return conn.execute("SELECT COUNT(*) FROM lists WHERE key = ?", (key,)).fetchone()[0]
+
+    # --- Sorted sets ---
+
+    def zadd(self, key, mapping):
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO zsets (key, member, score) VALUES (?, ?, ?)",
+                [(key, _text(member), score) for member, score in mapping.items()],
+            )
+            return len(mapping)
+
+    def zrem(self, key, *members):
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM zsets WHERE key = ? AND member = ?", [(key, _text(m)) for m in members])
+
+    def zrange(self, key, start, end):
+        with self._conn() as conn:
+            members = [row[0] for row in conn.execute(
+                "SELECT member FROM zsets WHERE key = ? ORDER BY score, member", (key,)
+            )]
+        return members[start:None if end == -1 else end + 1]
+
+    def zremrangebyscore(self, key, min_score, max_score):
+        with self._conn() as conn:
+            return conn.execute(
+                "DELETE FROM zsets WHERE key = ? AND score >= ? AND score <= ?", (key, min_score, max_score)
+            ).rowcount
+
+    # --- Keys ---
+
+    def expire(self, key, seconds):
+        """
+        Like Redis EXPIRE for lists: the key's rows go once `seconds` pass without another
+        expire. Rows of every key past their expiry are purged here, so lists of channels
+        nobody reads any more (e.g. sockets that went away) do not pile up.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("UPDATE lists SET expires = ? WHERE key = ?", (now + seconds, key))
+            conn.execute("DELETE FROM lists WHERE expires <= ?", (now,))
+
+    def delete(self, *keys):
+        with self._conn() as conn:
+            for key in keys:
+                conn.execute("DELETE FROM lists WHERE key = ?", (key,))
+                conn.execute("DELETE FROM zsets WHERE key = ?", (key,))
+
+    def scan_iter(self, match: str = "*"):
+        pattern = match.replace("*", "%")
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT key FROM lists WHERE key LIKE ? UNION SELECT DISTINCT key FROM zsets WHERE key LIKE ?",
+                (pattern, pattern),
+            ).fetchall()
+        return iter([row[0] for row in rows])
+
+
+class _Transaction:
+    """
+    `with` block that runs on the thread's connection inside BEGIN IMMEDIATE, so a
+    read-then-delete (lpop) is atomic across processes.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def client_from_url(url: str):
+    """
+    Builds the store client for a layer URL ("sqlite:///<path>" or "redis://...").
+    """
+    if url.startswith("sqlite://"):
+        return SQLiteRedis(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis  # optional dependency, only needed for Redis deployments
+        return redis.Redis.from_url(url)
+    raise ValueError(f"Unsupported channel layer URL: {url}")
+
+
+class SharedChannelLayer(BaseChannelLayer):
+    """
+    Channel layer over a Redis-compatible client. Configure it in CHANNEL_LAYERS:
+
+        {"BACKEND": "chat.layers.SharedChannelLayer",
+         "CONFIG": {"url": "sqlite:///channels.sqlite3"}}
+
+    Pass `client` instead of `url` to supply a store object directly (e.g. in tests).
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, url: str = None, client=None, prefix: str = "asgi", expiry: int = 60,
+                 group_expiry: int = 86400, capacity: int = 100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        self.client = client if client is not None else client_from_url(url or "sqlite:///channels.sqlite3")
+        self.prefix = prefix
+        self.group_expiry = group_expiry
+
+    def _channel_key(self, channel):
+        return f"{self.prefix}:channel:{channel}"
+
+    def _group_key(self, group):
+        return f"{self.prefix}:group:{group}"
+
+    async def _call(self, method, *args):
+        # Store calls block (SQLite file or Redis socket), so they run off the event loop
+        return await asyncio.to_thread(getattr(self.client, method), *args)
+
+    # --- Channels ---
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        assert "__asgi_channel__" not in message
+        key = self._channel_key(channel)
+        envelope = json.dumps({"expires": time.time() + self.expiry, "message": message})
+        if not await asyncio.to_thread(self._push, key, envelope, self.get_capacity(channel)):
+            raise ChannelFull(channel)
+
+    def _push(self, key, envelope, capacity) -> bool:
+        # One thread hop per send. The channel's list expires once nothing has been sent
+        # to it for `expiry` seconds (its messages would have expired by then anyway).
+        if self.client.llen(key) >= capacity:
+            return False
+        self.client.rpush(key, envelope)
+        self.client.expire(key, self.expiry)
+        return True
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        key = self._channel_key(channel)
+        interval = POLL_INTERVAL
+        while True:
+            pop = asyncio.ensure_future(self._call("lpop", key))
+            try:
+                envelope = await asyncio.shield(pop)
+            except asyncio.CancelledError:
+                # Put back a message popped by a receive that was cancelled meanwhile
+                pop.add_done_callback(lambda done: self._requeue(key, done))
+                raise
+            if envelope is None:
+                await asyncio.sleep(interval)
+                interval = min(interval * 2, MAX_POLL_INTERVAL)
+                continue
+            data = json.loads(_text(envelope))
+            if data["expires"] >= time.time():
+                return data["message"]
+
+    def _requeue(self, key, done):
+        # A done callback runs on the event loop, so the store call goes to a thread too
+        if not done.cancelled() and done.exception() is None and done.result() is not None:
+            asyncio.ensure_future(self._call("lpush", key, done.result()))
+
+    async def new_channel(self, prefix="specific"):
+        return f"{prefix}.{uuid.uuid4().hex}"
+
+    # --- Groups ---
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._call("zadd", self._group_key(group), {channel: time.time()})
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._call("zrem", self._group_key(group), channel)
+
+    async def group_send(self, group, message):
+        self.require_valid_group_name(group)
+        key = self._group_key(group)
+        await self._call("zremrangebyscore", key, 0, time.time() - self.group_expiry)
+        for channel in await self._call("zrange", key, 0, -1):
+            try:
+                await self.send(_text(channel), message)
+            except ChannelFull:
+                pass
+
+    # --- Flush Extension ---
+
+    async def flush(self):
+        keys = await asyncio.to_thread(lambda: list(self.client.scan_iter(match=f"{self.prefix}:*")))
+        if keys:
+            await self._call("delete", *keys)
+
+    async def close(self):
+        pass
+
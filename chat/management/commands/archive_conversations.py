@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from chat.archive import ARCHIVE_AFTER_DAYS, archive_cold_conversations
+
+
+class Command(BaseCommand):
+    help = "Packs the messages of conversations idle for N days into one compressed blob each."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+
+    def handle(self, *args, **options):
+        archived = archive_cold_conversations(options["days"])
+        self.stdout.write(f"Archived {archived} conversation(s).")
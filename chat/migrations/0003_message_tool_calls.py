@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='tool_call_id',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='tool_calls',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='tool_name',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='sender',
+            field=models.CharField(choices=[('user', 'User'), ('ai', 'AI'), ('system', 'System'), ('tool', 'Tool')], max_length=10),
+        ),
+    ]
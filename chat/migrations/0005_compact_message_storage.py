@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:05
+
+import zlib
+
+from django.db import migrations, models
+
+# Frozen copies of chat.compression as of this migration, so it replays the same
+# way whatever later becomes of the live module
+COMPRESS_MIN_BYTES = 512
+COMPRESSION_LEVEL = 6
+PREVIEW_LENGTH = 120
+
+
+def encode_body(text):
+    text = text or ''
+    data = text.encode('utf-8')
+    if len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, COMPRESSION_LEVEL)
+        if len(packed) < len(data):
+            return '', packed
+    return text, None
+
+
+def decode_body(body, body_z):
+    if body_z is not None:
+        return zlib.decompress(bytes(body_z)).decode('utf-8')
+    return body
+
+
+def preview_of(text):
+    return (text or '')[:PREVIEW_LENGTH]
+
+
+def compact_messages(apps, schema_editor):
+    Message = apps.get_model('chat', 'Message')
+    batch = []
+    for msg in Message.objects.only('id', 'body').iterator(chunk_size=500):
+        text = msg.body
+        msg.body, msg.body_z = encode_body(text)
+        msg.preview = preview_of(text)
+        batch.append(msg)
+        if len(batch) >= 500:
+            Message.objects.bulk_update(batch, ['body', 'body_z', 'preview'])
+            batch = []
+    if batch:
+        Message.objects.bulk_update(batch, ['body', 'body_z', 'preview'])
+
+
+def expand_messages(apps, schema_editor):
+    Message = apps.get_model('chat', 'Message')
+    batch = []
+    for msg in Message.objects.filter(body_z__isnull=False).only('id', 'body', 'body_z').iterator(chunk_size=500):
+        msg.body = decode_body(msg.body, msg.body_z)
+        batch.append(msg)
+    Message.objects.bulk_update(batch, ['body'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_graph_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='message',
+            options={'ordering': ['timestamp', 'id']},
+        ),
+        migrations.RenameField(
+            model_name='message',
+            old_name='content',
+            new_name='body',
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='body',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='body_z',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='preview',
+            field=models.CharField(blank=True, default='', max_length=120),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='archive',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(compact_messages, expand_messages),
+    ]
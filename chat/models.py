@@ -1,11 +1,19 @@
 import uuid
 from django.db import models
 
+from .compression import decode_body, encode_body, preview_of
+
 class Conversation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255, blank=True, default="New Conversation")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Rolling summary of turns that fell out of the verbatim history window (see chat/history.py)
+    summary = models.TextField(blank=True, default="")
+    summary_until_message_id = models.BigIntegerField(default=0)
+    # Cold conversations: all messages packed into one compressed blob (see chat/archive.py)
+    archive = models.BinaryField(null=True, blank=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-updated_at']
@@ -18,15 +26,82 @@ class Message(models.Model):
         ('user', 'User'),
         ('ai', 'AI'),
         ('system', 'System'),
+        ('tool', 'Tool'),
     )
     
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.CharField(max_length=10, choices=SENDER_CHOICES)
-    content = models.TextField()
+    # The text lives in `body`, or zlib-compressed in `body_z` when large (see chat/compression.py);
+    # read and write it through `content`
+    body = models.TextField(blank=True, default="")
+    body_z = models.BinaryField(null=True, blank=True)
+    preview = models.CharField(max_length=120, blank=True, default="")
     timestamp = models.DateTimeField(auto_now_add=True)
+    # AI messages that requested tools: [{"id": ..., "name": ..., "args": {...}}, ...]
+    tool_calls = models.JSONField(null=True, blank=True)
+    # Tool messages: which call they answer
+    tool_call_id = models.CharField(max_length=100, blank=True, default="")
+    tool_name = models.CharField(max_length=100, blank=True, default="")
+
+    class Meta:
+        ordering = ['timestamp', 'id']
+
+    @property
+    def content(self):
+        # Decompressed on first access only
+        if "_content" not in self.__dict__:
+            self._content = decode_body(self.body, self.body_z)
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        value = value or ""
+        self.body, self.body_z = encode_body(value)
+        self.preview = preview_of(value)
+        self._content = value
+
+    def __str__(self):
+        return f"{self.sender}: {self.preview[:50]}..."
+
+# LangGraph checkpoints of the chat graph (see chat/checkpoints.py); thread_id is the conversation id
+class GraphCheckpoint(models.Model):
+    thread_id = models.CharField(max_length=64)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default="")
+    checkpoint_id = models.CharField(max_length=64)
+    parent_checkpoint_id = models.CharField(max_length=64, blank=True, default="")
+    # Serializer type tag and the zlib-compressed payload (checkpoint incl. channel values)
+    type = models.CharField(max_length=32)
+    checkpoint = models.BinaryField()
+    metadata = models.JSONField(default=dict)
 
     class Meta:
-        ordering = ['timestamp']
+        unique_together = ('thread_id', 'checkpoint_ns', 'checkpoint_id')
+
+    def __str__(self):
+        return f"{self.thread_id}:{self.checkpoint_id}"
+
+class GraphCheckpointWrite(models.Model):
+    thread_id = models.CharField(max_length=64)
+    checkpoint_ns = models.CharField(max_length=255, blank=True, default="")
+    checkpoint_id = models.CharField(max_length=64)
+    task_id = models.CharField(max_length=64)
+    task_path = models.CharField(max_length=255, blank=True, default="")
+    idx = models.IntegerField()
+    channel = models.CharField(max_length=255)
+    type = models.CharField(max_length=32)
+    value = models.BinaryField()
+
+    class Meta:
+        unique_together = ('thread_id', 'checkpoint_ns', 'checkpoint_id', 'task_id', 'idx')
+
+    def __str__(self):
+        return f"{self.thread_id}:{self.checkpoint_id}:{self.channel}"
+
+class ThreadLease(models.Model):
+    # Held by the process running a thread, renewed while the run is alive
+    thread_id = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=32)
+    expires_at = models.DateTimeField()
 
     def __str__(self):
-        return f"{self.sender}: {self.content[:50]}..."
+        return f"{self.thread_id}:{self.owner}"
@@ -0,0 +1,111 @@
+"""
+Per-connection unit of work for ChatConsumer persistence.
+
+The Conversation row is fetched once per socket, each message is written with a
+single INSERT plus one UPDATE that touches updated_at (and sets the title on the
+first message), and an optional write-behind mode buffers messages and flushes
+them with bulk_create.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import Conversation, Message
+
+DEFAULT_TITLE = "New Conversation"
+TITLE_LENGTH = 30
+
+WRITE_BEHIND = getattr(settings, "CHAT_WRITE_BEHIND", False)
+WRITE_BEHIND_BATCH_SIZE = getattr(settings, "CHAT_WRITE_BEHIND_BATCH_SIZE", 20)
+WRITE_BEHIND_INTERVAL = getattr(settings, "CHAT_WRITE_BEHIND_INTERVAL", 2.0)  # seconds
+
+
+def title_from(content: str) -> str:
+    # Use first 30 chars
+    return (content[:TITLE_LENGTH] + '..') if len(content) > TITLE_LENGTH else content
+
+
+class ConversationSession:
+    """
+    Unit of work for one WebSocket connection. All methods are synchronous;
+    call them through sync_to_async (they share asgiref's single DB thread).
+    """
+
+    def __init__(self, conversation_id, write_behind: bool = WRITE_BEHIND,
+                 batch_size: int = WRITE_BEHIND_BATCH_SIZE):
+        self.conversation_id = conversation_id
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.conversation = None
+        self.pending = []
+        self._pending_title = None
+
+    def open(self):
+        """
+        Fetches (or creates) the Conversation once for the socket's lifetime.
+        """
+        if self.conversation is None:
+            self.conversation, _ = Conversation.objects.defer("archive").get_or_create(id=self.conversation_id)
+        return self.conversation
+
+    def _touch(self, title: str = None):
+        # One UPDATE instead of fetch + save(); title rides along when it changes
+        fields = {"updated_at": timezone.now()}
+        if title is not None:
+            # Only over the default: another socket or process may have titled it since open()
+            fields["title"] = Case(When(title=DEFAULT_TITLE, then=Value(title)), default=F("title"))
+        Conversation.objects.filter(pk=self.conversation_id).update(**fields)
+
+    def _new_title(self, messages):
+        # The cached row only saves proposing a title again; _touch decides against the DB
+        conversation = self.open()
+        if conversation.title != DEFAULT_TITLE:
+            return None
+        for msg in messages:
+            if msg.sender == 'user' and msg.preview:
+                conversation.title = title_from(msg.preview)
+                return conversation.title
+        return None
+
+    def record_message(self, sender: str, content: str, **fields) -> Message:
+        """
+        Persists a message (or queues it in write-behind mode) and returns it.
+        Extra fields (tool_calls, tool_call_id, tool_name) are passed to the Message.
+        """
+        return self.record_messages([Message(sender=sender, content=content, **fields)])[0]
+
+    def record_messages(self, messages):
+        """
+        Persists several unsaved Message objects with one bulk INSERT and one UPDATE
+        (or queues them in write-behind mode). Returns the same objects.
+        """
+        conversation = self.open()
+        for msg in messages:
+            msg.conversation = conversation
+        title = self._new_title(messages)
+
+        if self.write_behind:
+            self.pending.extend(messages)
+            self._pending_title = title or self._pending_title
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+            return messages
+
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            self._touch(title)
+        return messages
+
+    def flush(self):
+        """
+        Writes all queued messages with one bulk INSERT and one UPDATE.
+        """
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        title, self._pending_title = self._pending_title, None
+        with transaction.atomic():
+            Message.objects.bulk_create(pending)
+            self._touch(title)
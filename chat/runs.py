@@ -0,0 +1,145 @@
+"""
+Agent runs shared by ChatConsumer (in-process mode) and AgentRunConsumer (worker mode).
+Runs go through a checkpointed copy of the agent graph, one thread per conversation
+(see chat/checkpoints.py).
+"""
+
+import asyncio
+import uuid
+
+from asgiref.sync import sync_to_async
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+from agent import workflow
+
+from .checkpoints import (
+    LEASE_SECONDS,
+    checkpointer,
+    claim_thread,
+    release_thread,
+    renew_thread,
+    thread_claimed,
+    thread_config,
+    thread_inputs,
+)
+
+# agent.app stays checkpoint-free for the CLI and agent.invoke
+chat_app = workflow.compile(checkpointer=checkpointer)
+
+# Frames are plain dicts; the consumer JSON-encodes them for the socket and the
+# worker publishes them to the conversation's group through the channel layer.
+
+
+async def run_thread(thread_id, history, emit, run_messages=None):
+    """
+    Runs a conversation's thread: resumes, continues or rebases it (see
+    checkpoints.thread_inputs) and streams the run like stream_run, holding the
+    thread's lease meanwhile. A cancelled or failed run deletes the thread's
+    checkpoints, so its partial state is never resumed (a failing run would
+    otherwise be retried on every reconnect); the next turn rebases from the persisted history.
+    """
+    if run_messages is None:
+        run_messages = []
+    owner = uuid.uuid4().hex
+    if not await sync_to_async(claim_thread)(thread_id, owner):
+        raise RuntimeError("This conversation is already being answered elsewhere, please try again shortly.")
+    heartbeat = asyncio.ensure_future(_keep_lease(thread_id, owner))
+    try:
+        config = thread_config(thread_id)
+        snapshot = await chat_app.aget_state(config)
+        inputs, carried = thread_inputs(snapshot.values.get("messages", []), bool(snapshot.next), history)
+        run_messages.extend(carried)
+        try:
+            return await stream_run(inputs, config, emit, run_messages)
+        except (asyncio.CancelledError, Exception):
+            await checkpointer.adelete_thread(thread_id)
+            raise
+    finally:
+        heartbeat.cancel()
+        await sync_to_async(release_thread)(thread_id, owner)
+
+
+async def _keep_lease(thread_id, owner):
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        await sync_to_async(renew_thread)(thread_id, owner)
+
+
+async def has_interrupted_run(thread_id) -> bool:
+    """
+    Whether the thread's last run stopped partway and is not alive anywhere
+    (e.g. its process died, and so its lease expired).
+    """
+    if await sync_to_async(thread_claimed)(thread_id):
+        return False
+    return bool((await chat_app.aget_state(thread_config(thread_id))).next)
+
+
+async def stream_run(inputs, config, emit, run_messages=None):
+    """
+    Runs the graph on the thread in `config` (continuing it from its last step if
+    inputs is None), passing LLM tokens and tool progress to `emit(frame)` as they are produced.
+    Returns the content of the final AI message (None if the run produced none).
+    Messages produced by the run (AI and Tool) are appended to `run_messages` if given.
+    """
+    if run_messages is None:
+        run_messages = []
+    final_content = None
+    tools_running = False
+    
+    # durability="sync": each step is checkpointed before the next one starts
+    async for event in chat_app.astream_events(inputs, config, version="v2", durability="sync"):
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+        
+        if kind == "on_chat_model_stream" and node == "agent":
+            chunk = event["data"]["chunk"].content
+            if chunk and isinstance(chunk, str):
+                await emit({
+                    'type': 'ai_response',
+                    'message': chunk,
+                    'is_final': False
+                })
+        
+        elif kind == "on_chat_model_end" and node == "agent":
+            output = event["data"]["output"]
+            run_messages.append(output)
+            if output.tool_calls:
+                # The tokens streamed so far were a preamble; the answer comes after the tools run
+                final_content = None
+                tools_running = True
+                await emit({
+                    'type': 'tool_progress',
+                    'status': 'started',
+                    'tools': [tc["name"] for tc in output.tool_calls]
+                })
+            else:
+                final_content = output.content
+        
+        elif kind == "on_chain_end" and event.get("name") == "router" and node == "router" and final_content is None:
+            # Fast path: the router answered from a tool and a template without the model
+            routed = event["data"]["output"]["messages"]
+            if routed:
+                run_messages.extend(routed)
+                final_content = routed[-1].content
+        
+        elif kind == "on_chain_end" and event.get("name") == "tools" and tools_running:
+            tools_running = False
+            run_messages.extend(event["data"]["output"]["messages"])
+            await emit({
+                'type': 'tool_progress',
+                'status': 'finished'
+            })
+    
+    return final_content
+
+
+def dump_messages(messages) -> list:
+    """
+    JSON-safe form of LangChain messages for channel layer payloads.
+    """
+    return messages_to_dict(list(messages))
+
+
+def load_messages(data) -> list:
+    return messages_from_dict(data)
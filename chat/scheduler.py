@@ -0,0 +1,153 @@
+"""
+Admission control for agent runs.
+
+One RunScheduler per process decides when a conversation's agent run may start:
+
+- Runs of one conversation never overlap. Messages that arrive while a run is
+  in flight are coalesced per socket, so each socket has at most one follow-up
+  run pending, and it answers everything that socket sent in the meantime.
+  Follow-ups of different sockets run one after another.
+- At most `max_concurrent` runs execute at once across the whole process.
+- Waiting conversations are served first come, first served. A conversation
+  with a follow-up goes to the back of the queue, so a chatty user cannot starve
+  the others.
+- When `max_queued` conversations are already waiting, new messages are
+  rejected and the client gets a backpressure frame.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_RUNS = getattr(settings, "CHAT_MAX_CONCURRENT_RUNS", 8)
+MAX_QUEUED_RUNS = getattr(settings, "CHAT_MAX_QUEUED_RUNS", 100)
+# Suggested client back-off (seconds) sent with a rejection
+RETRY_AFTER = getattr(settings, "CHAT_RETRY_AFTER", 5)
+
+# submit() outcomes
+STARTED = "started"
+QUEUED = "queued"
+COALESCED = "coalesced"
+REJECTED = "rejected"
+
+
+class RunScheduler:
+    """
+    Runs are zero-argument coroutine functions, keyed by conversation.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_RUNS, max_queued: int = MAX_QUEUED_RUNS):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.running = {}  # key -> asyncio.Task
+        self.runs = {}  # key -> the run executing in running[key]
+        self.waiting = OrderedDict()  # key -> run, in arrival order (the fair queue)
+        self.followups = {}  # key -> runs to start, in order, after the key's current or waiting run
+        self.started = self.coalesced = self.rejected = 0
+
+    def is_full(self) -> bool:
+        return len(self.waiting) + sum(map(len, self.followups.values())) >= self.max_queued
+
+    def is_pending(self, key, run) -> bool:
+        return self.waiting.get(key) == run or run in self.followups.get(key, ())
+
+    def admits(self, key, run=None) -> bool:
+        """
+        Whether a new message for `key` would be accepted (coalescing into `run` is always accepted).
+        """
+        return (run is not None and self.is_pending(key, run)) or not self.is_full()
+
+    def position(self, key) -> int:
+        """
+        1-based place in the queue (0 if not waiting).
+        """
+        for index, waiting_key in enumerate(self.waiting, 1):
+            if waiting_key == key:
+                return index
+        return 0
+
+    def submit(self, key, run):
+        """
+        Schedules `run` for conversation `key`. Returns (outcome, queue position).
+        A run that is already pending (the same socket's) is coalesced; any other run
+        for a key that is waiting or running becomes a follow-up.
+        """
+        if self.is_pending(key, run):
+            self.coalesced += 1
+            return COALESCED, self.position(key)
+        if key in self.waiting or key in self.running:
+            if self.is_full():
+                self.rejected += 1
+                return REJECTED, 0
+            self.followups.setdefault(key, []).append(run)
+            return QUEUED, self.position(key)
+        if len(self.running) < self.max_concurrent and not self.waiting:
+            self._start(key, run)
+            return STARTED, 0
+        if self.is_full():
+            self.rejected += 1
+            return REJECTED, 0
+        self.waiting[key] = run
+        return QUEUED, len(self.waiting)
+
+    def cancel(self, key, run=None, pending_only: bool = False):
+        """
+        Drops a conversation's pending run and, unless pending_only, cancels the one in flight.
+        With `run`, only entries for that run are touched (e.g. one socket's own runs).
+        Returns the cancelled task, or None.
+        """
+        followups = [pending for pending in self.followups.pop(key, []) if run is not None and pending != run]
+        if key in self.waiting and (run is None or self.waiting[key] == run):
+            if followups:
+                self.waiting[key] = followups.pop(0)  # keeps the conversation's place in line
+            else:
+                del self.waiting[key]
+        if followups:
+            self.followups[key] = followups
+        task = self.running.get(key)
+        if task is None or pending_only or (run is not None and self.runs.get(key) != run):
+            return None
+        task.cancel()
+        return task
+
+    def _start(self, key, run):
+        self.started += 1
+        task = asyncio.ensure_future(run())
+        self.running[key] = task
+        self.runs[key] = run
+        task.add_done_callback(lambda done: self._finished(key, done))
+
+    def _finished(self, key, task):
+        if self.running.get(key) is task:
+            del self.running[key]
+            del self.runs[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Agent run for {key} failed: {task.exception()}")
+        followups = self.followups.get(key)
+        if followups and key not in self.running and key not in self.waiting:
+            self.waiting[key] = followups.pop(0)  # back of the queue
+            if not followups:
+                del self.followups[key]
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.waiting and len(self.running) < self.max_concurrent:
+            key, run = self.waiting.popitem(last=False)
+            self._start(key, run)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self.running),
+            "waiting": len(self.waiting) + sum(map(len, self.followups.values())),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+
+scheduler = RunScheduler()
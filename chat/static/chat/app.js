@@ -9,18 +9,62 @@ const chatSocket = new WebSocket(
 const messagesContainer = document.getElementById('messages-container');
 const chatInput = document.getElementById('chat-input');
 const sendBtn = document.getElementById('send-btn');
+const stopBtn = document.getElementById('stop-btn');
 
 // Auto-parse existing messages (if any were rendered raw)
 // Simple pass to markdownify what is already there if needed, 
 // OR just trust server rendering for old history.
 // For now, let's just make sure new messages are markdown.
 
+// The AI message currently being streamed (null between responses)
+let streamingDiv = null;
+let streamingText = '';
+
 chatSocket.onmessage = function(e) {
     const data = JSON.parse(e.data);
     
     if (data.type === 'ai_response') {
-        appendMessage('ai', data.message);
+        if (!streamingDiv) {
+            streamingDiv = appendMessage('ai', '');
+            streamingText = '';
+        }
+        stopBtn.hidden = data.is_final;
+        // Incremental frames carry a token chunk; the final frame carries the full message
+        streamingText = data.is_final ? data.message : streamingText + data.message;
+        renderMessage(streamingDiv, streamingText);
+        if (data.is_final) {
+            streamingDiv = null;
+        }
+    } else if (data.type === 'tool_progress') {
+        if (data.status === 'started') {
+            // Any text streamed before a tool call was a preamble; the answer follows the tools
+            if (!streamingDiv) {
+                streamingDiv = appendMessage('ai', '');
+            }
+            streamingText = '';
+            renderMessage(streamingDiv, '_Using ' + data.tools.join(', ') + '..._');
+            stopBtn.hidden = false;
+        }
+    } else if (data.type === 'queued') {
+        // Waiting for a run slot; a message sent mid-answer is answered by the next run
+        if (!streamingDiv) {
+            streamingDiv = appendMessage('ai', '');
+            streamingText = '';
+            renderMessage(streamingDiv, data.position ? '_Waiting in line (#' + data.position + ')..._' : '_Queued..._');
+        }
+        stopBtn.hidden = false;
+    } else if (data.type === 'stopped') {
+        // Partial text is not kept by the server, so it is marked as such here
+        if (streamingDiv) {
+            renderMessage(streamingDiv, (streamingText ? streamingText + '\n\n' : '') + '_Stopped._');
+            streamingDiv = null;
+        }
+        stopBtn.hidden = true;
+    } else if (data.type === 'busy') {
+        appendMessage('system', data.message);
     } else if (data.error) {
+        streamingDiv = null;
+        stopBtn.hidden = true;
         console.error("Error:", data.error);
         appendMessage('system', 'Error: ' + data.error);
     }
@@ -39,6 +83,12 @@ chatInput.addEventListener('keydown', function(e) {
 
 sendBtn.addEventListener('click', sendMessage);
 
+stopBtn.addEventListener('click', function() {
+    chatSocket.send(JSON.stringify({
+        'type': 'stop'
+    }));
+});
+
 function sendMessage() {
     const message = chatInput.value.trim();
     if (message) {
@@ -58,12 +108,17 @@ function appendMessage(sender, content) {
     const contentDiv = document.createElement('div');
     contentDiv.classList.add('message-content');
     
-    // Parse Markdown
-    contentDiv.innerHTML = marked.parse(content);
-    
     messageDiv.appendChild(contentDiv);
     messagesContainer.appendChild(messageDiv);
     
+    renderMessage(messageDiv, content);
+    return messageDiv;
+}
+
+function renderMessage(messageDiv, content) {
+    // Parse Markdown
+    messageDiv.querySelector('.message-content').innerHTML = marked.parse(content);
+    
     // Scroll to bottom
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
 }
@@ -1,3 +1,806 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from typing import Any
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.routing import ChannelNameRouter, URLRouter
+from channels.testing import WebsocketCommunicator
+from channels.worker import Worker
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk
+from langgraph.checkpoint.base import empty_checkpoint
+from pydantic import Field
+
+import agent
+import llm_registry
+from tool_cache import ToolResultCache
+
+from .archive import archive_cold_conversations, archive_conversation, restore_conversation
+from .checkpoints import (
+    DjangoCheckpointSaver,
+    claim_thread,
+    release_thread,
+    renew_thread,
+    thread_claimed,
+    thread_config,
+    thread_inputs,
+)
+from .layers import SharedChannelLayer, SQLiteRedis
+from .history import HistoryManager, SUMMARY_MESSAGE_NAME, completed_messages, message_from_langchain
+from .models import Conversation, GraphCheckpoint, GraphCheckpointWrite, Message, ThreadLease
+from .persistence import ConversationSession
+from .routing import websocket_urlpatterns
+from .runs import stream_run
+from .scheduler import COALESCED, QUEUED, REJECTED, STARTED, RunScheduler, scheduler
+from .workers import AGENT_RUN_CHANNEL, AgentRunConsumer
+
+
+class HistoryManagerTests(TestCase):
+
+    def setUp(self):
+        self.conversation = Conversation.objects.create()
+
+    def add_turn(self, n):
+        Message.objects.create(conversation=self.conversation, sender='user', content=f"question {n}")
+        Message.objects.create(conversation=self.conversation, sender='ai', content=f"answer {n}")
+
+    def test_short_history_is_verbatim(self):
+        self.add_turn(1)
+        messages = HistoryManager(self.conversation.id).load()
+        self.assertEqual([m.content for m in messages], ["question 1", "answer 1"])
+
+    def test_old_turns_fold_into_stored_summary(self):
+        for n in range(5):
+            self.add_turn(n)
+        messages = HistoryManager(self.conversation.id, keep_turns=2).load()
+
+        self.assertEqual(messages[0].name, SUMMARY_MESSAGE_NAME)
+        self.assertIn("question 0", messages[0].content)
+        self.assertEqual([m.content for m in messages[1:]], ["question 3", "answer 3", "question 4", "answer 4"])
+
+        self.conversation.refresh_from_db()
+        self.assertIn("question 2", self.conversation.summary)
+        self.assertGreater(self.conversation.summary_until_message_id, 0)
+
+        # A fresh connection resumes from the stored summary without re-reading folded rows
+        with self.assertNumQueries(2):
+            resumed = HistoryManager(self.conversation.id, keep_turns=2).load()
+        self.assertEqual([m.content for m in resumed], [m.content for m in messages])
+
+    def test_token_budget_folds_turns(self):
+        Message.objects.create(conversation=self.conversation, sender='user', content="x" * 4000)
+        Message.objects.create(conversation=self.conversation, sender='ai', content="long answer")
+        self.add_turn(1)
+        messages = HistoryManager(self.conversation.id, token_budget=200, keep_turns=10).load()
+        self.assertEqual(messages[0].name, SUMMARY_MESSAGE_NAME)
+        self.assertEqual([m.content for m in messages[1:]], ["question 1", "answer 1"])
+
+    def test_later_turns_read_only_new_rows(self):
+        self.add_turn(1)
+        history = HistoryManager(self.conversation.id)
+        history.load()
+        history.append(Message.objects.create(conversation=self.conversation, sender='user', content="question 2"))
+        # Written by another socket of the conversation
+        Message.objects.create(conversation=self.conversation, sender='user', content="question 3")
+        history.append(Message(conversation=self.conversation, sender='user', content="question 4"))  # not flushed yet
+        with self.assertNumQueries(1):
+            messages = history.load()
+        self.assertEqual([m.content for m in messages],
+                         ["question 1", "answer 1", "question 2", "question 3", "question 4"])
+
+    def test_unflushed_turns_are_not_folded(self):
+        self.add_turn(1)
+        history = HistoryManager(self.conversation.id, keep_turns=1)
+        history.load()
+        history.append(Message(conversation=self.conversation, sender='user', content="question 2"))
+        history.append(Message(conversation=self.conversation, sender='user', content="question 3"))
+        history.load()
+        # Only the flushed turn was folded; the summary stops at its last row
+        self.assertEqual([m.content for m in history.rows], ["question 2", "question 3"])
+        self.assertEqual(history.summary_until_id, Message.objects.get(body="answer 1").pk)
+
+    def add_tool_turn(self, n, output):
+        Message.objects.create(conversation=self.conversation, sender='user', content=f"weather {n}?")
+        Message.objects.create(conversation=self.conversation, sender='ai', content="",
+                               tool_calls=[{"id": f"call_{n}", "name": "get_current_weather", "args": {"city": "Paris"}}])
+        Message.objects.create(conversation=self.conversation, sender='tool', content=output,
+                               tool_call_id=f"call_{n}", tool_name="get_current_weather")
+        Message.objects.create(conversation=self.conversation, sender='ai', content=f"It is sunny {n}")
+
+    def test_tool_messages_are_rehydrated(self):
+        self.add_tool_turn(1, '{"temperature": "21°C"}')
+        messages = HistoryManager(self.conversation.id).load()
+
+        self.assertIsInstance(messages[1], AIMessage)
+        self.assertEqual(messages[1].tool_calls[0]["id"], "call_1")
+        self.assertIsInstance(messages[2], ToolMessage)
+        self.assertEqual(messages[2].tool_call_id, "call_1")
+        self.assertEqual(messages[2].content, '{"temperature": "21°C"}')
+
+    def test_stale_tool_outputs_are_clipped(self):
+        self.add_tool_turn(1, "x" * 500)
+        self.add_tool_turn(2, "y" * 500)
+        messages = HistoryManager(self.conversation.id, tool_output_fresh_turns=1, tool_output_stale_chars=50).load()
+        tool_outputs = [m.content for m in messages if isinstance(m, ToolMessage)]
+        self.assertTrue(tool_outputs[0].endswith("[truncated]"))
+        self.assertEqual(tool_outputs[1], "y" * 500)
+
+    def test_message_from_langchain_keeps_tool_metadata(self):
+        msg = message_from_langchain(ToolMessage(content="{}", tool_call_id="call_9", name="search_attractions"))
+        self.assertEqual((msg.sender, msg.tool_call_id, msg.tool_name), ('tool', "call_9", "search_attractions"))
+        msg = message_from_langchain(AIMessage(content="", tool_calls=[{"id": "c", "name": "n", "args": {}}]))
+        self.assertEqual(msg.tool_calls, [{"id": "c", "name": "n", "args": {}}])
+
+
+class ConversationSessionTests(TestCase):
+
+    def setUp(self):
+        self.conversation = Conversation.objects.create()
+
+    def test_first_message_sets_title_in_same_update(self):
+        session = ConversationSession(self.conversation.id)
+        session.open()
+        # INSERT + UPDATE (inside one transaction's SAVEPOINT/RELEASE pair)
+        with self.assertNumQueries(4):
+            session.record_message('user', "What is the weather like in Paris this weekend?")
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.title, "What is the weather like in Pa..")
+
+        # Later messages leave the title alone and never refetch the conversation
+        with self.assertNumQueries(4):
+            session.record_message('ai', "Sunny!")
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.title, "What is the weather like in Pa..")
+
+    def test_title_set_elsewhere_is_kept(self):
+        session = ConversationSession(self.conversation.id)
+        session.open()
+        # Another socket titled the conversation after this one opened it
+        Conversation.objects.filter(id=self.conversation.id).update(title="Rome weekend")
+        session.record_message('user', "What is the weather like in Paris this weekend?")
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.title, "Rome weekend")
+
+    def test_write_behind_flushes_in_bulk(self):
+        session = ConversationSession(self.conversation.id, write_behind=True, batch_size=3)
+        session.record_message('user', "hi")
+        session.record_message('ai', "hello")
+        self.assertEqual(Message.objects.count(), 0)
+
+        session.record_message('user', "weather?")  # reaches batch size
+        self.assertEqual(Message.objects.count(), 3)
+        self.assertEqual(session.pending, [])
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.title, "hi")
+
+    def test_flush_without_pending_is_free(self):
+        session = ConversationSession(self.conversation.id, write_behind=True)
+        with self.assertNumQueries(0):
+            session.flush()
+
+
+class SharedChannelLayerTests(SimpleTestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def layer(self, **kwargs):
+        return SharedChannelLayer(url=f"sqlite:///{self.path}", **kwargs)
+
+    def test_send_receive_across_instances(self):
+        # Two layers on one store behave like two processes
+        async def run():
+            web, worker = self.layer(), self.layer()
+            await web.send("agent-runs", {"type": "agent.run", "n": 1})
+            await web.send("agent-runs", {"type": "agent.run", "n": 2})
+            self.assertEqual((await worker.receive("agent-runs"))["n"], 1)
+            self.assertEqual((await worker.receive("agent-runs"))["n"], 2)
+        asyncio.run(run())
+
+    def test_group_send(self):
+        async def run():
+            a, b = self.layer(), self.layer()
+            channel_a, channel_b = await a.new_channel(), await b.new_channel()
+            await a.group_add("chat_room", channel_a)
+            await b.group_add("chat_room", channel_b)
+            await b.group_send("chat_room", {"type": "agent.frame", "frame": {"message": "hi"}})
+            self.assertEqual((await a.receive(channel_a))["frame"]["message"], "hi")
+            self.assertEqual((await b.receive(channel_b))["frame"]["message"], "hi")
+            await a.group_discard("chat_room", channel_a)
+            self.assertEqual(await a._call("zrange", "asgi:group:chat_room", 0, -1), [channel_b])
+        asyncio.run(run())
+
+    def test_unread_channels_expire(self):
+        async def run():
+            layer = self.layer()
+            await layer.send("agent-cancel.abc", {"type": "agent.cancel"})
+            # Nobody reads it; once its expiry has passed, the next send purges it
+            with mock.patch("chat.layers.time.time", return_value=time.time() + layer.expiry + 1):
+                await layer.send("agent-runs", {"type": "agent.run"})
+            self.assertEqual(await layer._call("llen", "asgi:channel:agent-cancel.abc"), 0)
+            self.assertEqual(await layer._call("llen", "asgi:channel:agent-runs"), 1)
+        asyncio.run(run())
+
+    def test_capacity_and_flush(self):
+        async def run():
+            layer = self.layer(capacity=1)
+            await layer.send("agent-runs", {"type": "agent.run"})
+            with self.assertRaises(ChannelFull):
+                await layer.send("agent-runs", {"type": "agent.run"})
+            await layer.flush()
+            self.assertEqual(await layer._call("llen", "asgi:channel:agent-runs"), 0)
+        asyncio.run(run())
+
+    def test_lpush_puts_values_first(self):
+        client = SQLiteRedis(self.path)
+        client.rpush("q", "b", "c")
+        client.lpush("q", "a")
+        self.assertEqual([client.lpop("q") for _ in range(4)], ["a", "b", "c", None])
+
+
+class RunSchedulerTests(SimpleTestCase):
+
+    def test_serializes_and_coalesces_per_conversation(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent=2, max_queued=10)
+            release, calls = asyncio.Event(), []
+
+            def make_run(name):
+                async def agent_run():
+                    calls.append(name)
+                    await release.wait()
+                return agent_run
+
+            # One run per socket: a socket's later messages coalesce into its pending run
+            mine, theirs = make_run("mine"), make_run("theirs")
+            self.assertEqual(scheduler.submit("a", make_run("a1")), (STARTED, 0))
+            self.assertEqual(scheduler.submit("a", mine)[0], QUEUED)
+            self.assertEqual(scheduler.submit("a", mine)[0], COALESCED)
+            self.assertEqual(scheduler.submit("a", theirs)[0], QUEUED)
+            await asyncio.sleep(0)
+            self.assertEqual(calls, ["a1"])
+            release.set()
+            while scheduler.running or scheduler.waiting:
+                await asyncio.sleep(0)
+            # Another socket's follow-up is not replaced, it runs after
+            self.assertEqual(calls, ["a1", "mine", "theirs"])
+        asyncio.run(run())
+
+    def test_concurrency_limit_fair_queue_and_backpressure(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent=1, max_queued=2)
+            release, calls = asyncio.Event(), []
+
+            def make_run(name):
+                async def agent_run():
+                    calls.append(name)
+                    await release.wait()
+                return agent_run
+
+            scheduler.submit("a", make_run("a1"))
+            self.assertEqual(scheduler.submit("b", make_run("b1")), (QUEUED, 1))
+            self.assertEqual(scheduler.submit("a", make_run("a2")), (QUEUED, 0))
+            self.assertFalse(scheduler.admits("c"))
+            self.assertEqual(scheduler.submit("c", make_run("c1")), (REJECTED, 0))
+            release.set()
+            while scheduler.running or scheduler.waiting:
+                await asyncio.sleep(0)
+            # b waited longer than a's follow-up, so it runs first
+            self.assertEqual(calls, ["a1", "b1", "a2"])
+            self.assertEqual(scheduler.stats()["rejected"], 1)
+        asyncio.run(run())
+
+    def test_cancel_only_touches_the_given_run(self):
+        async def run():
+            scheduler = RunScheduler(max_concurrent=1, max_queued=10)
+            release = asyncio.Event()
+
+            async def mine():
+                await release.wait()
+
+            async def theirs():
+                await release.wait()
+
+            scheduler.submit("a", mine)
+            scheduler.submit("b", theirs)
+            self.assertIsNone(scheduler.cancel("a", run=theirs))
+            self.assertEqual(list(scheduler.waiting), ["b"])
+            # A cancelled waiting run hands its place in line to the conversation's next follow-up
+            async def other():
+                await release.wait()
+
+            scheduler.submit("b", other)
+            scheduler.cancel("b", run=theirs)
+            self.assertEqual(scheduler.waiting["b"], other)
+            self.assertEqual(scheduler.followups, {})
+            task = scheduler.cancel("a", run=mine)
+            await asyncio.wait({task})
+            self.assertTrue(task.cancelled())
+            # The freed slot goes to the next conversation in line
+            self.assertEqual(scheduler.runs["b"], other)
+            release.set()
+        asyncio.run(run())
+
+
+class CompletedMessagesTests(SimpleTestCase):
+
+    def test_drops_unanswered_tool_call(self):
+        call = AIMessage(content="", tool_calls=[{"name": "get_current_weather", "args": {"city": "Paris"}, "id": "c1"}])
+        result = ToolMessage(content="{}", tool_call_id="c1", name="get_current_weather")
+        second = AIMessage(content="", tool_calls=[
+            {"name": "get_current_weather", "args": {"city": "Rome"}, "id": "c2"},
+            {"name": "get_current_weather", "args": {"city": "Oslo"}, "id": "c3"},
+        ])
+        partial = ToolMessage(content="{}", tool_call_id="c2", name="get_current_weather")
+        self.assertEqual(completed_messages([call, result, second, partial]), [call, result])
+        self.assertEqual(completed_messages([call]), [])
+        answer = AIMessage(content="Sunny")
+        self.assertEqual(completed_messages([call, result, answer]), [call, result, answer])
+
+
+class DjangoCheckpointSaverTests(TestCase):
+
+    def put(self, saver, messages, parent=None):
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": messages}
+        config = parent or {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+        return saver.put(config, checkpoint, {"source": "loop", "step": len(messages)}, {})
+
+    def test_round_trip_and_writes(self):
+        saver = DjangoCheckpointSaver(keep=None)
+        config = self.put(saver, [HumanMessage(content="Weather in Paris?")])
+        saver.put_writes(config, [("messages", [AIMessage(content="Sunny")])], task_id="task-1")
+        saved = saver.get_tuple(thread_config("t1"))
+        self.assertEqual(saved.checkpoint["channel_values"]["messages"][0].content, "Weather in Paris?")
+        self.assertEqual(saved.metadata["step"], 1)
+        self.assertEqual(saved.pending_writes[0][2][0].content, "Sunny")
+        # A retried task does not duplicate its writes
+        saver.put_writes(config, [("messages", [AIMessage(content="Rainy")])], task_id="task-1")
+        self.assertEqual(len(saver.get_tuple(thread_config("t1")).pending_writes), 1)
+
+    def test_keeps_newest_checkpoints(self):
+        saver = DjangoCheckpointSaver(keep=2)
+        config = None
+        for n in range(1, 4):
+            config = self.put(saver, [HumanMessage(content=str(i)) for i in range(n)], parent=config)
+            saver.put_writes(config, [("messages", [])], task_id=f"task-{n}")
+        self.assertEqual(GraphCheckpoint.objects.filter(thread_id="t1").count(), 2)
+        self.assertEqual(GraphCheckpointWrite.objects.filter(thread_id="t1").count(), 2)
+        latest = saver.get_tuple(thread_config("t1"))
+        self.assertEqual(len(latest.checkpoint["channel_values"]["messages"]), 3)
+        self.assertEqual(len(list(saver.list(thread_config("t1")))), 2)
+        saver.delete_thread("t1")
+        self.assertIsNone(saver.get_tuple(thread_config("t1")))
+
+
+class ThreadLeaseTests(TestCase):
+
+    def test_one_live_owner_per_thread(self):
+        self.assertTrue(claim_thread("7", "web-1"))
+        self.assertFalse(claim_thread("7", "web-2"))
+        self.assertTrue(thread_claimed("7"))
+        self.assertFalse(renew_thread("7", "web-2"))
+        release_thread("7", "web-1")
+        self.assertFalse(thread_claimed("7"))
+        self.assertTrue(claim_thread("7", "web-2"))
+
+    def test_expired_lease_can_be_taken_over(self):
+        # The owner died without releasing; once its lease lapses the thread is free again
+        claim_thread("7", "dead")
+        ThreadLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(thread_claimed("7"))
+        self.assertTrue(claim_thread("7", "web-1"))
+        self.assertEqual(ThreadLease.objects.get(thread_id="7").owner, "web-1")
+
+
+class ThreadInputsTests(SimpleTestCase):
+
+    system = SystemMessage(content="You are a helpful travel assistant.")
+
+    def test_new_thread_is_seeded_from_history(self):
+        history = [HumanMessage(content="Weather in Paris?")]
+        inputs, carried = thread_inputs([], False, history)
+        self.assertEqual(inputs["messages"][0].type, "remove")
+        self.assertEqual([m.content for m in inputs["messages"][2:]], ["Weather in Paris?"])
+        self.assertEqual(carried, [])
+
+    def test_in_sync_thread_gets_only_new_messages(self):
+        thread = [self.system, HumanMessage(content="Weather in Paris?"), AIMessage(content="Sunny")]
+        history = [HumanMessage(content="Weather in Paris?"), AIMessage(content="Sunny"),
+                   HumanMessage(content="And Rome?"), HumanMessage(content="Tomorrow")]
+        inputs, _ = thread_inputs(thread, False, history)
+        self.assertEqual([m.content for m in inputs["messages"]], ["And Rome?", "Tomorrow"])
+        # A thread that does not end where history does is rebased
+        inputs, _ = thread_inputs(thread[:-1] + [AIMessage(content="Cloudy")], False, history)
+        self.assertEqual(inputs["messages"][0].type, "remove")
+
+    def test_every_user_message_after_the_last_answer_is_unanswered(self):
+        # A stopped run left a tool exchange between two unanswered messages
+        call = AIMessage(content="", tool_calls=[{"name": "search_attractions", "args": {"location": "Rome"}, "id": "c1"}])
+        result = ToolMessage(content="{}", tool_call_id="c1", name="search_attractions")
+        thread = [self.system, HumanMessage(content="Weather in Paris?"), AIMessage(content="Sunny")]
+        history = [HumanMessage(content="Weather in Paris?"), AIMessage(content="Sunny"),
+                   HumanMessage(content="Museums in Rome?"), call, result, HumanMessage(content="Cheap ones")]
+        inputs, _ = thread_inputs(thread, False, history)
+        self.assertEqual(inputs["messages"], history[2:])
+
+    def test_interrupted_run_resumes(self):
+        call = AIMessage(content="", tool_calls=[{"name": "get_current_weather", "args": {"city": "Paris"}, "id": "c1"}])
+        result = ToolMessage(content="{}", tool_call_id="c1", name="get_current_weather")
+        thread = [self.system, HumanMessage(content="Weather in Paris?"), call, result]
+        history = [HumanMessage(content="Weather in Paris?")]
+        inputs, carried = thread_inputs(thread, True, history)
+        self.assertIsNone(inputs)
+        self.assertEqual(carried, [call, result])
+        # The user has asked something else since: start over from history
+        inputs, _ = thread_inputs(thread, True, history + [HumanMessage(content="Hello?")])
+        self.assertEqual(inputs["messages"][0].type, "remove")
+
+
+class MessageStorageTests(TestCase):
+
+    def setUp(self):
+        self.conversation = Conversation.objects.create()
+
+    def test_large_bodies_are_compressed(self):
+        text = "| Day | Forecast |\n" + "| Mon | Sunny, 21°C |\n" * 200
+        msg = Message.objects.create(conversation=self.conversation, sender='ai', content=text)
+        stored = Message.objects.get(id=msg.id)
+        self.assertEqual(stored.body, "")
+        self.assertLess(len(stored.body_z), len(text) // 10)
+        self.assertEqual(stored.content, text)
+        self.assertEqual(stored.preview, text[:120])
+
+    def test_short_bodies_stay_plain(self):
+        msg = Message.objects.create(conversation=self.conversation, sender='user', content="Weather in Paris?")
+        stored = Message.objects.only("id", "sender", "preview").get(id=msg.id)
+        self.assertEqual(str(stored), "user: Weather in Paris?...")
+        self.assertEqual(stored.content, "Weather in Paris?")
+        self.assertIsNone(stored.body_z)
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.conversation = Conversation.objects.create(title="Paris trip")
+        self.session = ConversationSession(self.conversation.id)
+        self.session.record_message('user', "Weather in Paris?")
+        self.session.record_message('ai', "Sunny " * 200)
+
+    def test_archive_and_restore(self):
+        before = list(Message.objects.filter(conversation=self.conversation).values_list("id", "timestamp", "sender"))
+        self.assertEqual(archive_conversation(self.conversation.id), 2)
+        self.assertFalse(Message.objects.filter(conversation=self.conversation).exists())
+        self.assertIsNotNone(Conversation.objects.get(id=self.conversation.id).archived_at)
+
+        self.assertEqual(restore_conversation(self.conversation.id), 2)
+        after = list(Message.objects.filter(conversation=self.conversation).values_list("id", "timestamp", "sender"))
+        self.assertEqual(after, before)
+        self.assertEqual(Message.objects.get(id=before[1][0]).content, "Sunny " * 200)
+        self.assertIsNone(Conversation.objects.get(id=self.conversation.id).archive)
+
+    def test_history_restores_lazily(self):
+        Conversation.objects.filter(id=self.conversation.id).update(updated_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(archive_cold_conversations(days=30), 1)
+        history = HistoryManager(self.conversation.id).load()
+        self.assertEqual([m.content for m in history], ["Weather in Paris?", "Sunny " * 200])
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Stand-in chat model: `reply(messages)` (a coroutine function) returns the next
+    AIMessage, which is streamed word by word (tool calls in one chunk).
+    """
+    reply: Any
+    calls: list = Field(default_factory=list)
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError("the chat graph runs async")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls.append(list(messages))
+        message = await self.reply(messages)
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(message.tool_calls)
+            ]))
+            return
+        words = message.content.split(" ")
+        for index, word in enumerate(words):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if index == len(words) - 1 else word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+
+class ChatConsumerTests(TransactionTestCase):
+    """
+    End-to-end runs through ChatConsumer, the checkpointed chat graph and ScriptedChatModel.
+    """
+
+    def setUp(self):
+        self.conversation = Conversation.objects.create()
+        self.searches = []
+
+        async def asearch_attractions(location, category, **kwargs):
+            self.searches.append((location, category))
+            return json.dumps({"location": location, "results": [{"name": "Louvre Museum"}]})
+
+        for patcher in (
+            mock.patch("agent.RESPONSE_CACHE_ENABLED", False),
+            mock.patch.dict(agent.async_tools_map, {"search_attractions": asearch_attractions}),
+            mock.patch("agent.tool_cache", ToolResultCache()),
+            mock.patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_chat(self, reply, scenario):
+        """
+        Runs `scenario(model)` against the consumer, with `reply` answering model calls.
+        """
+        model = ScriptedChatModel(reply=reply)
+        with llm_registry.model_factory(lambda name, temperature: model):
+            return asyncio.run(scenario(model))
+
+    async def connect(self):
+        socket = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.conversation.id}/")
+        connected, _ = await socket.connect()
+        self.assertTrue(connected)
+        return socket
+
+    async def receive_until_done(self, socket):
+        """
+        Frames up to and including the final answer (or a stopped or error frame).
+        """
+        frames = []
+        while True:
+            frame = await socket.receive_json_from(timeout=5)
+            frames.append(frame)
+            if frame.get("is_final") or frame.get("type") == "stopped" or "error" in frame:
+                return frames
+
+    def stored(self):
+        return [(m.sender, m.content) for m in Message.objects.filter(conversation=self.conversation).order_by("id")]
+
+    def thread_state(self):
+        thread_id = str(self.conversation.id)
+        return (GraphCheckpoint.objects.filter(thread_id=thread_id).exists(), thread_claimed(thread_id))
+
+    def test_follow_up_sent_mid_run_is_answered(self):
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def reply(messages):
+            if not started.is_set():
+                started.set()
+                await release.wait()
+            return AIMessage(content=f"Answer to {messages[-1].content}")
+
+        async def scenario(model):
+            socket = await self.connect()
+            await socket.send_json_to({"message": "Plan a trip to Rome"})
+            await started.wait()
+            await socket.send_json_to({"message": "Make it cheap"})
+            self.assertEqual((await socket.receive_json_from())["type"], "queued")
+            release.set()
+            first = (await self.receive_until_done(socket))[-1]
+            second = (await self.receive_until_done(socket))[-1]
+            await socket.disconnect()
+            return model, first, second
+
+        model, first, second = self.run_chat(reply, scenario)
+        self.assertEqual(first["message"], "Answer to Plan a trip to Rome")
+        self.assertEqual(second["message"], "Answer to Make it cheap")
+        # The follow-up run saw the first answer before the follow-up question
+        self.assertEqual([m.content for m in model.calls[1][-2:]], ["Answer to Plan a trip to Rome", "Make it cheap"])
+        self.assertEqual(self.stored(), [
+            ("user", "Plan a trip to Rome"), ("ai", "Answer to Plan a trip to Rome"),
+            ("user", "Make it cheap"), ("ai", "Answer to Make it cheap"),
+        ])
+
+    def test_streams_tokens_and_tool_progress(self):
+        async def scenario(model):
+            socket = await self.connect()
+            await socket.send_json_to({"message": "Museums in Paris?"})
+            frames = await self.receive_until_done(socket)
+            await socket.disconnect()
+            return frames
+
+        frames = self.run_chat(search_then_answer("See the Louvre today"), scenario)
+        self.assertEqual(frames, [
+            {"type": "tool_progress", "status": "started", "tools": ["search_attractions"]},
+            {"type": "tool_progress", "status": "finished"},
+            {"type": "ai_response", "message": "See ", "is_final": False},
+            {"type": "ai_response", "message": "the ", "is_final": False},
+            {"type": "ai_response", "message": "Louvre ", "is_final": False},
+            {"type": "ai_response", "message": "today", "is_final": False},
+            {"type": "ai_response", "message": "See the Louvre today", "is_final": True},
+        ])
+        self.assertEqual(self.searches, [("Paris", "museum")])
+        self.assertEqual([sender for sender, _ in self.stored()], ["user", "ai", "tool", "ai"])
+        # The thread is kept for the next turn; its lease is released
+        self.assertEqual(self.thread_state(), (True, False))
+
+    def test_stop_keeps_completed_tool_exchanges(self):
+        answering = asyncio.Event()
+        search = search_then_answer("never sent")
+
+        async def reply(messages):
+            if isinstance(messages[-1], ToolMessage):
+                answering.set()
+                await asyncio.Event().wait()
+            return await search(messages)
+
+        async def scenario(model):
+            socket = await self.connect()
+            await socket.send_json_to({"message": "Museums in Paris?"})
+            await answering.wait()
+            await socket.send_json_to({"type": "stop"})
+            frames = await self.receive_until_done(socket)
+            await socket.disconnect()
+            return frames
+
+        frames = self.run_chat(reply, scenario)
+        self.assertEqual(frames[-1], {"type": "stopped"})
+        self.assertEqual([sender for sender, _ in self.stored()], ["user", "ai", "tool"])
+        # The stopped run's partial state is dropped, the next turn rebases from the history
+        self.assertEqual(self.thread_state(), (False, False))
+
+    def test_disconnect_discards_the_run(self):
+        answering = asyncio.Event()
+
+        async def reply(messages):
+            answering.set()
+            await asyncio.Event().wait()
+
+        async def scenario(model):
+            socket = await self.connect()
+            await socket.send_json_to({"message": "Plan a trip to Rome"})
+            await answering.wait()
+            await socket.disconnect()
+
+        self.run_chat(reply, scenario)
+        self.assertNotIn(str(self.conversation.id), scheduler.running)
+        self.assertEqual(self.stored(), [("user", "Plan a trip to Rome")])
+        self.assertEqual(self.thread_state(), (False, False))
+
+    def plan_turns(self, scenario_messages):
+        """
+        Sends each message in turn over one socket; returns the graph inputs of every
+        run (see checkpoints.thread_inputs) and the scripted model.
+        """
+        inputs = []
+
+        def recording_thread_inputs(*args):
+            planned = thread_inputs(*args)
+            inputs.append(planned[0])
+            return planned
+
+        async def reply(messages):
+            return AIMessage(content=f"Answer to {messages[-1].content}")
+
+        async def scenario(model):
+            socket = await self.connect()
+            for message in scenario_messages:
+                await socket.send_json_to({"message": message})
+                await self.receive_until_done(socket)
+            await socket.disconnect()
+            return model
+
+        with mock.patch("chat.runs.thread_inputs", side_effect=recording_thread_inputs):
+            model = self.run_chat(reply, scenario)
+        return inputs, model
+
+    def test_next_turn_continues_the_thread(self):
+        inputs, model = self.plan_turns(["Plan a trip to Rome", "Make it cheap"])
+        self.assertIsInstance(inputs[0]["messages"][0], RemoveMessage)
+        self.assertEqual([m.content for m in inputs[1]["messages"]], ["Make it cheap"])
+        self.assertEqual([m.content for m in model.calls[1][-3:]],
+                         ["Plan a trip to Rome", "Answer to Plan a trip to Rome", "Make it cheap"])
+
+    def test_oversized_thread_is_rebased(self):
+        with mock.patch("chat.checkpoints.REBASE_TOKENS", 0):
+            inputs, model = self.plan_turns(["Plan a trip to Rome", "Make it cheap"])
+        self.assertIsInstance(inputs[1]["messages"][0], RemoveMessage)
+        self.assertEqual([m.content for m in model.calls[1][-3:]],
+                         ["Plan a trip to Rome", "Answer to Plan a trip to Rome", "Make it cheap"])
+
+    def test_interrupted_run_resumes_on_connect(self):
+        answering = asyncio.Event()
+        search = search_then_answer("See the Louvre")
+
+        async def reply(messages):
+            if isinstance(messages[-1], ToolMessage) and not answering.is_set():
+                answering.set()
+                await asyncio.Event().wait()
+            return await search(messages)
+
+        async def discard(frame):
+            pass
+
+        async def scenario(model):
+            # A run that died after its tool step, leaving its checkpoints and no lease behind
+            session = ConversationSession(self.conversation.id)
+            await sync_to_async(session.record_message)("user", "Museums in Paris?")
+            await sync_to_async(session.flush)()
+            inputs, _ = thread_inputs([], False, [HumanMessage(content="Museums in Paris?")])
+            crashed = asyncio.ensure_future(stream_run(inputs, thread_config(str(self.conversation.id)), discard))
+            await answering.wait()
+            crashed.cancel()
+            await asyncio.gather(crashed, return_exceptions=True)
+
+            socket = await self.connect()
+            frames = await self.receive_until_done(socket)
+            await socket.disconnect()
+            return frames
+
+        frames = self.run_chat(reply, scenario)
+        self.assertEqual(frames[-1], {"type": "ai_response", "message": "See the Louvre", "is_final": True})
+        # The search ran once; the resumed run went straight to the answer
+        self.assertEqual(self.searches, [("Paris", "museum")])
+        self.assertEqual([sender for sender, _ in self.stored()], ["user", "ai", "tool", "ai"])
+
+    def test_worker_mode(self):
+        async def scenario(model):
+            layer = get_channel_layer()
+            worker = Worker(application=ChannelNameRouter({AGENT_RUN_CHANNEL: AgentRunConsumer.as_asgi()}),
+                            channels=[AGENT_RUN_CHANNEL], channel_layer=layer)
+            handling = asyncio.ensure_future(worker.handle())
+            try:
+                socket, other = await self.connect(), await self.connect()
+                await socket.send_json_to({"message": "Museums in Paris?"})
+                frames = await self.receive_until_done(socket)
+                watched = await self.receive_until_done(other)
+                await socket.disconnect()
+                await other.disconnect()
+            finally:
+                handling.cancel()
+                await asyncio.gather(handling, return_exceptions=True)
+            return frames, watched
+
+        with mock.patch("chat.consumers.WORKER_MODE", True):
+            frames, watched = self.run_chat(search_then_answer("See the Louvre"), scenario)
+        final = {"type": "ai_response", "message": "See the Louvre", "is_final": True}
+        self.assertEqual(frames[0], {"type": "tool_progress", "status": "started", "tools": ["search_attractions"]})
+        self.assertEqual(frames[-1], final)
+        # Other sockets of the conversation follow the run through the group
+        self.assertEqual(watched, frames)
+        self.assertEqual([sender for sender, _ in self.stored()], ["user", "ai", "tool", "ai"])
+        self.assertEqual(self.thread_state(), (True, False))
+
+
+def search_then_answer(answer):
+    """
+    Reply script: a search_attractions call for each new question, then `answer`.
+    """
+    async def reply(messages):
+        if isinstance(messages[-1], HumanMessage):
+            return AIMessage(content="", tool_calls=[
+                {"name": "search_attractions", "args": {"location": "Paris", "category": "museum"}, "id": f"call_{len(messages)}"}
+            ])
+        return AIMessage(content=answer)
+    return reply
@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from .archive import restore_conversation
 from .models import Conversation
 import uuid
 
@@ -11,10 +12,13 @@ def chat_view(request, conversation_id):
     # but to render the page, we might just pass the ID.
     # However, to show history, the object should exist.
     
-    conversation, created = Conversation.objects.get_or_create(id=conversation_id)
+    conversation, created = Conversation.objects.defer("archive").get_or_create(id=conversation_id)
+    if conversation.archived_at is not None:
+        # Cold conversation: unpack its messages for the history below
+        restore_conversation(conversation.id)
     
-    # Get recent conversations for sidebar
-    recent_chats = Conversation.objects.all()[:20] 
+    # Get recent conversations for sidebar (only what the list shows, never message bodies or archives)
+    recent_chats = Conversation.objects.only("id", "title", "updated_at")[:20]
     
     return render(request, 'chat/index.html', {
         'conversation': conversation,
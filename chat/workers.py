@@ -0,0 +1,101 @@
+"""
+Background agent workers.
+
+With CHAT_AGENT_WORKERS enabled, ChatConsumer only handles the socket and the
+database: it enqueues each agent run on the AGENT_RUN_CHANNEL channel. Worker
+processes started with
+
+    python manage.py runworker agent-runs
+
+execute the graph and publish its frames to the conversation's group. The
+originating consumer then receives the finished run for persistence. Socket
+servers and LLM workers can therefore be scaled separately, as long as all of
+them share the channel layer (see chat/layers.py).
+"""
+
+import asyncio
+import logging
+from contextlib import suppress
+
+from channels.consumer import AsyncConsumer
+from django.conf import settings
+
+from .history import completed_messages
+from .runs import dump_messages, load_messages, run_thread
+
+logger = logging.getLogger(__name__)
+
+WORKER_MODE = getattr(settings, "CHAT_AGENT_WORKERS", False)
+AGENT_RUN_CHANNEL = getattr(settings, "CHAT_AGENT_RUN_CHANNEL", "agent-runs")
+# Seconds a consumer waits for a worker to finish a run before freeing the conversation
+WORKER_RUN_TIMEOUT = getattr(settings, "CHAT_WORKER_RUN_TIMEOUT", 300)
+
+
+class AgentRunConsumer(AsyncConsumer):
+    """
+    Executes "agent.run" messages:
+    {"group", "reply_channel", "cancel_channel", "thread_id", "query", "messages": [serialized history]}.
+    An "agent.cancel" message on cancel_channel aborts the run.
+    """
+
+    async def agent_run(self, message):
+        group = message["group"]
+
+        async def emit(frame):
+            await self.channel_layer.group_send(group, {"type": "agent.frame", "frame": frame})
+
+        run_messages = []
+        done = {"type": "agent.done", "query": message.get("query")}
+        try:
+            run = run_thread(message["thread_id"], load_messages(message["messages"]), emit, run_messages)
+            final_content, cancelled = await self.run_cancellable(run, message.get("cancel_channel"))
+            if cancelled:
+                # The completed tool exchanges are kept; partial text is discarded
+                await self.channel_layer.group_send(group, {
+                    "type": "agent.frame",
+                    "origin": message["reply_channel"],
+                    "frame": {'type': 'stopped'},
+                })
+                done.update(cancelled=True, run_messages=dump_messages(completed_messages(run_messages)))
+            else:
+                if final_content is not None:
+                    # Other sockets in the conversation see the final frame now; the originating
+                    # socket sends its own once the run is persisted (see ChatConsumer.agent_done)
+                    await self.channel_layer.group_send(group, {
+                        "type": "agent.frame",
+                        "origin": message["reply_channel"],
+                        "frame": {
+                            'type': 'ai_response',
+                            'message': final_content,
+                            'is_final': True
+                        },
+                    })
+                done.update(final=final_content, run_messages=dump_messages(run_messages))
+        except Exception as e:
+            logger.error(f"Error in agent worker: {e}")
+            done["error"] = str(e)
+        # Only the socket that started the run persists it
+        await self.channel_layer.send(message["reply_channel"], done)
+
+    async def run_cancellable(self, run, cancel_channel):
+        """
+        Awaits the `run` coroutine unless an "agent.cancel" arrives on cancel_channel
+        first, in which case the run is cancelled (aborting its pending LLM and HTTP calls).
+        Returns (result, cancelled).
+        """
+        task = asyncio.ensure_future(run)
+        if not cancel_channel:
+            return await task, False
+        watcher = asyncio.ensure_future(self.channel_layer.receive(cancel_channel))
+        try:
+            await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watcher.cancel()
+            cancelled = not task.done()
+            if cancelled:
+                task.cancel()
+        if not cancelled:
+            return task.result(), False
+        with suppress(asyncio.CancelledError):
+            await task
+        return None, True
@@ -0,0 +1,159 @@
+"""
+Distance engine for calculate_travel_distance and multi-stop planning.
+Great-circle distances are computed with a vectorized haversine over cached
+geocoded coordinates, then scaled by per-mode detour and speed profiles.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# detour: typical route length / straight-line distance; speed: average door-to-door km/h
+MODE_PROFILES = {
+    "driving": {"speed_kmh": 60.0, "detour": 1.3},
+    "transit": {"speed_kmh": 50.0, "detour": 1.25},
+    "bicycling": {"speed_kmh": 15.0, "detour": 1.25},
+    "walking": {"speed_kmh": 5.0, "detour": 1.2},
+}
+DEFAULT_MODE = "driving"
+
+
+def mode_profile(mode: str) -> dict:
+    return MODE_PROFILES.get((mode or DEFAULT_MODE).lower(), MODE_PROFILES[DEFAULT_MODE])
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distance in km; arguments are scalars or broadcastable arrays of degrees.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def pairwise_haversine_km(coords) -> np.ndarray:
+    """
+    N x N great-circle distance matrix for an (N, 2) array of (lat, lon).
+    """
+    coords = np.asarray(coords, dtype=float)
+    lat, lon = coords[:, 0], coords[:, 1]
+    return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+
+def format_duration(hours: float) -> str:
+    total_minutes = int(round(float(hours) * 60))
+    return f"{total_minutes // 60}h {total_minutes % 60}m"
+
+
+class DistanceEngine:
+    """
+    Resolves place names through `geocoder(place) -> (lat, lon)` (the cached
+    geocoder in tool_implementations) and costs routes in batches.
+    """
+
+    def __init__(self, geocoder):
+        self.geocoder = geocoder
+
+    def locate(self, places):
+        """
+        Returns an (N, 2) coordinate array for `places` and the list of names that
+        could not be geocoded (their rows are NaN). Each distinct name is looked up once.
+        """
+        resolved = {}
+        for place in places:
+            if place not in resolved:
+                lat, lon = self.geocoder(place)
+                resolved[place] = (lat, lon) if lat is not None else (np.nan, np.nan)
+        coords = np.array([resolved[p] for p in places], dtype=float).reshape(len(places), 2)
+        missing = [p for p in resolved if np.isnan(resolved[p][0])]
+        return coords, missing
+
+    def costs(self, straight_km, mode: str = DEFAULT_MODE):
+        """
+        Converts straight-line km into (route km, hours) arrays for a travel mode.
+        """
+        profile = mode_profile(mode)
+        route_km = np.asarray(straight_km, dtype=float) * profile["detour"]
+        return route_km, route_km / profile["speed_kmh"]
+
+    def distances(self, origins, destinations, mode: str = DEFAULT_MODE):
+        """
+        Batch API for origin/destination pairs. Returns (route_km, hours, missing).
+        """
+        coords, missing = self.locate(list(origins) + list(destinations))
+        n = len(origins)
+        straight = haversine_km(coords[:n, 0], coords[:n, 1], coords[n:, 0], coords[n:, 1])
+        route_km, hours = self.costs(straight, mode)
+        return route_km, hours, missing
+
+    def matrix(self, places, mode: str = DEFAULT_MODE):
+        """
+        Distance/time matrix for a list of places. Returns (route_km, hours, missing), N x N arrays.
+        """
+        coords, missing = self.locate(list(places))
+        route_km, hours = self.costs(pairwise_haversine_km(coords), mode)
+        return route_km, hours, missing
+
+
+# --- Route Optimization ---
+
+def _path_cost(dist, order, closed: bool) -> float:
+    cost = sum(dist[a, b] for a, b in zip(order, order[1:]))
+    if closed and len(order) > 1:
+        cost += dist[order[-1], order[0]]
+    return float(cost)
+
+
+def nearest_neighbour_order(dist, start: int = 0):
+    n = len(dist)
+    order = [start]
+    remaining = set(range(n)) - {start}
+    while remaining:
+        last = order[-1]
+        nxt = min(remaining, key=lambda j: (dist[last, j], j))
+        order.append(nxt)
+        remaining.remove(nxt)
+    return order
+
+
+def two_opt(dist, order, closed: bool = False, max_passes: int = 50):
+    """
+    Improves a visiting order by reversing segments while that shortens it.
+    The first stop stays fixed; for open routes the last stop may change.
+    """
+    order = list(order)
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            for k in range(i + 1, n):
+                a, b = order[i - 1], order[i]
+                c = order[k]
+                if k + 1 < n:
+                    d = order[k + 1]
+                elif closed:
+                    d = order[0]
+                else:
+                    d = None
+                delta = dist[a, c] - dist[a, b]
+                if d is not None:
+                    delta += dist[b, d] - dist[c, d]
+                if delta < -1e-9:
+                    order[i:k + 1] = reversed(order[i:k + 1])
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def optimize_route(dist, start: int = 0, closed: bool = False):
+    """
+    Visiting order for a distance matrix: nearest-neighbour construction refined by 2-opt.
+    Returns (order, total cost).
+    """
+    dist = np.asarray(dist, dtype=float)
+    if len(dist) <= 2:
+        order = list(range(len(dist)))
+    else:
+        order = two_opt(dist, nearest_neighbour_order(dist, start), closed)
+    return order, _path_cost(dist, order, closed)
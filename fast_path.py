@@ -0,0 +1,155 @@
+"""
+Deterministic fast path for the agent graph.
+One-shot questions with an unambiguous shape ("What's the weather in Paris?")
+are matched against anchored patterns, answered by calling the tool directly
+and rendered from a template, which skips both LLM round trips. Anything that
+does not match with high confidence (or whose tool call fails) falls through
+to the full agent.
+"""
+
+import json
+import re
+import threading
+
+# A place name: up to four words of letters, dots, apostrophes or hyphens
+# (lazy, so trailing words like "today" are not swallowed into the name)
+_PLACE = r"[^\W\d_][\w.'-]*(?: [^\W\d_][\w.'-]*){0,3}?"
+
+INTENTS = (
+    (
+        "get_current_weather",
+        re.compile(
+            rf"(?:(?:what(?:'s| is)|how(?:'s| is)) (?:the )?)?(?:current )?weather(?: like)? (?:in|for|at) "
+            rf"(?P<city>{_PLACE})(?: (?:right now|now|today|currently))?",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "get_weather_forecast",
+        re.compile(
+            rf"(?:(?:what(?:'s| is) )?(?:the )?)?(?:weather )?forecast (?:for|in) (?P<location>{_PLACE})"
+            rf"(?: (?:for )?(?:the )?(?:next )?(?P<days>[1-5]) days?)?",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        "calculate_travel_distance",
+        re.compile(
+            rf"(?:how far is it|what(?:'s| is) the distance) from (?P<origin>{_PLACE}) to (?P<destination>{_PLACE})",
+            re.IGNORECASE,
+        ),
+    ),
+)
+
+# Captures that point back into the conversation (or name several places) need the LLM
+AMBIGUOUS_WORDS = frozenset({"there", "here", "it", "that", "this", "my", "our", "and", "or", "vs", "versus", "both"})
+# A time the pattern did not consume ("in Paris tomorrow") changes the question
+TIME_WORDS = frozenset({
+    "today", "tonight", "tomorrow", "yesterday", "now", "later", "soon", "on", "next", "last",
+    "morning", "afternoon", "evening", "night", "weekend", "week", "month", "year",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+})
+# A place starting with an article or determiner ("the city", "a beach") is not a name to geocode
+DETERMINERS = frozenset({"the", "a", "an", "some", "any", "every", "each", "which", "what", "your", "their"})
+
+
+def _clean(text: str) -> str:
+    return " ".join((text or "").split()).rstrip("?!. ")
+
+
+def route(text: str):
+    """
+    Returns (tool_name, arguments) for a high-confidence simple query, else None.
+    """
+    text = _clean(text)
+    for tool_name, pattern in INTENTS:
+        match = pattern.fullmatch(text)
+        if not match:
+            continue
+        arguments = {name: value for name, value in match.groupdict().items() if value is not None}
+        words = {w.lower() for value in arguments.values() for w in value.split()}
+        if words & (AMBIGUOUS_WORDS | TIME_WORDS):
+            return None
+        if any(value.split()[0].lower() in DETERMINERS for value in arguments.values()):
+            return None
+        if "days" in arguments:
+            arguments["days"] = int(arguments["days"])
+        return tool_name, arguments
+    return None
+
+
+# --- Templates ---
+
+def _render_current_weather(data: dict) -> str:
+    return (
+        f"Right now in **{data['location']}** it's **{data['temperature']}** and "
+        f"**{data['conditions'].lower()}**, with wind at {data['wind_speed']}."
+    )
+
+
+def _render_forecast(data: dict) -> str:
+    lines = [f"Here's the forecast for **{data['location']}**:", ""]
+    lines += [f"- **{day['date']}**: {day['condition']}, {day['low']} to {day['high']}" for day in data["forecast"]]
+    return "\n".join(lines)
+
+
+def _render_distance(data: dict) -> str:
+    travel_time = data.get("travel_time") or data.get("time")
+    return (
+        f"**{data['origin']}** to **{data['destination']}** is about **{data['distance']}** "
+        f"by {data['mode']}, roughly **{travel_time}**."
+    )
+
+
+TEMPLATES = {
+    "get_current_weather": _render_current_weather,
+    "get_weather_forecast": _render_forecast,
+    "calculate_travel_distance": _render_distance,
+}
+
+
+def render(tool_name: str, result) -> str:
+    """
+    Templated answer for a tool result, or None if the result is an error
+    (the caller then falls back to the agent).
+    """
+    try:
+        data = json.loads(result)
+        if not isinstance(data, dict) or "error" in data:
+            return None
+        return TEMPLATES[tool_name](data)
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+# --- Metrics ---
+
+class RouterStats:
+    """
+    hits: answered from a template; misses: no intent matched;
+    fallbacks: an intent matched but the tool result could not be rendered.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.fallbacks = 0
+
+    def record(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.fallbacks = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses + self.fallbacks
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+router_stats = RouterStats()
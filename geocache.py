@@ -0,0 +1,155 @@
+"""
+Geocoding cache for the Smart Weather & Travel Assistant.
+City coordinates practically never change, so lookups are served from an
+in-process LRU backed by a persistent SQLite table instead of hitting the
+Open-Meteo geocoding API on every weather tool call.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# --- Configuration ---
+DEFAULT_CACHE_PATH = os.environ.get(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite3"),
+)
+DEFAULT_TTL = int(os.environ.get("GEOCODE_CACHE_TTL", 30 * 24 * 3600))  # 30 days
+DEFAULT_NEGATIVE_TTL = int(os.environ.get("GEOCODE_NEGATIVE_TTL", 24 * 3600))  # 1 day
+DEFAULT_MAX_ENTRIES = int(os.environ.get("GEOCODE_CACHE_SIZE", 1024))
+
+# Returned by GeocodeCache.get() when nothing usable is cached.
+MISS = object()
+
+
+def normalize_key(city: str, country_code: str = None) -> str:
+    """
+    Builds the cache key: case-folded, whitespace-collapsed city plus country code.
+    """
+    city_norm = " ".join(unicodedata.normalize("NFKC", city or "").casefold().split())
+    country_norm = (country_code or "").strip().upper()
+    return f"{city_norm}|{country_norm}"
+
+
+class GeocodeCache:
+    """
+    Two-level cache: an in-memory LRU in front of a SQLite table.
+    Values are (lat, lon) tuples, or (None, None) for "not found" results
+    which are kept for a shorter negative TTL.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: int = DEFAULT_TTL,
+                 negative_ttl: int = DEFAULT_NEGATIVE_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lru = OrderedDict()  # key -> (lat, lon, expires_at)
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    def _db(self):
+        # Opened lazily so importing the module never touches the filesystem
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " key TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, lat, lon, expires_at):
+        self._lru[key] = (lat, lon, expires_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, city: str, country_code: str = None):
+        """
+        Returns (lat, lon) — possibly (None, None) for a cached "not found" — or MISS.
+        """
+        key = normalize_key(city, country_code)
+        now = self._clock()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry[2] <= now:
+                del self._lru[key]
+                entry = None
+            if entry is None:
+                try:
+                    row = self._db().execute(
+                        "SELECT lat, lon, expires_at FROM geocode WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Geocode cache read failed: {e}")
+                    row = None
+                if row is not None and row[2] > now:
+                    entry = row
+                    self._remember(key, *row)
+            else:
+                self._lru.move_to_end(key)
+
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self.hits += 1
+            if entry[0] is None:
+                self.negative_hits += 1
+            return entry[0], entry[1]
+
+    def set(self, city: str, country_code: str, lat, lon):
+        """
+        Stores a lookup result. Pass lat=lon=None to cache a "not found" answer.
+        """
+        key = normalize_key(city, country_code)
+        ttl = self.negative_ttl if lat is None else self.ttl
+        expires_at = self._clock() + ttl
+        with self._lock:
+            self._remember(key, lat, lon, expires_at)
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO geocode (key, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, lat, lon, expires_at),
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Geocode cache write failed: {e}")
+
+    def clear(self):
+        """
+        Drops every cached entry and resets the counters.
+        """
+        with self._lock:
+            self._lru.clear()
+            self.hits = self.misses = self.negative_hits = 0
+            try:
+                db = self._db()
+                db.execute("DELETE FROM geocode")
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"Geocode cache clear failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._lru),
+            }
+
+
+# Shared instance used by tool_implementations
+geocode_cache = GeocodeCache()
@@ -0,0 +1,148 @@
+"""
+Shared HTTP client for the Smart Weather & Travel Assistant.
+All Open-Meteo calls go through the pooled session here so that DNS, TCP and
+TLS setup is paid once per host instead of once per tool call.
+"""
+
+import asyncio
+import os
+import random
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Configuration ---
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", 0.3))
+BACKOFF_JITTER = float(os.environ.get("HTTP_BACKOFF_JITTER", 0.2))
+POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", 4))  # distinct hosts kept pooled
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", 10))  # connections per host
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+    "User-Agent": "smart-travel-assistant/1.0",
+}
+
+
+# --- Sync Session ---
+
+def build_session() -> requests.Session:
+    """
+    Creates a keep-alive session with per-host pooling and jittered retries on 429/5xx.
+    """
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        backoff_jitter=BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    s = requests.Session()
+    s.headers.update(DEFAULT_HEADERS)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+session = build_session()
+
+
+def get_json(url: str, params: dict = None, timeout=None):
+    """
+    GET a URL through the shared session and return the decoded JSON body.
+    Raises requests.HTTPError once retries are exhausted.
+    """
+    response = session.get(url, params=params, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT))
+    response.raise_for_status()
+    return response.json()
+
+
+# --- Async Client ---
+
+# httpx clients are bound to the event loop that created their connections
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    Returns the pooled httpx.AsyncClient for the running event loop.
+    """
+    import httpx  # optional dependency, only needed for the async tool path
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                                max_keepalive_connections=POOL_MAXSIZE),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _backoff_delay(attempt: int, retry_after: str = None) -> float:
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_JITTER)
+
+
+async def aget_json(url: str, params: dict = None, timeout=None):
+    """
+    Async counterpart of get_json() with the same retry policy.
+    """
+    import httpx
+
+    client = get_async_client()
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            response = await client.get(url, params=params, timeout=timeout or httpx.USE_CLIENT_DEFAULT)
+        except httpx.TransportError:
+            if attempt == MAX_RETRIES:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                response.raise_for_status()
+                return response.json()
+            retry_after = response.headers.get("Retry-After")
+        await asyncio.sleep(_backoff_delay(attempt, retry_after))
+
+
+async def aclose():
+    """
+    Closes the async client of the running event loop (e.g. on worker shutdown).
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def configure(**overrides):
+    """
+    Overrides module settings (e.g. MAX_RETRIES=0, READ_TIMEOUT=2) and rebuilds the shared session.
+    """
+    global session
+    for name, value in overrides.items():
+        if name not in globals() or not name.isupper():
+            raise ValueError(f"Unknown HTTP client setting: {name}")
+        globals()[name] = value
+    session.close()
+    session = build_session()
+    _async_clients.clear()
@@ -0,0 +1,116 @@
+"""
+Model client registry for the Smart Weather & Travel Assistant.
+Chat models are expensive to set up (schema conversion, HTTP client and its
+connection pool), so each configuration is built once and shared by every
+agent step and conversation in the process.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+
+DEFAULT_MODEL = "gpt-4o"
+DEFAULT_TEMPERATURE = 0
+
+
+def openai_factory(model: str, temperature: float):
+    """
+    Default factory: a ChatOpenAI client (imported lazily so tests can run without it).
+    """
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model=model, temperature=temperature)
+
+
+_factory = openai_factory
+_base_models = {}  # (model, temperature) -> chat model
+_bound_models = {}  # (model, temperature, tools_key) -> chat model with tools bound
+_tools_keys = {}  # id(tools) -> (tools, tools_key)
+_lock = threading.Lock()
+
+
+def _tools_key(tools) -> str:
+    """
+    Canonical JSON so that equal schema lists share one bound model. The agent
+    passes the same schema list on every hop, so the fingerprint is computed
+    once per list object; a list must not be mutated after it has been bound.
+    """
+    entry = _tools_keys.get(id(tools))
+    if entry is not None and entry[0] is tools:
+        return entry[1]
+    key = json.dumps(list(tools or []), sort_keys=True, separators=(",", ":"))
+    with _lock:
+        if len(_tools_keys) >= 256:
+            _tools_keys.clear()
+        # Holding the list keeps its id from being reused by another object
+        _tools_keys[id(tools)] = (tools, key)
+    return key
+
+
+def get_model(model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE):
+    """
+    Returns the shared chat model for (model, temperature), creating it on first use.
+    """
+    key = (model, temperature)
+    llm = _base_models.get(key)
+    if llm is None:
+        with _lock:
+            llm = _base_models.get(key)
+            if llm is None:
+                llm = _factory(model, temperature)
+                _base_models[key] = llm
+    return llm
+
+
+def get_bound_model(tools, model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE):
+    """
+    Returns the shared chat model with `tools` bound. Bound variants reuse the
+    base model (and therefore its HTTP connection pool).
+    """
+    key = (model, temperature, _tools_key(tools))
+    bound = _bound_models.get(key)
+    if bound is None:
+        base = get_model(model, temperature)
+        with _lock:
+            bound = _bound_models.get(key)
+            if bound is None:
+                bound = base.bind_tools(list(tools))
+                _bound_models[key] = bound
+    return bound
+
+
+def set_model_factory(factory):
+    """
+    Replaces the factory used to build models, e.g. with a local fake for tests.
+    `factory(model, temperature)` must return an object with invoke/ainvoke/bind_tools.
+    Previously built models are discarded.
+    """
+    global _factory
+    with _lock:
+        _factory = factory or openai_factory
+        _base_models.clear()
+        _bound_models.clear()
+        _tools_keys.clear()
+
+
+def reset():
+    """
+    Drops all cached models and restores the OpenAI factory.
+    """
+    set_model_factory(None)
+
+
+@contextmanager
+def model_factory(factory):
+    """
+    Temporarily swaps the model factory:
+
+        with llm_registry.model_factory(lambda model, temperature: FakeModel()):
+            app.invoke(...)
+    """
+    previous = _factory
+    set_model_factory(factory)
+    try:
+        yield
+    finally:
+        set_model_factory(previous)
@@ -0,0 +1,193 @@
+"""
+Packing rule engine for the get_packing_suggestions tool.
+Rules (weather, trip type, duration) live in data/packing_rules.json and are
+compiled once into flag checks, a trip-type lookup table and precompiled
+matchers. Every trip is reduced to a small tuple of facts, and identical facts
+share one generated list, which keeps batch mode cheap.
+"""
+
+import json
+import os
+import re
+import threading
+
+from wmo import decode, flags_from_text
+
+DEFAULT_RULES_PATH = os.environ.get(
+    "PACKING_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "packing_rules.json"),
+)
+
+# First number in a free-text weather description, e.g. "rainy, 20C" -> 20
+TEMPERATURE_PATTERN = re.compile(r"(-?\d+(?:\.\d+)?)")
+WEATHER_FLAGS = ("cold", "hot", "rain", "snow", "thunder")
+
+
+def _temperature(value):
+    """
+    Accepts numbers or strings like "20°C"; returns a float or None.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = TEMPERATURE_PATTERN.search(str(value or ""))
+    return float(match.group(1)) if match else None
+
+
+class PackingRuleEngine:
+    """
+    Compiled packing rules. Build it from the rules document (see data/packing_rules.json).
+    """
+
+    def __init__(self, rules: dict):
+        self.essentials = list(rules["essentials"])
+        self.cold_below = rules["thresholds"]["cold_below_c"]
+        self.hot_from = rules["thresholds"]["hot_from_c"]
+        self.cold_months = frozenset(m.lower() for m in rules.get("cold_months", []))
+
+        # Weather rules become (flag index, expected value) checks against the facts tuple
+        self.weather_rules = []
+        for rule in rules.get("weather_rules", []):
+            checks = tuple((WEATHER_FLAGS.index(flag), bool(value)) for flag, value in rule["when"].items())
+            self.weather_rules.append((checks, rule.get("clothing", []), rule.get("gear", [])))
+
+        # Trip types: exact keywords resolve through a dict, anything else through one
+        # alternation regex; the earliest rule wins, as in the original if/elif chain
+        self.trip_rules = [(rule.get("clothing", []), rule.get("gear", [])) for rule in rules.get("trip_rules", [])]
+        self.trip_lookup = {}
+        for index, rule in enumerate(rules.get("trip_rules", [])):
+            for keyword in rule["match"]:
+                self.trip_lookup.setdefault(keyword.lower(), index)
+        self.trip_matchers = [
+            re.compile("|".join(re.escape(k.lower()) for k in rule["match"]))
+            for rule in rules.get("trip_rules", [])
+        ]
+
+        self.duration_rules = sorted(
+            ((rule["min_days"], rule.get("clothing", []), rule.get("gear", [])) for rule in rules.get("duration_rules", [])),
+            key=lambda r: r[0],
+        )
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_RULES_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # --- Facts ---
+
+    def trip_rule(self, trip_type: str):
+        trip_type = (trip_type or "").lower()
+        if trip_type in self.trip_lookup:
+            return self.trip_lookup[trip_type]
+        for index, matcher in enumerate(self.trip_matchers):
+            if matcher.search(trip_type):
+                return index
+        return None
+
+    def weather_facts(self, forecast=None, weather_context: str = None, month: str = None) -> tuple:
+        """
+        Reduces the weather input to the WEATHER_FLAGS tuple. Structured `forecast` days
+        (dicts with high/low and condition or weathercode, as get_weather_forecast returns)
+        take precedence over free-text `weather_context`, which takes precedence over `month`.
+        """
+        cold = hot = False
+        flags = set()
+        if forecast:
+            highs = []
+            for day in forecast:
+                high = _temperature(day.get("high", day.get("temperature_2m_max")))
+                if high is not None:
+                    highs.append(high)
+                if day.get("weathercode") is not None:
+                    decoded = decode(day["weathercode"])
+                    flags |= {flag for flag in ("rain", "snow", "thunder") if decoded[flag]}
+                else:
+                    flags |= flags_from_text(day.get("condition"))
+            if highs:
+                cold = min(highs) < self.cold_below
+                hot = max(highs) >= self.hot_from
+        elif weather_context:
+            flags = flags_from_text(weather_context)
+            cold = "cold" in weather_context.lower()
+            temp = _temperature(weather_context)
+            if temp is not None:
+                cold = cold or temp < self.cold_below
+                hot = temp >= self.hot_from
+        elif month:
+            cold = month.lower() in self.cold_months
+        cold = cold or "snow" in flags
+        return (cold, hot and not cold, "rain" in flags, "snow" in flags, "thunder" in flags)
+
+    # --- Suggestions ---
+
+    def _build(self, weather: tuple, trip_index, duration_days: int):
+        clothing, gear = [], []
+        for checks, rule_clothing, rule_gear in self.weather_rules:
+            if all(weather[i] == expected for i, expected in checks):
+                clothing.extend(rule_clothing)
+                gear.extend(rule_gear)
+        if trip_index is not None:
+            clothing.extend(self.trip_rules[trip_index][0])
+            gear.extend(self.trip_rules[trip_index][1])
+        outfits = duration_days + 1
+        for min_days, rule_clothing, rule_gear in self.duration_rules:
+            if duration_days < min_days:
+                break
+            clothing.extend(item.format(outfits=outfits) for item in rule_clothing)
+            gear.extend(rule_gear)
+        # Several rules may suggest the same item; keep the first occurrence
+        return list(dict.fromkeys(clothing)), list(dict.fromkeys(gear))
+
+    def suggest(self, destination: str, duration_days: int, trip_type: str, month: str = None,
+                weather_context: str = None, forecast=None) -> dict:
+        """
+        Packing list for one trip, in the get_packing_suggestions result shape.
+        """
+        key = (self.weather_facts(forecast, weather_context, month), self.trip_rule(trip_type), duration_days)
+        built = self._memo.get(key)
+        if built is None:
+            built = self._build(*key)
+            with self._lock:
+                if len(self._memo) >= 4096:
+                    self._memo.clear()
+                self._memo[key] = built
+        clothing, gear = built
+        return {
+            "destination": destination,
+            "trip_type": trip_type,
+            "recommendations": {
+                "essentials": list(self.essentials),
+                "clothing": list(clothing),
+                "gear": list(gear),
+                "notes": f"Packing list generated for {duration_days} days in {destination} ({trip_type}).",
+            },
+        }
+
+    def suggest_many(self, trips) -> list:
+        """
+        Batch mode: `trips` is an iterable of dicts with suggest()'s keyword arguments
+        (one per traveller or trip). Trips with the same facts share one built list.
+        """
+        return [self.suggest(**trip) for trip in trips]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> PackingRuleEngine:
+    """
+    Shared engine, compiled from PACKING_RULES_PATH on first use.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PackingRuleEngine.load()
+    return _engine
+
+
+def set_engine(engine: PackingRuleEngine):
+    global _engine
+    _engine = engine
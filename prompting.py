@@ -0,0 +1,122 @@
+"""
+Prompt assembly for the agent.
+Every model call starts with the same byte-identical prefix: one shared system
+prompt plus the tool schemas, both bound once and never rebuilt. Providers cache
+that prefix across calls and conversations. Keep anything that varies, such as
+dates, user names or summaries, out of SYSTEM_PROMPT and after it in the list.
+The prompt is inserted once when a run starts (see assemble) rather than on
+every agent hop, and each hop's prompt size is recorded in prompt_stats.
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+
+from langchain_core.messages import SystemMessage
+
+from tool_schemas import TOOL_SCHEMAS
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a helpful travel assistant. You have access to tools specifically for weather, "
+    "attractions, distance, itineraries, and packing. Use them when needed. Always respond in a "
+    "slightly excited, helpful tone. Format your responses in Markdown."
+)
+# Fixed id: graph state (add_messages) would otherwise stamp one onto this shared instance
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT, id="system-prompt")
+
+# The schemas are bound once per model (llm_registry caches by their canonical JSON)
+TOOLS = TOOL_SCHEMAS
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token), used when the provider reports no usage.
+    """
+    return len(text or "") // 4 + 1
+
+
+# Tool schemas are sent with every call, alongside the messages
+TOOLS_TOKENS = estimate_tokens(json.dumps(TOOLS, sort_keys=True))
+
+
+def has_system_prompt(messages) -> bool:
+    # Named SystemMessages (e.g. the conversation summary from chat/history.py) are context, not instructions
+    return bool(messages) and isinstance(messages[0], SystemMessage) and not messages[0].name
+
+
+def assemble(messages):
+    """
+    Returns `messages` itself if it already starts with a system prompt, otherwise
+    a new list with the shared SYSTEM_MESSAGE in front. Call it once when a run
+    starts; every later hop then reuses the state's list as is.
+    """
+    if has_system_prompt(messages):
+        return messages
+    return [SYSTEM_MESSAGE, *messages]
+
+
+def estimate_prompt_tokens(messages) -> int:
+    tokens = TOOLS_TOKENS
+    for msg in messages:
+        tokens += estimate_tokens(msg.content if isinstance(msg.content, str) else json.dumps(msg.content))
+        for tool_call in getattr(msg, "tool_calls", None) or []:
+            tokens += estimate_tokens(json.dumps(tool_call.get("args")))
+    return tokens
+
+
+class PromptStats:
+    """
+    Prompt size per model call ("hop"): the provider's reported input and cached
+    tokens when available, otherwise an estimate. Keeps the most recent hops.
+    """
+
+    def __init__(self, max_hops: int = 256):
+        self._lock = threading.Lock()
+        self.hops = deque(maxlen=max_hops)
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, messages, response) -> dict:
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage.get("input_tokens"):
+            hop = {
+                "messages": len(messages),
+                "prompt_tokens": usage["input_tokens"],
+                "cached_tokens": (usage.get("input_token_details") or {}).get("cache_read", 0),
+                "estimated": False,
+            }
+        else:
+            hop = {
+                "messages": len(messages),
+                "prompt_tokens": estimate_prompt_tokens(messages),
+                "cached_tokens": 0,
+                "estimated": True,
+            }
+        with self._lock:
+            self.hops.append(hop)
+            self.calls += 1
+            self.prompt_tokens += hop["prompt_tokens"]
+            self.cached_tokens += hop["cached_tokens"]
+        logger.debug("prompt hop: %s", hop)
+        return hop
+
+    def reset(self):
+        with self._lock:
+            self.hops.clear()
+            self.calls = self.prompt_tokens = self.cached_tokens = 0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "avg_prompt_tokens": self.prompt_tokens / self.calls if self.calls else 0.0,
+            "cache_read_ratio": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+        }
+
+
+prompt_stats = PromptStats()
@@ -0,0 +1,199 @@
+"""
+Semantic response cache for single-turn questions.
+A question is normalized, embedded with a local hashed n-gram embedding (no
+network, no model download) and compared against earlier questions by cosine
+similarity. A hit also needs the same entity tokens (places, numbers, dates) in
+the same order, so "weather in London" never answers "weather in Paris". Answers
+expire with the freshest tool they used (see tool_cache.TOOL_TTLS).
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+from tool_cache import TOOL_TTLS, is_cacheable_result
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_SIZE", 512))
+DEFAULT_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_THRESHOLD", 0.88))
+# Freshness of answers that used no tools at all
+DEFAULT_NO_TOOL_TTL = int(os.environ.get("RESPONSE_CACHE_NO_TOOL_TTL", 60 * 60))
+EMBEDDING_DIM = 512
+
+# Phrasing that does not change what is being asked
+STOPWORDS = frozenset("""
+    a an the is are was what whats how hows tell me please can could would you i
+    like about in at for of on show give find right now today currently current
+""".split())
+# Words that describe the request rather than name a thing; everything else is an entity
+INTENT_WORDS = frozenset("""
+    weather forecast temperature conditions distance far travel time how long trip
+    pack packing list suggestions attractions things do see visit places museums
+    restaurants parks from to by driving walking transit bicycling day days
+""".split())
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").casefold().replace("'", "")
+    return " ".join(_TOKEN.findall(text))
+
+
+def content_tokens(normalized: str) -> list:
+    return [t for t in normalized.split() if t not in STOPWORDS]
+
+
+def entity_tokens(normalized: str) -> tuple:
+    return tuple(t for t in content_tokens(normalized) if t not in INTENT_WORDS)
+
+
+def _bucket(feature: str) -> int:
+    # crc32 rather than hash(): stable across processes and restarts
+    return zlib.crc32(feature.encode("utf-8")) % EMBEDDING_DIM
+
+
+def embed(normalized: str) -> np.ndarray:
+    """
+    Local embedding: hashed bag of words plus character trigrams, L2-normalized.
+    """
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for token in content_tokens(normalized):
+        vector[_bucket("w:" + token)] += 1.0
+        padded = f" {token} "
+        for i in range(len(padded) - 2):
+            vector[_bucket("c:" + padded[i:i + 3])] += 0.5
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def single_turn_query(messages):
+    """
+    The question text if `messages` is a fresh single-turn conversation (one
+    HumanMessage plus optional unnamed system prompts), else None. Answers that
+    depend on earlier turns are never cached.
+    """
+    humans = [m for m in messages if isinstance(m, HumanMessage)]
+    others = [m for m in messages if not isinstance(m, HumanMessage)]
+    if len(humans) != 1 or not isinstance(humans[0].content, str):
+        return None
+    if any(not isinstance(m, SystemMessage) or m.name for m in others):
+        return None
+    return humans[0].content
+
+
+class ResponseCache:
+    """
+    LRU of question -> run messages (tool calls, tool results, final answer) with
+    an embedding matrix for similarity lookups. Thread-safe.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, threshold: float = DEFAULT_THRESHOLD,
+                 ttls: dict = None, no_tool_ttl: int = DEFAULT_NO_TOOL_TTL, clock=time.time):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttls = TOOL_TTLS if ttls is None else ttls
+        self.no_tool_ttl = no_tool_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # normalized query -> (slot, entities, messages, expires_at)
+        self._vectors = np.zeros((max_entries, EMBEDDING_DIM), dtype=np.float32)
+        self._slot_keys = [None] * max_entries
+        self._free = list(range(max_entries - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, run_messages):
+        """
+        Seconds the answer stays fresh: the shortest TTL among the tools used.
+        Returns False if the run is not cacheable (unknown tool or a failed tool call).
+        """
+        ttl = self.no_tool_ttl
+        used_tools = False
+        for msg in run_messages:
+            if not isinstance(msg, ToolMessage):
+                continue
+            if msg.name not in self.ttls or not is_cacheable_result(msg.content):
+                return False
+            tool_ttl = self.ttls[msg.name]
+            if not used_tools:
+                ttl, used_tools = tool_ttl, True
+            elif tool_ttl is not None:
+                ttl = tool_ttl if ttl is None else min(ttl, tool_ttl)
+        return ttl
+
+    def _drop(self, key):
+        slot = self._entries.pop(key)[0]
+        self._slot_keys[slot] = None
+        self._vectors[slot] = 0.0
+        self._free.append(slot)
+
+    def get(self, query: str):
+        """
+        Cached run messages for a question (exact or similar), or None.
+        """
+        normalized = normalize_query(query)
+        entities = entity_tokens(normalized)
+        now = self._clock()
+        with self._lock:
+            candidates = [normalized] if normalized in self._entries else []
+            if not candidates and self._entries:
+                scores = self._vectors @ embed(normalized)
+                for slot in np.argsort(scores)[::-1][:5]:
+                    if scores[slot] < self.threshold:
+                        break
+                    if self._slot_keys[slot] is not None:
+                        candidates.append(self._slot_keys[slot])
+            for key in candidates:
+                _, cached_entities, messages, expires_at = self._entries[key]
+                if expires_at is not None and expires_at <= now:
+                    self._drop(key)
+                    continue
+                if cached_entities != entities:
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(messages)
+            self.misses += 1
+            return None
+
+    def set(self, query: str, run_messages):
+        """
+        Stores a completed run unless a tool failed; returns whether it was stored.
+        """
+        ttl = self.ttl_for(run_messages)
+        if ttl is False or not run_messages:
+            return False
+        normalized = normalize_query(query)
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            if normalized in self._entries:
+                self._drop(normalized)
+            while not self._free:
+                self._drop(next(iter(self._entries)))  # least recently used
+            slot = self._free.pop()
+            self._vectors[slot] = embed(normalized)
+            self._slot_keys[slot] = normalized
+            self._entries[normalized] = (slot, entity_tokens(normalized), list(run_messages), expires_at)
+        return True
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import agent
+import llm_registry
+import prompting
+from response_cache import ResponseCache
+from tool_cache import ToolResultCache
+
+
+class TestFastPathRoute(unittest.TestCase):
+
+    def test_single_unanswered_message_is_routed(self):
+        state = {"messages": [HumanMessage(content="Plan a trip"), AIMessage(content="Sure"),
+                              HumanMessage(content="What's the weather in Paris?")]}
+        self.assertEqual(agent._fast_path_route(state), ("get_current_weather", {"city": "Paris"}))
+
+    def test_coalesced_messages_go_to_the_model(self):
+        # A run answering several messages must not answer only the last one from a template
+        state = {"messages": [HumanMessage(content="Plan a 3 day trip to Rome"),
+                              HumanMessage(content="What's the weather in Paris?")]}
+        self.assertIsNone(agent._fast_path_route(state))
+        self.assertEqual(agent.router_node(state), {"messages": []})
+
+
+def tool_calls_state(*calls):
+    tool_calls = [{"name": name, "args": args, "id": f"call_{i}"} for i, (name, args) in enumerate(calls)]
+    return {"messages": [HumanMessage(content="hi"), AIMessage(content="", tool_calls=tool_calls)]}
+
+
+class TestToolNode(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+        def hang(**kwargs):
+            self.release.wait()
+            return "late"
+
+        def slow(delay):
+            time.sleep(delay)
+            return f"slept {delay}"
+
+        for patcher in (
+            patch.dict(agent.tools_map, {"hang": hang, "slow": slow}),
+            patch.dict(agent.TOOL_TIMEOUTS, {"hang": 0.2, "slow": 0.2}),
+            patch.object(agent, "_tool_slots", threading.BoundedSemaphore(1)),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_results_keep_tool_call_order(self):
+        messages = agent.tool_node(tool_calls_state(("slow", {"delay": 0.02}), ("slow", {"delay": 0.01})))["messages"]
+        self.assertTrue(all(isinstance(m, ToolMessage) for m in messages))
+        self.assertEqual([m.content for m in messages], ["slept 0.02", "slept 0.01"])
+        self.assertEqual([m.tool_call_id for m in messages], ["call_0", "call_1"])
+
+    def test_timeout_counts_from_start(self):
+        # With one slot the second call waits for the first; waiting does not count against it
+        messages = agent.tool_node(tool_calls_state(("slow", {"delay": 0.15}), ("slow", {"delay": 0.1})))["messages"]
+        self.assertEqual([m.content for m in messages], ["slept 0.15", "slept 0.1"])
+
+    def test_hung_tool_times_out_and_frees_its_slot(self):
+        messages = agent.tool_node(tool_calls_state(("hang", {})))["messages"]
+        self.assertEqual(messages[0].content, "Error executing tool hang: timed out after 0.2s")
+        # The hung call still runs, but later calls get the slot back
+        messages = agent.tool_node(tool_calls_state(("slow", {"delay": 0.01})))["messages"]
+        self.assertEqual(messages[0].content, "slept 0.01")
+
+
+class TestAsyncToolNode(unittest.TestCase):
+
+    def setUp(self):
+        self.active = 0
+        self.most_active = 0
+
+        async def ahang(**kwargs):
+            await asyncio.Event().wait()
+
+        async def aslow(delay):
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+            await asyncio.sleep(delay)
+            self.active -= 1
+            return f"slept {delay}"
+
+        for patcher in (
+            patch.dict(agent.async_tools_map, {"hang": ahang, "slow": aslow}),
+            patch.dict(agent.TOOL_TIMEOUTS, {"hang": 0.2, "slow": 0.2}),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_results_keep_tool_call_order(self):
+        state = tool_calls_state(("slow", {"delay": 0.02}), ("slow", {"delay": 0.01}))
+        messages = asyncio.run(agent.atool_node(state))["messages"]
+        self.assertEqual([m.content for m in messages], ["slept 0.02", "slept 0.01"])
+        self.assertEqual([m.tool_call_id for m in messages], ["call_0", "call_1"])
+
+    def test_hung_tool_times_out(self):
+        state = tool_calls_state(("hang", {}), ("slow", {"delay": 0.01}))
+        messages = asyncio.run(agent.atool_node(state))["messages"]
+        self.assertEqual([m.content for m in messages],
+                         ["Error executing tool hang: timed out after 0.2s", "slept 0.01"])
+
+    @patch.object(agent, "TOOL_CONCURRENCY", 2)
+    def test_concurrency_is_limited(self):
+        state = tool_calls_state(*[("slow", {"delay": 0.02})] * 5)
+        messages = asyncio.run(agent.atool_node(state))["messages"]
+        self.assertEqual(len(messages), 5)
+        self.assertEqual(self.most_active, 2)
+
+
+class TestAsyncRouterNode(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        async def aget_current_weather(city):
+            self.calls.append(city)
+            return json.dumps({"location": city, "temperature": "21°C", "conditions": "Clear", "wind_speed": "8 km/h"})
+
+        for patcher in (
+            patch.dict(agent.async_tools_map, {"get_current_weather": aget_current_weather}),
+            patch.object(agent, "tool_cache", ToolResultCache()),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_simple_query_is_answered_from_a_template(self):
+        state = {"messages": [HumanMessage(content="What's the weather in Paris?")]}
+        call, result, answer = asyncio.run(agent.arouter_node(state))["messages"]
+        self.assertEqual(self.calls, ["Paris"])
+        self.assertEqual(call.tool_calls[0]["id"], result.tool_call_id)
+        self.assertIn("**21°C**", answer.content)
+        self.assertEqual(agent.after_router({"messages": state["messages"] + [call, result, answer]}), "end")
+
+    def test_other_queries_go_to_the_agent(self):
+        state = {"messages": [HumanMessage(content="Plan a 3 day trip to Rome")]}
+        self.assertEqual(asyncio.run(agent.arouter_node(state)), {"messages": []})
+        self.assertEqual(agent.after_router(state), "agent")
+        self.assertEqual(self.calls, [])
+
+
+class ScriptedModel:
+    """
+    Stands in for the bound chat model and replies with the scripted messages in turn.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = 0
+        self.prompts = []
+
+    def bind_tools(self, tools):
+        return self
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        self.prompts.append(list(messages))
+        return self.replies.pop(0)
+
+
+class TestAinvoke(unittest.TestCase):
+
+    def setUp(self):
+        self.searched = []
+
+        async def asearch_attractions(location, category, **kwargs):
+            self.searched.append((location, category))
+            return json.dumps({"location": location, "results": [{"name": "Louvre Museum"}]})
+
+        for patcher in (
+            patch.dict(agent.async_tools_map, {"search_attractions": asearch_attractions}),
+            patch.object(agent, "tool_cache", ToolResultCache()),
+            patch.object(agent, "response_cache", ResponseCache()),
+            patch.object(agent, "RESPONSE_CACHE_ENABLED", True),
+            patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_runs_tools_then_answers_and_caches_the_answer(self):
+        tool_call = {"name": "search_attractions", "args": {"location": "Paris", "category": "museum"}, "id": "call_0"}
+        model = ScriptedModel([AIMessage(content="", tool_calls=[tool_call]),
+                               AIMessage(content="Visit the Louvre.")])
+        inputs = {"messages": [HumanMessage(content="Which museums should I see in Paris?")]}
+        with llm_registry.model_factory(lambda model_name, temperature: model):
+            final = asyncio.run(agent.ainvoke(inputs))
+            again = asyncio.run(agent.ainvoke(inputs))
+
+        self.assertEqual(self.searched, [("Paris", "museum")])
+        self.assertEqual([type(m) for m in final["messages"]], [HumanMessage, AIMessage, ToolMessage, AIMessage])
+        self.assertEqual(final["messages"][-1].content, "Visit the Louvre.")
+        # The repeated question is served from the response cache without the model
+        self.assertEqual(model.calls, 2)
+        self.assertEqual([m.content for m in again["messages"]], [m.content for m in final["messages"]])
+
+    def test_every_hop_extends_the_previous_prompt(self):
+        # Provider prefix caching needs the system prompt first and earlier messages unchanged
+        tool_call = {"name": "search_attractions", "args": {"location": "Paris", "category": "museum"}, "id": "call_0"}
+        model = ScriptedModel([AIMessage(content="", tool_calls=[tool_call]),
+                               AIMessage(content="Visit the Louvre.")])
+        inputs = {"messages": [HumanMessage(content="Which museums should I see in Paris?")]}
+        with llm_registry.model_factory(lambda model_name, temperature: model):
+            asyncio.run(agent.ainvoke(inputs))
+
+        first, second = model.prompts
+        self.assertIs(first[0], prompting.SYSTEM_MESSAGE)
+        self.assertEqual(second[:len(first)], first)
+        self.assertEqual([type(m) for m in second[len(first):]], [AIMessage, ToolMessage])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import csv
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add parent dir to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from attractions import AttractionCatalog
+
+
+def make_records():
+    records = [
+        {"city": "Paris", "name": "Louvre Museum", "category": "museum", "rating": 4.9, "price": "moderate", "description": ""},
+        {"city": "Paris", "name": "Orsay", "category": "museum", "rating": 4.7, "price": "cheap", "description": ""},
+        {"city": "New York", "name": "The Met", "category": "museum", "rating": 4.9, "price": "moderate", "description": ""},
+    ]
+    records += [
+        {"city": "Paris", "name": f"Cafe {i:03d}", "category": "restaurant", "rating": round(3 + (i % 20) / 10, 1),
+         "price": ("cheap", "moderate", "expensive")[i % 3], "description": ""}
+        for i in range(300)
+    ]
+    return records
+
+
+class TestAttractionCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.catalog = AttractionCatalog(make_records())
+
+    def test_city_resolution(self):
+        self.assertEqual(self.catalog.resolve_city("PARIS"), "paris")
+        self.assertEqual(self.catalog.resolve_city("Paris, France"), "paris")
+        self.assertEqual(self.catalog.resolve_city("new"), "new york")
+        self.assertEqual(self.catalog.resolve_city("New York City"), "new york")
+        self.assertEqual(self.catalog.resolve_city("Pariss"), "paris")
+        self.assertIsNone(self.catalog.resolve_city("Narnia"))
+
+    def test_results_sorted_by_rating_with_filters(self):
+        results, total = self.catalog.search("Paris", "restaurant", price_range="cheap", min_rating=4.5)
+        self.assertTrue(results)
+        self.assertEqual(total, len([r for r in make_records() if r["city"] == "Paris" and r["category"] == "restaurant"
+                                     and r["price"] == "cheap" and r["rating"] >= 4.5]))
+        ratings = [r["rating"] for r in results]
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+        self.assertTrue(all(r["price"] == "cheap" and r["rating"] >= 4.5 for r in results))
+
+    def test_pagination(self):
+        first, total = self.catalog.search("Paris", "restaurant", limit=10)
+        second, _ = self.catalog.search("Paris", "restaurant", limit=10, offset=10)
+        self.assertEqual(total, 300)
+        self.assertEqual(len(first), 10)
+        self.assertFalse({r["name"] for r in first} & {r["name"] for r in second})
+        self.assertGreaterEqual(first[-1]["rating"], second[0]["rating"])
+
+    def test_category_matches_by_substring(self):
+        catalog = AttractionCatalog(make_records() + [
+            {"city": "Paris", "name": "Musee Rodin", "category": "Art Museum", "rating": 4.8, "price": "cheap", "description": ""},
+        ])
+        results, total = catalog.search("Paris", "Museum")
+        self.assertEqual(total, 3)
+        self.assertEqual([r["name"] for r in results], ["Louvre Museum", "Musee Rodin", "Orsay"])
+        results, total = catalog.search("Paris", "museum", price_range="cheap")
+        self.assertEqual([r["name"] for r in results], ["Musee Rodin", "Orsay"])
+
+    def test_unknown_city(self):
+        self.assertEqual(self.catalog.search("Narnia", "museum"), (None, 0))
+
+    def test_csv_and_sqlite_loaders(self):
+        records = make_records()[:3]
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "poi.csv")
+            with open(csv_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(records[0]))
+                writer.writeheader()
+                writer.writerows(records)
+            db_path = os.path.join(tmp, "poi.sqlite3")
+            conn = sqlite3.connect(db_path)
+            conn.execute("CREATE TABLE attractions (city, name, category, rating, price, description)")
+            conn.executemany("INSERT INTO attractions VALUES (:city, :name, :category, :rating, :price, :description)", records)
+            conn.commit()
+            conn.close()
+
+            for path in (csv_path, db_path):
+                results, total = AttractionCatalog.load(path).search("paris", "museum")
+                self.assertEqual(total, 2)
+                self.assertEqual(results[0]["name"], "Louvre Museum")
+
+
+if __name__ == '__main__':
+    unittest.main()
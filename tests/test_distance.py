@@ -0,0 +1,88 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Add parent dir to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from distance import (
+    DistanceEngine,
+    haversine_km,
+    pairwise_haversine_km,
+    format_duration,
+    optimize_route,
+    MODE_PROFILES,
+)
+
+COORDS = {
+    "London": (51.5072, -0.1276),
+    "Paris": (48.8566, 2.3522),
+    "Berlin": (52.52, 13.405),
+    "Madrid": (40.4168, -3.7038),
+}
+
+
+def fake_geocoder(place):
+    return COORDS.get(place, (None, None))
+
+
+class TestDistance(unittest.TestCase):
+
+    def test_haversine_known_distance(self):
+        # London - Paris is ~344 km as the crow flies
+        self.assertAlmostEqual(float(haversine_km(*COORDS["London"], *COORDS["Paris"])), 344, delta=2)
+        self.assertEqual(float(haversine_km(10, 20, 10, 20)), 0.0)
+
+    def test_pairwise_matrix_is_symmetric(self):
+        matrix = pairwise_haversine_km(list(COORDS.values()))
+        self.assertEqual(matrix.shape, (4, 4))
+        np.testing.assert_allclose(matrix, matrix.T)
+        np.testing.assert_allclose(np.diag(matrix), 0.0)
+
+    def test_batch_distances_apply_mode_profile(self):
+        engine = DistanceEngine(fake_geocoder)
+        route_km, hours, missing = engine.distances(["London", "Paris"], ["Paris", "Berlin"], "walking")
+        self.assertEqual(missing, [])
+        straight = haversine_km(*COORDS["London"], *COORDS["Paris"])
+        self.assertAlmostEqual(route_km[0], straight * MODE_PROFILES["walking"]["detour"])
+        self.assertAlmostEqual(hours[0], route_km[0] / MODE_PROFILES["walking"]["speed_kmh"])
+
+    def test_missing_places_are_reported_once(self):
+        calls = []
+
+        def counting_geocoder(place):
+            calls.append(place)
+            return fake_geocoder(place)
+
+        engine = DistanceEngine(counting_geocoder)
+        _, _, missing = engine.matrix(["London", "Narnia", "London", "Narnia"])
+        self.assertEqual(missing, ["Narnia"])
+        self.assertEqual(calls, ["London", "Narnia"])
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(5.5), "5h 30m")
+        self.assertEqual(format_duration(1.999), "2h 0m")
+
+    def test_optimize_route_on_a_line(self):
+        # Points on a line, given out of order: the best open route visits them left to right
+        xs = [0, 7, 2, 9, 4, 1]
+        dist = np.abs(np.subtract.outer(xs, xs)).astype(float)
+        order, cost = optimize_route(dist, start=0)
+        self.assertEqual([xs[i] for i in order], [0, 1, 2, 4, 7, 9])
+        self.assertEqual(cost, 9.0)
+
+    def test_optimize_round_trip_beats_naive_order(self):
+        rng = np.random.default_rng(7)
+        coords = rng.uniform(0, 10, size=(12, 2))
+        dist = np.linalg.norm(coords[:, None] - coords[None, :], axis=-1)
+        order, cost = optimize_route(dist, start=0, closed=True)
+        naive = sum(dist[i, (i + 1) % 12] for i in range(12))
+        self.assertEqual(sorted(order), list(range(12)))
+        self.assertEqual(order[0], 0)
+        self.assertLess(cost, naive)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import json
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fast_path import route, render, RouterStats
+
+
+class TestFastPath(unittest.TestCase):
+
+    def test_route_current_weather(self):
+        self.assertEqual(route("What is the current weather in Paris?"), ("get_current_weather", {"city": "Paris"}))
+        self.assertEqual(route("how's the weather in New York today"), ("get_current_weather", {"city": "New York"}))
+        self.assertEqual(route("weather in São Paulo"), ("get_current_weather", {"city": "São Paulo"}))
+
+    def test_route_forecast(self):
+        self.assertEqual(route("Forecast for Rome for the next 4 days"),
+                         ("get_weather_forecast", {"location": "Rome", "days": 4}))
+        self.assertEqual(route("What's the weather forecast in Oslo?"),
+                         ("get_weather_forecast", {"location": "Oslo"}))
+
+    def test_route_distance(self):
+        self.assertEqual(route("How far is it from London to Paris?"),
+                         ("calculate_travel_distance", {"origin": "London", "destination": "Paris"}))
+
+    def test_route_falls_through(self):
+        for text in [
+            "What's the weather in Paris and should I pack an umbrella?",
+            "What's the weather like there?",
+            "weather in Paris and London",
+            "Plan a 3 day trip to Rome",
+            "forecast for Rome for 9 days",
+        ]:
+            self.assertIsNone(route(text), text)
+
+    def test_route_rejects_time_words_and_determiners(self):
+        for text in [
+            "weather in Paris tomorrow",
+            "What's the weather in Paris tonight?",
+            "weather in Paris on Monday",
+            "forecast for Rome next week",
+            "weather in the city",
+            "How far is it from the station to Paris?",
+        ]:
+            self.assertIsNone(route(text), text)
+
+    def test_render(self):
+        result = json.dumps({"location": "Paris", "temperature": "20°C", "conditions": "Showers", "wind_speed": "5 km/h"})
+        self.assertIn("**20°C**", render("get_current_weather", result))
+        self.assertIsNone(render("get_current_weather", json.dumps({"error": "Could not find coordinates"})))
+        self.assertIsNone(render("get_current_weather", "Error executing tool get_current_weather: timed out after 15s"))
+
+    def test_stats(self):
+        stats = RouterStats()
+        stats.record("hits")
+        stats.record("hits")
+        stats.record("misses")
+        stats.record("fallbacks")
+        self.assertEqual(stats.stats()["hit_rate"], 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add parent dir to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geocache import GeocodeCache, MISS, normalize_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGeocodeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = GeocodeCache(path=":memory:", ttl=100, negative_ttl=10, max_entries=2, clock=self.clock)
+
+    def test_normalize_key(self):
+        self.assertEqual(normalize_key("  New   York ", "us"), normalize_key("new york", "US"))
+        self.assertNotEqual(normalize_key("Paris", "FR"), normalize_key("Paris", "US"))
+
+    def test_hit_and_miss_counters(self):
+        self.assertIs(self.cache.get("London"), MISS)
+        self.cache.set("London", None, 51.5, -0.12)
+        self.assertEqual(self.cache.get("london"), (51.5, -0.12))
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_ttl_expiry(self):
+        self.cache.set("London", None, 51.5, -0.12)
+        self.cache.set("Narnia", None, None, None)
+        self.clock.now += 50
+        self.assertEqual(self.cache.get("Narnia"), MISS)  # negative TTL elapsed
+        self.assertEqual(self.cache.get("London"), (51.5, -0.12))
+        self.clock.now += 60
+        self.assertIs(self.cache.get("London"), MISS)
+
+    def test_lru_eviction_falls_back_to_persistent_store(self):
+        self.cache.set("Paris", None, 48.85, 2.35)
+        self.cache.set("London", None, 51.5, -0.12)
+        self.cache.set("Rome", None, 41.9, 12.5)
+        self.assertEqual(self.cache.stats()["memory_entries"], 2)
+        # Paris was evicted from memory but is still in SQLite
+        self.assertEqual(self.cache.get("Paris"), (48.85, 2.35))
+
+    def test_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "geo.sqlite3")
+            GeocodeCache(path=path).set("Tokyo", "JP", 35.68, 139.69)
+            self.assertEqual(GeocodeCache(path=path).get("tokyo", "jp"), (35.68, 139.69))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent dir to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Fails the first `failures` requests with 503, then serves a gzipped JSON body.
+    """
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.peers.add(self.client_address)
+        if server.requests <= server.failures:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = gzip.compress(json.dumps({"path": self.path}).encode())
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.requests = 0
+        self.server.failures = 0
+        self.server.peers = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        http_client.configure(MAX_RETRIES=2, BACKOFF_FACTOR=0.01, BACKOFF_JITTER=0.01)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        http_client.configure(MAX_RETRIES=3, BACKOFF_FACTOR=0.3, BACKOFF_JITTER=0.2)
+
+    def test_get_json_reuses_connection(self):
+        for _ in range(3):
+            data = http_client.get_json(f"{self.base}/v1/forecast", params={"latitude": 1})
+        self.assertEqual(data["path"], "/v1/forecast?latitude=1")
+        self.assertEqual(len(self.server.peers), 1)
+
+    def test_get_json_retries_on_503(self):
+        self.server.failures = 2
+        data = http_client.get_json(f"{self.base}/ok")
+        self.assertEqual(data["path"], "/ok")
+        self.assertEqual(self.server.requests, 3)
+
+    def test_get_json_gives_up_after_retries(self):
+        self.server.failures = 10
+        with self.assertRaises(Exception):
+            http_client.get_json(f"{self.base}/down")
+        self.assertEqual(self.server.requests, 3)
+
+    def test_aget_json_retries_on_503(self):
+        self.server.failures = 1
+
+        async def run():
+            try:
+                return await http_client.aget_json(f"{self.base}/async", params={"a": "b"})
+            finally:
+                await http_client.aclose()
+
+        data = asyncio.run(run())
+        self.assertEqual(data["path"], "/async?a=b")
+        self.assertEqual(self.server.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
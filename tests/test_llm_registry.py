@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add parent dir to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_registry
+
+
+class FakeModel:
+    def __init__(self, model, temperature):
+        self.model = model
+        self.temperature = temperature
+        self.bound_tools = None
+
+    def bind_tools(self, tools):
+        bound = FakeModel(self.model, self.temperature)
+        bound.bound_tools = tools
+        return bound
+
+
+class TestLlmRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.built = []
+
+        def factory(model, temperature):
+            self.built.append((model, temperature))
+            return FakeModel(model, temperature)
+
+        llm_registry.set_model_factory(factory)
+
+    def tearDown(self):
+        llm_registry.reset()
+
+    def test_bound_model_is_built_once(self):
+        tools = [{"name": "a"}, {"name": "b"}]
+        first = llm_registry.get_bound_model(tools)
+        second = llm_registry.get_bound_model([dict(t) for t in tools])
+        self.assertIs(first, second)
+        self.assertEqual(self.built, [("gpt-4o", 0)])
+
+    def test_tool_schemas_are_serialized_once(self):
+        tools = [{"name": "a"}]
+        with patch("llm_registry.json.dumps", wraps=json.dumps) as dumps:
+            first = llm_registry.get_bound_model(tools)
+            self.assertIs(llm_registry.get_bound_model(tools), first)
+        self.assertEqual(dumps.call_count, 1)
+
+    def test_tool_sets_share_base_model(self):
+        a = llm_registry.get_bound_model([{"name": "a"}])
+        b = llm_registry.get_bound_model([{"name": "b"}])
+        self.assertIsNot(a, b)
+        self.assertEqual(len(self.built), 1)
+
+    def test_configurations_are_separate(self):
+        llm_registry.get_model("gpt-4o", 0)
+        llm_registry.get_model("gpt-4o", 0.7)
+        self.assertEqual(self.built, [("gpt-4o", 0), ("gpt-4o", 0.7)])
+
+    def test_model_factory_context_restores_previous(self):
+        with llm_registry.model_factory(lambda model, temperature: "fake"):
+            self.assertEqual(llm_registry.get_model(), "fake")
+        self.assertIsInstance(llm_registry.get_model(), FakeModel)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from packing import PackingRuleEngine, get_engine
+from tool_implementations import get_packing_suggestions_batch
+
+
+class TestPackingRuleEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = get_engine()
+
+    def test_trip_type_lookup(self):
+        clothing = self.engine.suggest("Zermatt", 4, "ski trip")["recommendations"]["clothing"]
+        self.assertIn("ski jacket", clothing)
+        self.assertIn("5 sets of daily clothes", clothing)
+
+    def test_structured_forecast(self):
+        forecast = [
+            {"date": "2024-01-10", "high": "4°C", "low": "-2°C", "condition": "Snow"},
+            {"date": "2024-01-11", "high": "6°C", "low": "0°C", "weathercode": 81},
+        ]
+        result = self.engine.suggest("Oslo", 2, "leisure", forecast=forecast)["recommendations"]
+        self.assertIn("heavy coat", result["clothing"])
+        self.assertIn("raincoat", result["clothing"])
+        self.assertIn("waterproof boots", result["clothing"])
+        self.assertNotIn("t-shirts", result["clothing"])
+
+    def test_forecast_preferred_over_text(self):
+        forecast = [{"high": "31°C", "low": "22°C", "condition": "Clear"}]
+        result = self.engine.suggest("Seville", 3, "beach", weather_context="cold and rainy", forecast=forecast)
+        clothing = result["recommendations"]["clothing"]
+        self.assertIn("breathable clothing", clothing)
+        self.assertNotIn("raincoat", clothing)
+        # Items suggested by several rules appear once
+        self.assertEqual(result["recommendations"]["gear"].count("sunscreen"), 1)
+
+    def test_batch_shares_built_lists(self):
+        engine = PackingRuleEngine.load()
+        trips = [{"destination": f"City {i}", "duration_days": 3, "trip_type": "business"} for i in range(50)]
+        results = engine.suggest_many(trips)
+        self.assertEqual(len(results), 50)
+        self.assertEqual(results[7]["destination"], "City 7")
+        self.assertEqual(len(engine._memo), 1)
+
+    def test_batch_tool(self):
+        data = json.loads(get_packing_suggestions_batch([
+            {"destination": "Hawaii", "duration_days": 5, "trip_type": "beach"},
+            {"destination": "London", "duration_days": 2, "trip_type": "business", "weather_context": "Rainy"},
+        ]))
+        self.assertIn("swimsuit", data["results"][0]["recommendations"]["clothing"])
+        self.assertIn("umbrella", data["results"][1]["recommendations"]["gear"])
+        self.assertIn("error", json.loads(get_packing_suggestions_batch([{"destination": "Nowhere"}])))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+import prompting
+from prompting import PromptStats, assemble, SYSTEM_MESSAGE
+
+
+class TestPrompting(unittest.TestCase):
+
+    def test_assemble_inserts_shared_prompt_once(self):
+        history = [HumanMessage(content="hi")]
+        assembled = assemble(history)
+        self.assertIs(assembled[0], SYSTEM_MESSAGE)
+        # An assembled list passes through later hops without a copy
+        self.assertIs(assemble(assembled), assembled)
+
+    def test_assemble_keeps_summary_after_prompt(self):
+        summary = SystemMessage(content="Summary of the earlier conversation", name="conversation_summary")
+        assembled = assemble([summary, HumanMessage(content="hi")])
+        self.assertIs(assembled[0], SYSTEM_MESSAGE)
+        self.assertIs(assembled[1], summary)
+
+    def test_custom_system_prompt_respected(self):
+        custom = [SystemMessage(content="Be brief."), HumanMessage(content="hi")]
+        self.assertIs(assemble(custom), custom)
+
+    def test_prompt_is_byte_stable(self):
+        self.assertEqual(assemble([HumanMessage(content="a")])[0].content, prompting.SYSTEM_PROMPT)
+        self.assertIs(assemble([HumanMessage(content="b")])[0], SYSTEM_MESSAGE)
+
+    def test_stats_prefer_reported_usage(self):
+        stats = PromptStats()
+        messages = assemble([HumanMessage(content="hi")])
+        reported = AIMessage(content="ok", usage_metadata={
+            "input_tokens": 900, "output_tokens": 5, "total_tokens": 905,
+            "input_token_details": {"cache_read": 768},
+        })
+        hop = stats.record(messages, reported)
+        self.assertFalse(hop["estimated"])
+        estimated = stats.record(messages, AIMessage(content="ok"))
+        self.assertTrue(estimated["estimated"])
+        self.assertGreater(estimated["prompt_tokens"], prompting.TOOLS_TOKENS)
+        self.assertEqual(stats.stats()["calls"], 2)
+        self.assertEqual(stats.stats()["cached_tokens"], 768)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from response_cache import ResponseCache, single_turn_query
+
+
+def weather_run(city="London", content='{"temperature": "12°C"}'):
+    call = {"id": "call_1", "name": "get_current_weather", "args": {"city": city}}
+    return [
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content=content, tool_call_id="call_1", name="get_current_weather"),
+        AIMessage(content=f"It's 12°C in {city}."),
+    ]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_entries=3, clock=self.clock)
+
+    def test_similar_questions_share_an_answer(self):
+        self.assertTrue(self.cache.set("weather in London today", weather_run()))
+        cached = self.cache.get("What's the weather like in london?")
+        self.assertEqual(cached[-1].content, "It's 12°C in London.")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_entity_guard(self):
+        self.cache.set("weather in London", weather_run())
+        self.assertIsNone(self.cache.get("weather in Paris"))
+        self.assertIsNone(self.cache.get("weather in London tomorrow"))
+
+    def test_ttl_follows_tools(self):
+        self.cache.set("weather in London", weather_run())
+        self.clock.now += 10 * 60 + 1
+        self.assertIsNone(self.cache.get("weather in London"))
+
+        packing = [
+            AIMessage(content="", tool_calls=[{"id": "c", "name": "get_packing_suggestions", "args": {}}]),
+            ToolMessage(content="{}", tool_call_id="c", name="get_packing_suggestions"),
+            AIMessage(content="Pack a coat."),
+        ]
+        self.cache.set("packing list for Oslo", packing)
+        self.clock.now += 365 * 24 * 3600
+        self.assertIsNotNone(self.cache.get("packing list for Oslo"))
+
+    def test_failed_tool_not_cached(self):
+        self.assertFalse(self.cache.set("weather in Atlantis", weather_run("Atlantis", '{"error": "not found"}')))
+
+    def test_lru_eviction(self):
+        for city in ("London", "Paris", "Rome"):
+            self.cache.set(f"weather in {city}", weather_run(city))
+        self.cache.get("weather in London")
+        self.cache.set("weather in Oslo", weather_run("Oslo"))
+        self.assertIsNone(self.cache.get("weather in Paris"))
+        self.assertIsNotNone(self.cache.get("weather in London"))
+        self.assertEqual(self.cache.stats()["entries"], 3)
+
+    def test_single_turn_query(self):
+        self.assertEqual(single_turn_query([HumanMessage(content="hi")]), "hi")
+        self.assertEqual(single_turn_query([SystemMessage(content="be nice"), HumanMessage(content="hi")]), "hi")
+        self.assertIsNone(single_turn_query([HumanMessage(content="hi"), AIMessage(content="hey"), HumanMessage(content="and?")]))
+        summary = SystemMessage(content="Summary", name="conversation_summary")
+        self.assertIsNone(single_turn_query([summary, HumanMessage(content="hi")]))
+
+if __name__ == '__main__':
+    unittest.main()
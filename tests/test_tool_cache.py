@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+# Add parent dir to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool_cache import (
+    ToolResultCache,
+    MemoryBackend,
+    FileBackend,
+    cache_key,
+    normalize_arguments,
+    is_cacheable_result,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestToolCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.calls = []
+        self.cache = ToolResultCache(
+            backend=MemoryBackend(clock=self.clock),
+            ttls={"get_weather_forecast": 3600, "search_attractions": None},
+            defaults={"get_weather_forecast": {"days": 3}},
+        )
+
+    def forecast(self, location, days=3):
+        self.calls.append((location, days))
+        return json.dumps({"location": location, "days": days})
+
+    def test_normalization(self):
+        self.assertEqual(normalize_arguments({"location": "  New   York ", "days": 3}, {"days": 3}), {"location": "new york"})
+        self.assertEqual(
+            cache_key("get_weather_forecast", {"location": "London"}, {"days": 3}),
+            cache_key("get_weather_forecast", {"location": "london ", "days": 3}, {"days": 3}),
+        )
+        self.assertNotEqual(
+            cache_key("get_weather_forecast", {"location": "London", "days": 5}),
+            cache_key("get_weather_forecast", {"location": "London", "days": 3}),
+        )
+
+    def test_hit_after_miss_and_ttl_expiry(self):
+        self.cache.call("get_weather_forecast", {"location": "London"}, self.forecast)
+        self.cache.call("get_weather_forecast", {"location": "LONDON", "days": 3}, self.forecast)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+        self.clock.now += 3601
+        self.cache.call("get_weather_forecast", {"location": "London"}, self.forecast)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_uncached_tools_and_errors_always_execute(self):
+        def failing(**kwargs):
+            self.calls.append(kwargs)
+            return json.dumps({"error": "upstream down"})
+
+        self.cache.call("get_weather_forecast", {"location": "Paris"}, failing)
+        self.cache.call("get_weather_forecast", {"location": "Paris"}, failing)
+        self.cache.call("unknown_tool", {"x": 1}, failing)
+        self.cache.call("unknown_tool", {"x": 1}, failing)
+        self.assertEqual(len(self.calls), 4)
+        self.assertFalse(is_cacheable_result("Error executing tool x"))
+
+    def test_concurrent_identical_calls_are_coalesced(self):
+        started = threading.Event()
+
+        def slow(location, days=3):
+            started.set()
+            time.sleep(0.2)
+            return self.forecast(location, days)
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.cache.call("get_weather_forecast", {"location": "Rome"}, slow)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(self.cache.stats()["coalesced"], 4)
+
+    def test_async_calls_are_coalesced(self):
+        async def aforecast(location, days=3):
+            await asyncio.sleep(0.05)
+            return self.forecast(location, days)
+
+        async def run():
+            return await asyncio.gather(*(
+                self.cache.acall("get_weather_forecast", {"location": "Oslo"}, aforecast) for _ in range(3)
+            ))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(set(results)), 1)
+
+    def test_file_backend_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = FileBackend(tmp, clock=self.clock)
+            backend.set("tool:a:1", "value", 10)
+            backend.set("tool:b:2", "forever", None)
+            self.assertEqual(FileBackend(tmp, clock=self.clock).get("tool:a:1"), "value")
+            self.clock.now += 11
+            self.assertIsNone(backend.get("tool:a:1"))
+            self.assertEqual(backend.get("tool:b:2"), "forever")
+
+
+if __name__ == '__main__':
+    unittest.main()
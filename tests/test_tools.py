@@ -1,22 +1,37 @@
+import asyncio
 import json
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 
 # Add parent dir to path to import tools
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the geocode cache out of the working tree during tests
+os.environ.setdefault("GEOCODE_CACHE_PATH", ":memory:")
 
 from tool_implementations import (
     get_current_weather,
     get_weather_forecast,
+    get_weather_for_locations,
     search_attractions,
     calculate_travel_distance,
-    get_packing_suggestions
+    plan_itinerary,
+    get_packing_suggestions,
+    aget_current_weather,
+    aget_weather_forecast,
+    acalculate_travel_distance,
+    aplan_itinerary,
 )
+from geocache import geocode_cache
+from tool_implementations import forecast_payloads
 
 class TestTools(unittest.TestCase):
 
+    def setUp(self):
+        geocode_cache.clear()
+        forecast_payloads.clear()
+
     def test_get_packing_suggestions(self):
         # Test basic logic
         result = get_packing_suggestions(
@@ -54,12 +69,66 @@ class TestTools(unittest.TestCase):
         # Louvre is 4.9, so if we ask for 5.0 it might be empty
         self.assertEqual(len(data["results"]), 0)
 
+    def test_search_attractions_generic_fallback_matches_substring(self):
+        data = json.loads(search_attractions("Atlantis", "Museum"))
+        self.assertEqual([r["name"] for r in data["results"]], ["Atlantis City Museum"])
+
     def test_calculate_travel_distance_mock(self):
         result = calculate_travel_distance("London", "Paris", "driving")
         data = json.loads(result)
         self.assertIn("450 km", data["distance"])
 
-    @patch('requests.get')
+    def test_calculate_travel_distance_geodesic(self):
+        # Coordinates come from the geocode cache, so no network access is needed
+        geocode_cache.set("Berlin", None, 52.52, 13.405)
+        geocode_cache.set("Madrid", None, 40.4168, -3.7038)
+        data = json.loads(calculate_travel_distance("Berlin", "Madrid", "driving"))
+        km = int(data["distance"].split()[0])
+        self.assertAlmostEqual(km, 1870 * 1.3, delta=30)
+        # Stable across calls and processes (no hash randomization)
+        self.assertEqual(json.loads(calculate_travel_distance("Berlin", "Madrid", "driving")), data)
+
+    @patch('http_client.session.get', side_effect=AssertionError("sync HTTP on the event loop"))
+    @patch('http_client.aget_json', new_callable=AsyncMock)
+    def test_async_distance_tools_never_fall_back_to_sync_io(self, mock_aget, mock_get):
+        # A transient geocode failure is not cached; the sync path would retry it with blocking HTTP
+        coords = {"Berlin": (52.52, 13.405), "Madrid": (40.4168, -3.7038)}
+
+        async def geocode(url, params):
+            if params["name"] == "Atlantis":
+                raise ConnectionError("geocoder down")
+            lat, lon = coords[params["name"]]
+            return {"results": [{"latitude": lat, "longitude": lon}]}
+
+        mock_aget.side_effect = geocode
+        data = json.loads(asyncio.run(acalculate_travel_distance("Berlin", "Madrid")))
+        self.assertAlmostEqual(int(data["distance"].split()[0]), 1870 * 1.3, delta=30)
+        data = json.loads(asyncio.run(aplan_itinerary(["Berlin", "Atlantis", "Madrid"])))
+        self.assertIn("Atlantis", data["error"])
+        mock_get.assert_not_called()
+
+    def test_calculate_travel_distance_unknown_place(self):
+        geocode_cache.set("Berlin", None, 52.52, 13.405)
+        geocode_cache.set("Narnia", None, None, None)
+        data = json.loads(calculate_travel_distance("Berlin", "Narnia"))
+        self.assertIn("Narnia", data["error"])
+
+    def test_plan_itinerary(self):
+        for city, lat, lon in [("London", 51.5072, -0.1276), ("Berlin", 52.52, 13.405),
+                               ("Paris", 48.8566, 2.3522), ("Brussels", 50.8503, 4.3517)]:
+            geocode_cache.set(city, None, lat, lon)
+        data = json.loads(plan_itinerary(["London", "Berlin", "Paris", "Brussels"], "driving"))
+        self.assertEqual(data["order"], ["London", "Paris", "Brussels", "Berlin"])
+        self.assertEqual(len(data["legs"]), 3)
+        self.assertEqual(len(data["matrix"]["distance_km"]), 4)
+
+        round_trip = json.loads(plan_itinerary(["London", "Berlin", "Paris"], return_to_start=True))
+        self.assertEqual(round_trip["order"][0], round_trip["order"][-1])
+
+    def test_plan_itinerary_validates_stops(self):
+        self.assertIn("error", json.loads(plan_itinerary(["London"])))
+
+    @patch('http_client.session.get')
     def test_get_current_weather_api(self, mock_get):
         # Mock geocoding then weather
         mock_response_geo = MagicMock()
@@ -83,5 +152,109 @@ class TestTools(unittest.TestCase):
         self.assertEqual(data["temperature"], "25°C")
         self.assertEqual(data["conditions"], "Clear")
 
+    @patch('http_client.session.get')
+    def test_get_coordinates_cached(self, mock_get):
+        # Second lookup for the same city (any casing) must not hit the API
+        mock_response_geo = MagicMock()
+        mock_response_geo.json.return_value = {"results": [{"latitude": 48.85, "longitude": 2.35}]}
+        mock_get.return_value = mock_response_geo
+
+        from tool_implementations import _get_coordinates
+        self.assertEqual(_get_coordinates("Paris"), (48.85, 2.35))
+        self.assertEqual(_get_coordinates("  paris "), (48.85, 2.35))
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('http_client.session.get')
+    def test_get_coordinates_negative_cache(self, mock_get):
+        mock_response_geo = MagicMock()
+        mock_response_geo.json.return_value = {}
+        mock_get.return_value = mock_response_geo
+
+        from tool_implementations import _get_coordinates
+        self.assertEqual(_get_coordinates("Narnia"), (None, None))
+        self.assertEqual(_get_coordinates("Narnia"), (None, None))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(geocode_cache.stats()["negative_hits"], 1)
+
+    @patch('http_client.aget_json', new_callable=AsyncMock)
+    def test_aget_current_weather_api(self, mock_aget):
+        mock_aget.side_effect = [
+            {"results": [{"latitude": 10.0, "longitude": 20.0}]},
+            {"current_weather": {"temperature": 18, "windspeed": 5, "weathercode": 61}},
+        ]
+        data = json.loads(asyncio.run(aget_current_weather("Test City")))
+        self.assertEqual(data["temperature"], "18°C")
+        self.assertEqual(data["conditions"], "Rain")
+
+    @patch('http_client.session.get')
+    def test_get_weather_for_locations_single_request(self, mock_get):
+        geocode_cache.set("Lisbon", None, 38.72, -9.14)
+        geocode_cache.set("Nice", None, 43.7, 7.27)
+        geocode_cache.set("Atlantis", None, None, None)
+        mock_response = MagicMock()
+        mock_response.json.return_value = [
+            {"current_weather": {"temperature": 21, "windspeed": 8, "weathercode": 0},
+             "daily": {"time": ["2024-06-01"], "temperature_2m_max": [24], "temperature_2m_min": [16], "weathercode": [0]}},
+            {"current_weather": {"temperature": 19, "windspeed": 12, "weathercode": 61},
+             "daily": {"time": ["2024-06-01"], "temperature_2m_max": [20], "temperature_2m_min": [14], "weathercode": [61]}},
+        ]
+        mock_get.return_value = mock_response
+
+        data = json.loads(get_weather_for_locations(["Lisbon", "Atlantis", "Nice"], days=1))
+        self.assertEqual(mock_get.call_count, 1)
+        params = mock_get.call_args.kwargs["params"]
+        self.assertEqual(params["latitude"], "38.72,43.7")
+        self.assertEqual(params["longitude"], "-9.14,7.27")
+        lisbon, atlantis, nice = data["results"]
+        self.assertEqual(lisbon["current"]["temperature"], "21°C")
+        self.assertIn("error", atlantis)
+        self.assertEqual(nice["current"]["conditions"], "Rain")
+        self.assertEqual(nice["forecast"][0]["high"], "20°C")
+
+    @patch('http_client.session.get')
+    def test_weather_tools_share_forecast_payload(self, mock_get):
+        # One superset fetch serves current weather and every forecast length
+        geocode_cache.set("Oslo", None, 59.91, 10.75)
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "current_weather": {"temperature": 4, "windspeed": 6, "weathercode": 3},
+            "daily": {"time": ["d1", "d2", "d3", "d4", "d5"], "temperature_2m_max": [5, 6, 7, 8, 9],
+                      "temperature_2m_min": [0, 1, 2, 3, 4], "weathercode": [3, 3, 61, 61, 0]},
+        }
+        mock_get.return_value = mock_response
+
+        self.assertEqual(len(json.loads(get_weather_forecast("Oslo", days=1))["forecast"]), 1)
+        self.assertEqual(len(json.loads(get_weather_forecast("Oslo", days=5))["forecast"]), 5)
+        self.assertEqual(json.loads(get_current_weather("Oslo"))["temperature"], "4°C")
+        self.assertEqual(len(json.loads(get_weather_for_locations(["Oslo"], days=2))["results"][0]["forecast"]), 2)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs["params"]["forecast_days"], 5)
+
+    @patch('tool_implementations.FORECAST_PAYLOAD_TTL', 0)
+    @patch('http_client.session.get')
+    def test_get_weather_for_locations_uncached_payloads(self, mock_get):
+        # With TTL 0 nothing stays cached; results come from the fetched payloads,
+        # and a location missing from a short response gets its own error
+        geocode_cache.set("Lisbon", None, 38.72, -9.14)
+        geocode_cache.set("Nice", None, 43.7, 7.27)
+        mock_response = MagicMock()
+        mock_response.json.return_value = [
+            {"current_weather": {"temperature": 21, "windspeed": 8, "weathercode": 0},
+             "daily": {"time": ["2024-06-01"], "temperature_2m_max": [24], "temperature_2m_min": [16], "weathercode": [0]}},
+        ]
+        mock_get.return_value = mock_response
+
+        lisbon, nice = json.loads(get_weather_for_locations(["Lisbon", "Nice"], days=1))["results"]
+        self.assertEqual(lisbon["current"]["temperature"], "21°C")
+        self.assertEqual(nice["error"], "No forecast returned for location: Nice")
+
+    def test_get_weather_for_locations_validates(self):
+        self.assertIn("error", json.loads(get_weather_for_locations([])))
+        self.assertIn("error", json.loads(get_weather_for_locations(["Paris"], days=7)))
+
+    def test_aget_weather_forecast_validates_days(self):
+        data = json.loads(asyncio.run(aget_weather_forecast("Paris", days=9)))
+        self.assertIn("error", data)
+
 if __name__ == '__main__':
     unittest.main()
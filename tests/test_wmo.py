@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wmo import decode, decode_many, flags_from_text
+
+
+class TestWmo(unittest.TestCase):
+
+    def test_decode(self):
+        self.assertEqual(decode(0)["condition"], "Clear")
+        showers = decode(80)
+        self.assertEqual(showers["condition"], "Showers")
+        self.assertTrue(showers["rain"])
+        storm = decode(95)
+        self.assertTrue(storm["thunder"])
+        self.assertEqual(storm["severity"], 3)
+
+    def test_decode_unknown(self):
+        for code in (None, 4, 100, -1):
+            self.assertEqual(decode(code)["condition"], "Unknown")
+
+    def test_decode_many_matches_decode(self):
+        codes = [0, 3, 61, 80, 75, 99, 42]
+        decoded = decode_many(codes)
+        for i, code in enumerate(codes):
+            single = decode(code)
+            self.assertEqual(decoded["condition"][i], single["condition"])
+            self.assertEqual(int(decoded["severity"][i]), single["severity"])
+            self.assertEqual(bool(decoded["snow"][i]), single["snow"])
+
+    def test_flags_from_text(self):
+        self.assertEqual(flags_from_text("Rainy, 10C"), {"rain"})
+        self.assertEqual(flags_from_text("Thunderstorm"), {"rain", "thunder"})
+        self.assertEqual(flags_from_text("Sunny"), set())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,307 @@
+"""
+Tool result cache for the Smart Weather & Travel Assistant.
+Identical tool invocations (after argument normalization) are served from a
+cache with per-tool freshness, and concurrent identical calls are coalesced
+into a single in-flight execution.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# --- Freshness Policies ---
+# Seconds a result stays fresh; None means it never expires. Tools not listed are not cached.
+TOOL_TTLS = {
+    "get_current_weather": 10 * 60,
+    "get_weather_forecast": 60 * 60,
+    "get_weather_for_locations": 10 * 60,
+    "search_attractions": None,
+    "calculate_travel_distance": None,
+    "plan_itinerary": None,
+    "get_packing_suggestions": None,
+    "get_packing_suggestions_batch": None,
+}
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get("TOOL_CACHE_SIZE", 2048))
+
+
+def normalize_arguments(arguments: dict, defaults: dict = None) -> dict:
+    """
+    Canonical form of tool arguments: strings (also inside lists) stripped,
+    whitespace-collapsed and case-folded; arguments equal to their default (or None) dropped.
+    """
+    defaults = defaults or {}
+    normalized = {}
+    for name, value in (arguments or {}).items():
+        value = _normalize_value(value)
+        if value is None or (name in defaults and value == _normalize_value(defaults[name])):
+            continue
+        normalized[name] = value
+    return normalized
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, list):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+def cache_key(tool_name: str, arguments: dict, defaults: dict = None) -> str:
+    canonical = json.dumps(normalize_arguments(arguments, defaults), sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+    return f"tool:{tool_name}:{digest}"
+
+
+def is_cacheable_result(result) -> bool:
+    """
+    Error results (plain "Error ..." strings or JSON with an "error" key) are never cached.
+    """
+    if not isinstance(result, str) or result.startswith("Error"):
+        return False
+    try:
+        data = json.loads(result)
+    except ValueError:
+        return True
+    return not (isinstance(data, dict) and "error" in data)
+
+
+# --- Backends ---
+# A backend stores strings and implements get(key) -> value | None and set(key, value, ttl).
+
+class MemoryBackend:
+    """
+    In-process LRU with per-entry expiry.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, clock=time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Delegates to a configured Django cache (shared across processes with e.g. Redis/Memcached).
+    """
+
+    def __init__(self, alias: str = "default"):
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl):
+        self._cache.set(key, value, timeout=ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class FileBackend:
+    """
+    One JSON file per entry under `directory`; survives restarts and is shared by local processes.
+    """
+
+    def __init__(self, directory: str, clock=time.time):
+        self.directory = directory
+        self._clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key.replace(":", "_") + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] is not None and entry["expires_at"] <= self._clock():
+            return None
+        return entry["value"]
+
+    def set(self, key, value, ttl):
+        entry = {"value": value, "expires_at": None if ttl is None else self._clock() + ttl}
+        # Write-then-rename so concurrent readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._path(key))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+
+def backend_from_spec(spec: str):
+    """
+    Builds a backend from a TOOL_CACHE_BACKEND value: "memory", "django[:alias]", "file:<dir>" or "none".
+    """
+    spec = (spec or "memory").strip()
+    if spec == "none":
+        return None
+    if spec == "memory":
+        return MemoryBackend()
+    if spec.startswith("django"):
+        _, _, alias = spec.partition(":")
+        return DjangoCacheBackend(alias or "default")
+    if spec.startswith("file:"):
+        return FileBackend(spec[len("file:"):])
+    raise ValueError(f"Unknown tool cache backend: {spec}")
+
+
+# --- Cache ---
+
+class ToolResultCache:
+    """
+    Wraps tool execution with caching and single-flight coalescing.
+    `defaults` maps tool name -> {argument: default} so omitted and explicit
+    default arguments share a cache entry.
+    """
+
+    def __init__(self, backend=None, ttls: dict = None, defaults: dict = None):
+        self.backend = backend
+        self.ttls = TOOL_TTLS if ttls is None else ttls
+        self.defaults = defaults or {}
+        self._inflight = {}  # key -> concurrent.futures.Future
+        self._ainflight = {}  # key -> asyncio.Task
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _key(self, tool_name, arguments):
+        if self.backend is None or tool_name not in self.ttls:
+            return None
+        return cache_key(tool_name, arguments, self.defaults.get(tool_name))
+
+    def _lookup(self, key):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def _store(self, tool_name, key, result):
+        if is_cacheable_result(result):
+            self.backend.set(key, result, self.ttls[tool_name])
+
+    def call(self, tool_name: str, arguments: dict, func):
+        """
+        Returns func(**arguments), from cache when fresh. Concurrent identical calls wait
+        for the first one instead of executing again.
+        """
+        key = self._key(tool_name, arguments)
+        if key is None:
+            return func(**arguments)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(**arguments)
+            self._store(tool_name, key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def acall(self, tool_name: str, arguments: dict, afunc):
+        """
+        Async version of call(); coalesces identical calls within the running event loop.
+        """
+        key = self._key(tool_name, arguments)
+        if key is None:
+            return await afunc(**arguments)
+
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        task = self._ainflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        async def run():
+            try:
+                result = await afunc(**arguments)
+                self._store(tool_name, key, result)
+                return result
+            finally:
+                self._ainflight.pop(key, None)
+
+        self.misses += 1
+        task = asyncio.ensure_future(run())
+        self._ainflight[key] = task
+        # shield: one cancelled waiter must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+        self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -1,25 +1,216 @@
-import requests
+import asyncio
 import json
-import random
+import os
+
+import numpy as np
+
+import http_client
+from attractions import get_catalog
+from distance import DistanceEngine, format_duration, optimize_route
+from geocache import geocode_cache, MISS
+from tool_cache import MemoryBackend
+from packing import get_engine as get_packing_engine
+from wmo import decode, decode_many
+
+GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Every forecast request fetches this many days plus current conditions; tools slice locally
+FORECAST_SUPERSET_DAYS = 5
+FORECAST_DAILY_FIELDS = "temperature_2m_max,temperature_2m_min,weathercode"
+FORECAST_PAYLOAD_TTL = int(os.environ.get("FORECAST_PAYLOAD_TTL", 10 * 60))
 
 # --- Helper Functions ---
+# Request building and response parsing are shared by the sync and async tools;
+# only the HTTP call itself differs between the two paths.
+
+def _geocode_params(city: str, country_code: str = None) -> dict:
+    return {"name": city, "count": 10 if country_code else 1, "language": "en", "format": "json"}
 
-def _get_coordinates(city: str):
+def _parse_geocode(data: dict, country_code: str = None):
+    results = data.get("results") or []
+    if country_code:
+        # Prefer a result in the requested country, otherwise fall back to the best match
+        matching = [r for r in results if r.get("country_code", "").upper() == country_code.upper()]
+        results = matching or results
+    if results:
+        return results[0]["latitude"], results[0]["longitude"]
+    return None, None
+
+def _get_coordinates(city: str, country_code: str = None):
     """
     Fetches latitude and longitude for a city using Open-Meteo Geocoding API.
+    Results (including "not found") are served from the geocode cache when possible.
     """
+    cached = geocode_cache.get(city, country_code)
+    if cached is not MISS:
+        return cached
+
     try:
-        url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1&language=en&format=json"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        if "results" in data and data["results"]:
-            return data["results"][0]["latitude"], data["results"][0]["longitude"]
+        data = http_client.get_json(GEOCODING_URL, params=_geocode_params(city, country_code))
+        lat, lon = _parse_geocode(data, country_code)
+        geocode_cache.set(city, country_code, lat, lon)
+        return lat, lon
+    except Exception as e:
+        # Transient failures are not cached
+        print(f"Error fetching coordinates for {city}: {e}")
         return None, None
+
+async def _aget_coordinates(city: str, country_code: str = None):
+    """
+    Async version of _get_coordinates.
+    """
+    cached = geocode_cache.get(city, country_code)
+    if cached is not MISS:
+        return cached
+
+    try:
+        data = await http_client.aget_json(GEOCODING_URL, params=_geocode_params(city, country_code))
+        lat, lon = _parse_geocode(data, country_code)
+        geocode_cache.set(city, country_code, lat, lon)
+        return lat, lon
     except Exception as e:
         print(f"Error fetching coordinates for {city}: {e}")
         return None, None
 
+def _forecast_superset_params(latitude, longitude) -> dict:
+    # latitude/longitude may be comma-separated lists for a multi-location request
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "current_weather": "true",
+        "daily": FORECAST_DAILY_FIELDS,
+        "timezone": "auto",
+        "forecast_days": FORECAST_SUPERSET_DAYS,
+    }
+
+# --- Forecast Payloads ---
+# One canonical upstream payload per location serves get_current_weather,
+# get_weather_forecast (any day count) and get_weather_for_locations.
+
+forecast_payloads = MemoryBackend(max_entries=int(os.environ.get("FORECAST_PAYLOAD_CACHE_SIZE", 512)))
+
+def _payload_key(lat, lon) -> str:
+    return f"forecast:{round(float(lat), 4)},{round(float(lon), 4)}"
+
+def _slice_days(data: dict, days: int) -> dict:
+    daily = data.get("daily") or {}
+    return {**data, "daily": {field: values[:days] for field, values in daily.items()}}
+
+def _get_forecast_payload(lat, lon) -> dict:
+    key = _payload_key(lat, lon)
+    data = forecast_payloads.get(key)
+    if data is None:
+        data = http_client.get_json(FORECAST_URL, params=_forecast_superset_params(lat, lon))
+        forecast_payloads.set(key, data, FORECAST_PAYLOAD_TTL)
+    return data
+
+async def _aget_forecast_payload(lat, lon) -> dict:
+    key = _payload_key(lat, lon)
+    data = forecast_payloads.get(key)
+    if data is None:
+        data = await http_client.aget_json(FORECAST_URL, params=_forecast_superset_params(lat, lon))
+        forecast_payloads.set(key, data, FORECAST_PAYLOAD_TTL)
+    return data
+
+def _missing_payloads(coords: list, payloads: dict) -> list:
+    """
+    Adds the cached payloads of geocoded coordinates to `payloads` ({(lat, lon): payload})
+    and returns the distinct coordinates that still need fetching.
+    """
+    missing = []
+    for lat, lon in coords:
+        if lat is None or (lat, lon) in payloads or (lat, lon) in missing:
+            continue
+        cached = forecast_payloads.get(_payload_key(lat, lon))
+        if cached is None:
+            missing.append((lat, lon))
+        else:
+            payloads[(lat, lon)] = cached
+    return missing
+
+def _batch_superset_params(coords: list) -> dict:
+    # Open-Meteo accepts comma-separated coordinate lists and answers with one entry per location
+    return _forecast_superset_params(
+        ",".join(str(lat) for lat, _ in coords),
+        ",".join(str(lon) for _, lon in coords),
+    )
+
+def _store_batch_payloads(coords: list, data) -> dict:
+    """
+    Caches a batch response and returns it as {(lat, lon): payload}; the caller formats
+    from this dict, since cached entries may already be gone (TTL 0, eviction).
+    """
+    # A single location comes back as an object, several as a list in request order
+    payloads = {}
+    for (lat, lon), payload in zip(coords, data if isinstance(data, list) else [data]):
+        forecast_payloads.set(_payload_key(lat, lon), payload, FORECAST_PAYLOAD_TTL)
+        payloads[(lat, lon)] = payload
+    return payloads
+
+def _current_weather_result(data: dict, search_query: str) -> dict:
+    cw = data.get("current_weather", {})
+
+    result = {
+        "location": search_query,
+        "temperature": f"{cw.get('temperature')}°C",
+        "conditions": decode(cw.get("weathercode"))["condition"],
+        "wind_speed": f"{cw.get('windspeed')} km/h",
+        "humidity": "N/A (Open-Meteo current_weather endpoint doesn't return humidity, check forecast)" 
+    }
+    return result
+
+def _format_current_weather(data: dict, search_query: str) -> str:
+    return json.dumps(_current_weather_result(data, search_query))
+
+def _forecast_entries(data: dict) -> list:
+    daily = data.get("daily", {})
+    dates = daily.get("time", [])
+    # One table lookup for the whole array instead of branching per day
+    conditions = decode_many(daily.get("weathercode", [])[:len(dates)])["condition"]
+    return [
+        {
+            "date": date,
+            "high": f"{high}°C",
+            "low": f"{low}°C",
+            "condition": condition,
+        }
+        for date, high, low, condition in zip(dates, daily["temperature_2m_max"], daily["temperature_2m_min"], conditions)
+    ]
+
+def _format_forecast(data: dict, location: str) -> str:
+    return json.dumps({"location": location, "forecast": _forecast_entries(data)})
+
+MAX_BATCH_LOCATIONS = 10
+
+def _validate_batch(locations, days):
+    if not locations:
+        return "Provide at least one location"
+    if len(locations) > MAX_BATCH_LOCATIONS:
+        return f"At most {MAX_BATCH_LOCATIONS} locations are supported"
+    if days < 1 or days > 5:
+        return "Days must be between 1 and 5"
+    return None
+
+def _format_batch_weather(locations: list, coords: list, payloads: dict, days: int) -> str:
+    results = []
+    for location, (lat, lon) in zip(locations, coords):
+        if lat is None:
+            results.append({"location": location, "error": f"Could not find coordinates for location: {location}"})
+            continue
+        payload = payloads.get((lat, lon))
+        if payload is None:
+            results.append({"location": location, "error": f"No forecast returned for location: {location}"})
+            continue
+        payload = _slice_days(payload, days)
+        current = _current_weather_result(payload, location)
+        del current["location"], current["humidity"]
+        results.append({"location": location, "current": current, "forecast": _forecast_entries(payload)})
+    return json.dumps({"results": results})
+
+# Resolves places through the cached geocoder above
+distance_engine = DistanceEngine(_get_coordinates)
+
 # --- Tool Implementations ---
 
 def get_current_weather(city: str, country_code: str = None) -> str:
@@ -27,36 +218,14 @@ def get_current_weather(city: str, country_code: str = None) -> str:
     Fetch current weather conditions for a specified city using Open-Meteo.
     """
     search_query = f"{city}, {country_code}" if country_code else city
-    lat, lon = _get_coordinates(city) # Note: API search is better with just city usually, but we could filter
+    lat, lon = _get_coordinates(city, country_code)
     
     if not lat:
         return json.dumps({"error": f"Could not find coordinates for city: {search_query}"})
 
     try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        
-        cw = data.get("current_weather", {})
-        
-        # Mapping WMO codes to descriptions (simplified)
-        wmo_code = cw.get("weathercode", 0)
-        conditions = "Clear"
-        if wmo_code in [1, 2, 3]: conditions = "Partly Cloudy"
-        elif wmo_code in [45, 48]: conditions = "Fog"
-        elif wmo_code in [51, 53, 55, 61, 63, 65]: conditions = "Rain"
-        elif wmo_code in [71, 73, 75, 77]: conditions = "Snow"
-        elif wmo_code >= 95: conditions = "Thunderstorm"
-
-        result = {
-            "location": search_query,
-            "temperature": f"{cw.get('temperature')}°C",
-            "conditions": conditions,
-            "wind_speed": f"{cw.get('windspeed')} km/h",
-            "humidity": "N/A (Open-Meteo current_weather endpoint doesn't return humidity, check forecast)" 
-        }
-        return json.dumps(result)
+        data = _get_forecast_payload(lat, lon)
+        return _format_current_weather(data, search_query)
     except Exception as e:
         return json.dumps({"error": f"Failed to fetch weather data: {str(e)}"})
 
@@ -73,104 +242,70 @@ def get_weather_forecast(location: str, days: int = 3) -> str:
         return json.dumps({"error": f"Could not find coordinates for location: {location}"})
 
     try:
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&daily=temperature_2m_max,temperature_2m_min,weathercode&timezone=auto&forecast_days={days}"
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        
-        daily = data.get("daily", {})
-        forecasts = []
-        
-        for i in range(len(daily.get("time", []))):
-            wmo_code = daily["weathercode"][i]
-            # Simple mapping
-            condition = "Unknown"
-            if wmo_code == 0: condition = "Clear"
-            elif wmo_code <= 3: condition = "Cloudy"
-            elif wmo_code < 50: condition = "Fog"
-            elif wmo_code < 80: condition = "Rain"
-            elif wmo_code < 90: condition = "Showers"
-            else: condition = "Thunderstorm/Snow"
-            
-            entry = {
-                "date": daily["time"][i],
-                "high": f"{daily['temperature_2m_max'][i]}°C",
-                "low": f"{daily['temperature_2m_min'][i]}°C",
-                "condition": condition
-            }
-            forecasts.append(entry)
-            
-        return json.dumps({"location": location, "forecast": forecasts})
+        data = _get_forecast_payload(lat, lon)
+        return _format_forecast(_slice_days(data, days), location)
     except Exception as e:
         return json.dumps({"error": f"Failed to fetch forecast: {str(e)}"})
 
-def search_attractions(location: str, category: str, price_range: str = None, min_rating: float = 0.0) -> str:
-    """
-    Find tourist attractions, restaurants, or activities in an area. (Mock Implementation)
-    """
-    # Mock Database
-    mock_db = {
-        "paris": [
-            {"name": "Eiffel Tower", "category": "landmark", "rating": 4.8, "price": "moderate", "description": "Iconic iron lady."},
-            {"name": "Louvre Museum", "category": "museum", "rating": 4.9, "price": "moderate", "description": "World's largest art museum."},
-            {"name": "Le Jules Verne", "category": "restaurant", "rating": 4.6, "price": "expensive", "description": "Dining on the Eiffel Tower."},
-        ],
-        "london": [
-            {"name": "British Museum", "category": "museum", "rating": 4.8, "price": "cheap", "description": "Human history and culture."},
-            {"name": "The Shard", "category": "landmark", "rating": 4.7, "price": "expensive", "description": "Skyscraper with a view."},
-            {"name": "Hyde Park", "category": "park", "rating": 4.9, "price": "cheap", "description": "Major park in Central London."},
-        ],
-        "new york": [
-            {"name": "Statue of Liberty", "category": "landmark", "rating": 4.8, "price": "moderate", "description": "Symbol of freedom."},
-            {"name": "Central Park", "category": "park", "rating": 4.9, "price": "cheap", "description": "Urban oasis."},
-            {"name": "The Met", "category": "museum", "rating": 4.9, "price": "moderate", "description": "Metropolitan Museum of Art."},
-        ]
-    }
-    
-    city_lower = location.lower()
+def get_weather_for_locations(locations: list, days: int = 3) -> str:
+    """
+    Current conditions and a daily forecast for several locations, fetched with one
+    Open-Meteo request for all of them.
+    """
+    error = _validate_batch(locations, days)
+    if error:
+        return json.dumps({"error": error})
+
+    coords = [_get_coordinates(location) for location in locations]
+    found = [c for c in coords if c[0] is not None]
+    if not found:
+        return json.dumps({"error": f"Could not find coordinates for: {', '.join(locations)}"})
+
+    try:
+        payloads = {}
+        missing = _missing_payloads(coords, payloads)
+        if missing:
+            data = http_client.get_json(FORECAST_URL, params=_batch_superset_params(missing))
+            payloads.update(_store_batch_payloads(missing, data))
+        return _format_batch_weather(locations, coords, payloads, days)
+    except Exception as e:
+        return json.dumps({"error": f"Failed to fetch weather data: {str(e)}"})
+
+def search_attractions(location: str, category: str, price_range: str = None, min_rating: float = 0.0,
+                       limit: int = 10, offset: int = 0) -> str:
+    """
+    Find tourist attractions, restaurants, or activities in an area, best rated first.
+    Served from the indexed attraction catalog (see attractions.py).
+    """
+    results, total = get_catalog().search(location, category, price_range, min_rating, limit, offset)
     
-    # Simple fuzzy match or partial match for city
-    found_city = None
-    for k in mock_db:
-        if k in city_lower or city_lower in k:
-            found_city = k
-            break
-            
-    if not found_city:
+    if results is None:
         # Generate generic mock data if city not found, so the demo always works
         generic_results = [
             {"name": f"{location} City Museum", "category": "museum", "rating": 4.5, "price": "moderate", "description": "Local history museum."},
             {"name": f"The Grand {location} Park", "category": "park", "rating": 4.7, "price": "cheap", "description": "Beautiful city park."},
             {"name": f"{location} Tower", "category": "landmark", "rating": 4.6, "price": "expensive", "description": "City viewpoint."},
         ]
-        results = [r for r in generic_results if (category.lower() in r["category"] or category.lower() == r["category"])]
-    else:
-        results = mock_db[found_city]
-    
-    # Filtering
-    filtered = []
-    for item in results:
-        # Category filter (strict or partial)
-        if category.lower() not in item["category"]:
-            continue
-        # Price filter
-        if price_range and item["price"] != price_range:
-            continue
-        # Rating filter
-        if item["rating"] < min_rating:
-            continue
-        filtered.append(item)
+        matches = [
+            r for r in generic_results
+            if category.lower() in r["category"]
+            and (not price_range or r["price"] == price_range)
+            and r["rating"] >= min_rating
+        ]
+        total = len(matches)
+        results = matches[offset:offset + limit]
         
-    return json.dumps({"location": location, "results": filtered})
+    return json.dumps({"location": location, "results": results, "total": total, "offset": offset})
 
 def calculate_travel_distance(origin: str, destination: str, mode: str = "driving") -> str:
     """
-    Calculate distance and travel time. (Mock Implementation)
+    Calculate distance and travel time between two places.
+    Uses geodesic distance between the geocoded places, scaled by the mode's detour and speed profile.
     """
-    # Mock logic: Distance based on string length difference hash for consistency + random factor
-    # This is just to return numbers that look real
-    
-    # Only for key demo routes
+    return _travel_distance(distance_engine, origin, destination, mode)
+
+def _travel_distance(engine: DistanceEngine, origin: str, destination: str, mode: str) -> str:
+    # Curated road/rail figures for key demo routes take precedence over the estimate
     routes = {
         ("london", "paris"): {"distance": "450 km", "time": "5h 30m" if mode=="driving" else "2h 20m"},
         ("paris", "london"): {"distance": "450 km", "time": "5h 30m" if mode=="driving" else "2h 20m"},
@@ -182,94 +317,168 @@ def calculate_travel_distance(origin: str, destination: str, mode: str = "drivin
         data = routes[key]
         return json.dumps({"origin": origin, "destination": destination, "mode": mode, **data})
     
-    # Generic Fallback
-    base_dist = abs(hash(origin) - hash(destination)) % 1000 + 50
-    
-    speed = 60 # km/h driving
-    if mode == "walking": speed = 5
-    if mode == "transit": speed = 50
-    if mode == "bicycling": speed = 15
-    
-    duration_hours = base_dist / speed
-    hours = int(duration_hours)
-    minutes = int((duration_hours - hours) * 60)
+    route_km, hours, missing = engine.distances([origin], [destination], mode)
+    if missing:
+        return json.dumps({"error": f"Could not find coordinates for: {', '.join(missing)}"})
     
     return json.dumps({
         "origin": origin, 
         "destination": destination, 
         "mode": mode,
-        "distance": f"{base_dist} km",
-        "travel_time": f"{hours}h {minutes}m"
+        "distance": f"{int(round(route_km[0]))} km",
+        "travel_time": format_duration(hours[0])
     })
 
-def get_packing_suggestions(destination: str, duration_days: int, trip_type: str, month: str = None, weather_context: str = None) -> str:
+MAX_ITINERARY_STOPS = 25
+
+def plan_itinerary(stops: list, mode: str = "driving", return_to_start: bool = False) -> str:
     """
-    Generate packing list suggestions.
+    Cost a multi-stop trip in one call: pairwise distance/time matrix plus an optimized
+    visiting order (nearest-neighbour + 2-opt) starting from the first stop.
     """
-    essentials = ["passport", "phone charger", "underwear", "toothbrush", "toothpaste", "deodorant"]
-    clothing = []
-    gear = []
-    
-    # Weather-based logic
-    is_cold = False
-    is_rainy = False
-    
-    if weather_context:
-        weather_lower = weather_context.lower()
-        if "rain" in weather_lower or "shower" in weather_lower:
-            is_rainy = True
-        if "snow" in weather_lower or "cold" in weather_lower:
-            is_cold = True
-            
-        # Try to parse temperature if present (e.g. "15C")
-        import re
-        temp_match = re.search(r"(-?\d+)", weather_context)
-        if temp_match:
-            temp = int(temp_match.group(1))
-            if temp < 10: is_cold = True
-            
-    elif month:
-        # Guess based on Northern Hemisphere month
-        month_lower = month.lower()
-        if month_lower in ["december", "january", "february"]:
-            is_cold = True
-            
-    # Suggestions
-    if is_cold:
-        clothing.extend(["heavy coat", "scarf", "gloves", "thermal wear", "sweaters"])
-    else:
-        clothing.extend(["t-shirts", "light jacket"])
-        
-    if is_rainy:
-        clothing.append("raincoat")
-        gear.append("umbrella")
-        
-    # Trip Type logic
-    trip_type_lower = trip_type.lower()
-    if "beach" in trip_type_lower:
-        clothing.extend(["swimsuit", "flip-flops", "sun hat"])
-        gear.extend(["sunscreen", "beach towel", "sunglasses"])
-    elif "hike" in trip_type_lower or "hiking" in trip_type_lower:
-        clothing.extend(["hiking boots", "moisture-wicking socks"])
-        gear.extend(["water bottle", "backpack", "first-aid kit", "bug spray"])
-    elif "business" in trip_type_lower:
-        clothing.extend(["blazer", "formal shoes", "dress shirts/blouses"])
-        gear.extend(["laptop", "business cards", "notebook"])
-    elif "snow" in trip_type_lower or "ski" in trip_type_lower:
-        clothing.extend(["ski jacket", "snow pants"])
-        gear.extend(["goggles"])
-        
-    # Duration logic
-    num_outfits = duration_days + 1
-    clothing.append(f"{num_outfits} sets of daily clothes")
-    
-    return json.dumps({
-        "destination": destination,
-        "trip_type": trip_type,
-        "recommendations": {
-            "essentials": essentials,
-            "clothing": clothing,
-            "gear": gear,
-            "notes": f"Packing list generated for {duration_days} days in {destination} ({trip_type})."
+    return _itinerary(distance_engine, stops, mode, return_to_start)
+
+def _itinerary(engine: DistanceEngine, stops: list, mode: str, return_to_start: bool) -> str:
+    stops = [s for s in (stops or []) if isinstance(s, str) and s.strip()]
+    if len(stops) < 2:
+        return json.dumps({"error": "Provide at least two stops"})
+    if len(stops) > MAX_ITINERARY_STOPS:
+        return json.dumps({"error": f"At most {MAX_ITINERARY_STOPS} stops are supported"})
+
+    route_km, hours, missing = engine.matrix(stops, mode)
+    if missing:
+        return json.dumps({"error": f"Could not find coordinates for: {', '.join(missing)}"})
+
+    order, total_km = optimize_route(route_km, start=0, closed=return_to_start)
+    path = order + [order[0]] if return_to_start else order
+    legs = [
+        {
+            "from": stops[a],
+            "to": stops[b],
+            "distance": f"{int(round(route_km[a, b]))} km",
+            "travel_time": format_duration(hours[a, b]),
         }
+        for a, b in zip(path, path[1:])
+    ]
+    total_hours = sum(hours[a, b] for a, b in zip(path, path[1:]))
+
+    return json.dumps({
+        "mode": mode,
+        "order": [stops[i] for i in path],
+        "legs": legs,
+        "total_distance": f"{int(round(total_km))} km",
+        "total_travel_time": format_duration(total_hours),
+        "matrix": {
+            "stops": stops,
+            "distance_km": np.round(route_km, 1).tolist(),
+            "travel_time_hours": np.round(hours, 2).tolist(),
+        },
     })
+
+def get_packing_suggestions(destination: str, duration_days: int, trip_type: str, month: str = None,
+                            weather_context: str = None, forecast: list = None) -> str:
+    """
+    Generate packing list suggestions from the compiled packing rules (see packing.py).
+    `forecast` takes daily entries as returned by get_weather_forecast and is preferred over free text.
+    """
+    return json.dumps(get_packing_engine().suggest(destination, duration_days, trip_type, month, weather_context, forecast))
+
+def get_packing_suggestions_batch(trips: list) -> str:
+    """
+    Packing lists for several travellers or trips at once; each trip takes get_packing_suggestions' arguments.
+    """
+    try:
+        return json.dumps({"results": get_packing_engine().suggest_many(trips)})
+    except TypeError as e:
+        return json.dumps({"error": f"Invalid trip: {str(e)}"})
+
+
+# --- Async Tool Implementations ---
+# Used by the async graph path (agent.aagent_node / agent.atool_node).
+# The network-bound tools await the shared httpx client; the rest are pure CPU
+# and simply delegate to their sync counterparts.
+
+async def aget_current_weather(city: str, country_code: str = None) -> str:
+    """
+    Async version of get_current_weather.
+    """
+    search_query = f"{city}, {country_code}" if country_code else city
+    lat, lon = await _aget_coordinates(city, country_code)
+
+    if not lat:
+        return json.dumps({"error": f"Could not find coordinates for city: {search_query}"})
+
+    try:
+        data = await _aget_forecast_payload(lat, lon)
+        return _format_current_weather(data, search_query)
+    except Exception as e:
+        return json.dumps({"error": f"Failed to fetch weather data: {str(e)}"})
+
+async def aget_weather_forecast(location: str, days: int = 3) -> str:
+    """
+    Async version of get_weather_forecast.
+    """
+    if days < 1 or days > 5:
+        return json.dumps({"error": "Days must be between 1 and 5"})
+
+    lat, lon = await _aget_coordinates(location)
+
+    if not lat:
+        return json.dumps({"error": f"Could not find coordinates for location: {location}"})
+
+    try:
+        data = await _aget_forecast_payload(lat, lon)
+        return _format_forecast(_slice_days(data, days), location)
+    except Exception as e:
+        return json.dumps({"error": f"Failed to fetch forecast: {str(e)}"})
+
+async def aget_weather_for_locations(locations: list, days: int = 3) -> str:
+    """
+    Async version of get_weather_for_locations; locations are geocoded concurrently.
+    """
+    error = _validate_batch(locations, days)
+    if error:
+        return json.dumps({"error": error})
+
+    coords = await asyncio.gather(*(_aget_coordinates(location) for location in locations))
+    found = [c for c in coords if c[0] is not None]
+    if not found:
+        return json.dumps({"error": f"Could not find coordinates for: {', '.join(locations)}"})
+
+    try:
+        payloads = {}
+        missing = _missing_payloads(coords, payloads)
+        if missing:
+            data = await http_client.aget_json(FORECAST_URL, params=_batch_superset_params(missing))
+            payloads.update(_store_batch_payloads(missing, data))
+        return _format_batch_weather(locations, coords, payloads, days)
+    except Exception as e:
+        return json.dumps({"error": f"Failed to fetch weather data: {str(e)}"})
+
+async def asearch_attractions(location: str, category: str, price_range: str = None, min_rating: float = 0.0,
+                              limit: int = 10, offset: int = 0) -> str:
+    return search_attractions(location, category, price_range, min_rating, limit, offset)
+
+async def _aresolved_engine(places) -> DistanceEngine:
+    """
+    A DistanceEngine over coordinates geocoded up front (concurrently, without blocking
+    the loop), so costing the route does no I/O.
+    """
+    names = list(dict.fromkeys(place for place in places or [] if isinstance(place, str)))
+    coords = await asyncio.gather(*(_aget_coordinates(name) for name in names))
+    return DistanceEngine(dict(zip(names, coords)).__getitem__)
+
+async def acalculate_travel_distance(origin: str, destination: str, mode: str = "driving") -> str:
+    engine = await _aresolved_engine([origin, destination])
+    return _travel_distance(engine, origin, destination, mode)
+
+async def aget_packing_suggestions(destination: str, duration_days: int, trip_type: str, month: str = None,
+                                   weather_context: str = None, forecast: list = None) -> str:
+    return get_packing_suggestions(destination, duration_days, trip_type, month, weather_context, forecast)
+
+async def aget_packing_suggestions_batch(trips: list) -> str:
+    return get_packing_suggestions_batch(trips)
+
+async def aplan_itinerary(stops: list, mode: str = "driving", return_to_start: bool = False) -> str:
+    engine = await _aresolved_engine(stops)
+    return _itinerary(engine, stops, mode, return_to_start)
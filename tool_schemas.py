@@ -42,6 +42,29 @@ TOOL_SCHEMAS = [
             "required": ["location"],
         },
     },
+    {
+        "name": "get_weather_for_locations",
+        "description": "Get current conditions and a daily forecast (1-5 days) for several locations at once. Use this to compare weather across candidate destinations instead of calling the single-city weather tools repeatedly.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "locations": {
+                    "type": "array",
+                    "description": "Cities or locations to compare, e.g. ['Lisbon', 'Barcelona', 'Nice'].",
+                    "items": {"type": "string"},
+                    "minItems": 1,
+                    "maxItems": 10,
+                },
+                "days": {
+                    "type": "integer",
+                    "description": "Number of forecast days per location. Must be between 1 and 5.",
+                    "minimum": 1,
+                    "maximum": 5,
+                }
+            },
+            "required": ["locations"],
+        },
+    },
     {
         "name": "search_attractions",
         "description": "Find tourist attractions, restaurants, or activities in a specific area.",
@@ -67,6 +90,17 @@ TOOL_SCHEMAS = [
                     "description": "Minimum rating (0-5) to filter results.",
                     "minimum": 0,
                     "maximum": 5,
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results to return, best rated first (default 10).",
+                    "minimum": 1,
+                    "maximum": 50,
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "Number of results to skip, for fetching further pages.",
+                    "minimum": 0,
                 }
             },
             "required": ["location", "category"],
@@ -95,6 +129,32 @@ TOOL_SCHEMAS = [
             "required": ["origin", "destination"],
         },
     },
+    {
+        "name": "plan_itinerary",
+        "description": "Plan a multi-stop trip in a single call. Returns the pairwise distance/time matrix between all stops plus an optimized visiting order with per-leg distances and travel times. Prefer this over repeated calculate_travel_distance calls when there are more than two places.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "stops": {
+                    "type": "array",
+                    "description": "Places to visit (cities/addresses). The first stop is the starting point.",
+                    "items": {"type": "string"},
+                    "minItems": 2,
+                    "maxItems": 25,
+                },
+                "mode": {
+                    "type": "string",
+                    "description": "Mode of transport.",
+                    "enum": ["driving", "walking", "transit", "bicycling"],
+                },
+                "return_to_start": {
+                    "type": "boolean",
+                    "description": "Whether the trip ends back at the first stop (round trip).",
+                }
+            },
+            "required": ["stops"],
+        },
+    },
     {
         "name": "get_packing_suggestions",
         "description": "Generate a packing list based on destination, trip duration, activity type, and weather context.",
@@ -122,9 +182,51 @@ TOOL_SCHEMAS = [
                 "weather_context": {
                     "type": "string",
                     "description": "Current weather conditions known for the destination (e.g. 'rainy, 20C').",
+                },
+                "forecast": {
+                    "type": "array",
+                    "description": "Daily forecast entries for the trip, as returned by get_weather_forecast. Preferred over weather_context when available.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "date": {"type": "string"},
+                            "high": {"type": "string", "description": "Daily high, e.g. '21°C'."},
+                            "low": {"type": "string", "description": "Daily low, e.g. '12°C'."},
+                            "condition": {"type": "string", "description": "Condition, e.g. 'Showers'."},
+                        },
+                    },
                 }
             },
             "required": ["destination", "duration_days", "trip_type"],
         },
     },
+    {
+        "name": "get_packing_suggestions_batch",
+        "description": "Generate packing lists for several travellers or trips in one call (e.g. a group with different trip types). Each trip takes the same fields as get_packing_suggestions.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "trips": {
+                    "type": "array",
+                    "description": "One entry per traveller or trip.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "destination": {"type": "string"},
+                            "duration_days": {"type": "integer", "minimum": 1},
+                            "trip_type": {
+                                "type": "string",
+                                "enum": ["business", "leisure", "beach", "hiking", "snow", "camping"],
+                            },
+                            "month": {"type": "string"},
+                            "weather_context": {"type": "string"},
+                        },
+                        "required": ["destination", "duration_days", "trip_type"],
+                    },
+                    "minItems": 1,
+                }
+            },
+            "required": ["trips"],
+        },
+    },
 ]
@@ -1,13 +1,14 @@
 import os
 import django
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'weather_project.settings')
 django.setup()
 
 import chat.routing
+from chat.workers import AGENT_RUN_CHANNEL, AgentRunConsumer
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
@@ -16,4 +17,8 @@ application = ProtocolTypeRouter({
             chat.routing.websocket_urlpatterns
         )
     ),
+    # Background agent workers: python manage.py runworker agent-runs
+    "channel": ChannelNameRouter({
+        AGENT_RUN_CHANNEL: AgentRunConsumer.as_asgi(),
+    }),
 })
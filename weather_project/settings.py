@@ -71,6 +71,9 @@ DATABASES = {
 }
 
 
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator', },
@@ -93,9 +96,26 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Run the agent in `python manage.py runworker agent-runs` processes instead of the socket server
+CHAT_AGENT_WORKERS = os.environ.get("CHAT_AGENT_WORKERS", "0") == "1"
+
 # Channels Configuration
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+# In-process by default. Agent workers, or several socket server processes (set
+# CHANNEL_LAYER_URL), need the shared layer: every Daphne and runworker process opening
+# the same store sees the same channels and groups. CHANNEL_LAYER_URL: "sqlite:///<path>" or "redis://host:6379/0".
+CHANNEL_LAYER_URL = os.environ.get("CHANNEL_LAYER_URL")
+if CHAT_AGENT_WORKERS or CHANNEL_LAYER_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "chat.layers.SharedChannelLayer",
+            "CONFIG": {
+                "url": CHANNEL_LAYER_URL or f"sqlite:///{BASE_DIR / 'channels.sqlite3'}",
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
     }
-}
@@ -0,0 +1,109 @@
+"""
+WMO weather interpretation codes (as returned by Open-Meteo) decoded through
+precomputed lookup tables. Every weather tool and the packing logic use the
+same tables, so a code always maps to the same condition everywhere.
+"""
+
+import numpy as np
+
+# code: (condition, severity 0-3, rain, snow, thunder)
+WMO_CODES = {
+    0: ("Clear", 0, False, False, False),
+    1: ("Mainly Clear", 0, False, False, False),
+    2: ("Partly Cloudy", 0, False, False, False),
+    3: ("Overcast", 0, False, False, False),
+    45: ("Fog", 1, False, False, False),
+    48: ("Freezing Fog", 1, False, False, False),
+    51: ("Drizzle", 1, True, False, False),
+    53: ("Drizzle", 1, True, False, False),
+    55: ("Heavy Drizzle", 2, True, False, False),
+    56: ("Freezing Drizzle", 2, True, False, False),
+    57: ("Heavy Freezing Drizzle", 2, True, False, False),
+    61: ("Rain", 1, True, False, False),
+    63: ("Rain", 2, True, False, False),
+    65: ("Heavy Rain", 3, True, False, False),
+    66: ("Freezing Rain", 2, True, False, False),
+    67: ("Heavy Freezing Rain", 3, True, False, False),
+    71: ("Snow", 1, False, True, False),
+    73: ("Snow", 2, False, True, False),
+    75: ("Heavy Snow", 3, False, True, False),
+    77: ("Snow Grains", 1, False, True, False),
+    80: ("Showers", 1, True, False, False),
+    81: ("Showers", 2, True, False, False),
+    82: ("Violent Showers", 3, True, False, False),
+    85: ("Snow Showers", 2, False, True, False),
+    86: ("Heavy Snow Showers", 3, False, True, False),
+    95: ("Thunderstorm", 3, True, False, True),
+    96: ("Thunderstorm with Hail", 3, True, False, True),
+    99: ("Thunderstorm with Heavy Hail", 3, True, False, True),
+}
+UNKNOWN = ("Unknown", 0, False, False, False)
+
+# Codes are 0-99; slot 100 holds the "unknown" entry for anything outside the table
+_UNKNOWN_SLOT = 100
+_rows = [WMO_CODES.get(code, UNKNOWN) for code in range(_UNKNOWN_SLOT)] + [UNKNOWN]
+CONDITIONS = np.array([row[0] for row in _rows], dtype=object)
+SEVERITY = np.array([row[1] for row in _rows], dtype=np.int8)
+RAIN = np.array([row[2] for row in _rows], dtype=bool)
+SNOW = np.array([row[3] for row in _rows], dtype=bool)
+THUNDER = np.array([row[4] for row in _rows], dtype=bool)
+
+# Words in free-text weather descriptions (e.g. a weather_context string) and the flags they imply
+TEXT_FLAGS = {
+    "drizzle": {"rain"},
+    "rain": {"rain"},
+    "shower": {"rain"},
+    "snow": {"snow"},
+    "sleet": {"rain", "snow"},
+    "thunder": {"rain", "thunder"},
+    "storm": {"rain", "thunder"},
+}
+
+
+def _slots(codes) -> np.ndarray:
+    codes = np.asarray(codes, dtype=float)
+    valid = np.isfinite(codes) & (codes >= 0) & (codes < _UNKNOWN_SLOT)
+    return np.where(valid, np.nan_to_num(codes), _UNKNOWN_SLOT).astype(np.intp)
+
+
+def decode(code) -> dict:
+    """
+    Condition, severity and precipitation flags for one WMO code (None or out of range -> "Unknown").
+    """
+    slot = _slots(np.nan if code is None else code)[()]
+    return {
+        "condition": CONDITIONS[slot],
+        "severity": int(SEVERITY[slot]),
+        "rain": bool(RAIN[slot]),
+        "snow": bool(SNOW[slot]),
+        "thunder": bool(THUNDER[slot]),
+    }
+
+
+def decode_many(codes) -> dict:
+    """
+    Vectorized decode: maps an array of codes to parallel arrays
+    (condition, severity, rain, snow, thunder) with one indexing step each.
+    """
+    codes = [np.nan if c is None else c for c in codes]
+    slots = _slots(codes)
+    return {
+        "condition": CONDITIONS[slots],
+        "severity": SEVERITY[slots],
+        "rain": RAIN[slots],
+        "snow": SNOW[slots],
+        "thunder": THUNDER[slots],
+    }
+
+
+def flags_from_text(text: str) -> set:
+    """
+    Precipitation flags ("rain", "snow", "thunder") mentioned in a free-text description,
+    such as the condition strings the weather tools return.
+    """
+    text = (text or "").lower()
+    flags = set()
+    for word, implied in TEXT_FLAGS.items():
+        if word in text:
+            flags |= implied
+    return flags